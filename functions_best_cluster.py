@@ -0,0 +1,369 @@
+import heapq
+import math
+import functions_metrics as metrics
+import functions_reference_table as reference_table
+
+BOUND_TOLERANCE = 1e-9  # Relative margin added to the computed upper bounds, so the float rounding can't prune the best cluster
+
+def c_Best_Cluster_Index(level_data, t_references_d, beta_l):
+    """Creates the index for the best cluster queries
+
+    Parameters
+    ----------
+    level_data : dict
+        Dictionary with the data of the clustering solution of the first level.
+
+    t_references_d : dict of set
+        The key is the topic and the value is the set of references of the topic. The references are int type.
+
+    beta_l : list
+        List of the betas to precompute.
+
+    Returns
+    -------
+    index : dict
+        Index of the tree. Keys:
+
+        root: dict
+            Index node of the first level, see c_Index_Recursion().
+
+        t_references_d: dict of set
+            The t_references_d parameter.
+
+        beta_l: list
+            The beta_l parameter.
+
+    Notes
+    -------
+    The index is used by top_K_Clusters(), best_Cluster() and best_Cluster_By_Recall(). It precomputes, for each cluster,
+    the size of the smallest cluster under it and, for each topic, the highest F-score under it and the recall/precision
+    frontier of the cluster and the clusters under it. These values allow the queries to skip the branches that can't contain
+    a better cluster instead of going through all the tree.
+    The index only contains the levels that exist when it is created (in a lazy tree, the levels that were already created).
+    """
+    t_references_d = reference_table.t_References_D(t_references_d)
+    index = {'t_references_d': t_references_d, 'beta_l': list(beta_l)}
+    index['root'] = c_Index_Recursion(level_data, t_references_d, beta_l, ())
+    return index
+
+def c_Index_Recursion(level_data, t_references_d, beta_l, path):
+    """Recursive function of c_Best_Cluster_Index()
+
+    Parameters
+    ----------
+    level_data : dict
+        Dictionary with the data of the clustering solution of the current level.
+
+    t_references_d : dict of set
+        The key is the topic and the value is the set of references of the topic.
+
+    beta_l : list
+        List of the betas to precompute.
+
+    path : tuple
+        Clusters that lead from the first level to the current level.
+
+    Returns
+    -------
+    index_node : dict
+        Index of the current level. Keys:
+
+        level_data: dict
+            The level_data parameter.
+
+        path: tuple
+            The path parameter.
+
+        cluster_size: dict of int
+            Size of each cluster.
+
+        desc_min_size: dict of float
+            For each cluster, the size of the smallest cluster under it (math.inf if it has no children).
+
+        desc_max_fscore: dict of dict of dict
+            The first key is the topic, the second key is the cluster and the third key is the beta. The value is the highest
+            F-score of the clusters under the cluster (0.0 if it has no children).
+
+        frontier: dict of dict of list
+            The first key is the topic and the second key is the cluster. The value is the recall/precision frontier of the
+            cluster and the clusters under it, see merge_Frontiers(). Only the positive clusters of the topic are included.
+
+        subtree_min_size, subtree_max_fscore, subtree_frontier:
+            The same values for all the clusters of the level and the clusters under them.
+
+        children: dict
+            The index node of each child level.
+
+    Notes
+    -------
+    The index is created from the lowest level to the highest one, so each level only needs the values of its child levels.
+    """
+    jclu_d = level_data['merging_data']['jclu_d']
+    t_positive_clusters_d = level_data['t_positive_clusters_d']
+    children_clusters = level_data.get('children_clusters', {})
+    index_node = {'level_data': level_data, 'path': path, 'cluster_size': {}, 'desc_min_size': {}, 'desc_max_fscore': {}, 'frontier': {}, 'children': {}}
+    index_node['subtree_min_size'] = math.inf
+    index_node['subtree_max_fscore'] = {t: {beta: 0.0 for beta in beta_l} for t in t_references_d}
+    index_node['subtree_frontier'] = {}
+    for t in t_references_d:
+        index_node['desc_max_fscore'][t] = {}
+        index_node['frontier'][t] = {}
+    for c in jclu_d:
+        cr = len(jclu_d[c])
+        index_node['cluster_size'][c] = cr
+        if c in children_clusters:
+            child_index_node = c_Index_Recursion(children_clusters[c], t_references_d, beta_l, path + (c,))
+            index_node['children'][c] = child_index_node
+            index_node['desc_min_size'][c] = child_index_node['subtree_min_size']
+        else:
+            child_index_node = None
+            index_node['desc_min_size'][c] = math.inf
+        index_node['subtree_min_size'] = min(index_node['subtree_min_size'], cr, index_node['desc_min_size'][c])
+        for t in t_references_d:
+            cp = len(t_references_d[t])
+            tp = len(t_positive_clusters_d[t].get(c, ()))
+            if child_index_node is None:
+                index_node['desc_max_fscore'][t][c] = {beta: 0.0 for beta in beta_l}
+                children_frontier = []
+            else:
+                index_node['desc_max_fscore'][t][c] = child_index_node['subtree_max_fscore'][t]
+                children_frontier = child_index_node['subtree_frontier'].get(t, [])
+            for beta in beta_l:
+                fscore = cluster_Fscore(tp, cr, cp, beta)
+                subtree_max_fscore = max(fscore, index_node['desc_max_fscore'][t][c][beta])
+                if subtree_max_fscore > index_node['subtree_max_fscore'][t][beta]:
+                    index_node['subtree_max_fscore'][t][beta] = subtree_max_fscore
+            if tp > 0:
+                cluster_point = (float(tp) / cp, float(tp) / cr, path + (c,))
+                index_node['frontier'][t][c] = merge_Frontiers([cluster_point], children_frontier)
+                index_node['subtree_frontier'][t] = merge_Frontiers(index_node['subtree_frontier'].get(t, []), index_node['frontier'][t][c])
+    return index_node
+
+def cluster_Fscore(tp, cr, cp, beta):
+    """Calculate the F-score of a cluster from its counts
+
+    Parameters
+    ----------
+    tp : int
+        True positives (references in the cluster).
+
+    cr : int
+        Condition retrieved (size of the cluster).
+
+    cp : int
+        Condition positive (number of references).
+
+    beta : float
+        Beta of the F-score.
+
+    Returns
+    -------
+    fscore : float
+        F-score, calculated in the same way as in t_Cluster_Metrics(), so the values are identical.
+    """
+    recall = float(tp) / cp
+    precision = float(tp) / cr
+    fscore = metrics.f_Score_From_Rec_Pre(recall, precision, beta)
+    return fscore
+
+def fscore_Upper_Bound(tp, cp, min_size, beta):
+    """Calculate the highest F-score that a cluster under a given cluster can have
+
+    Parameters
+    ----------
+    tp : int
+        True positives of the given cluster.
+
+    cp : int
+        Condition positive.
+
+    min_size : float
+        Size of the smallest cluster under the given cluster.
+
+    beta : float
+        Beta of the F-score.
+
+    Returns
+    -------
+    bound : float
+        Upper bound of the F-score of the clusters under the given cluster.
+
+    Notes
+    -------
+    The F-score can be written as (1+b2)*tp / (b2*cp + cr). A cluster under the given cluster has at most tp true positives,
+    at most cr true positives, and at least min_size documents. With these conditions the highest value is at cr = max(tp, min_size).
+    """
+    if tp == 0 or math.isinf(min_size):
+        return 0.0
+    b2 = beta**2
+    bound = (1 + b2) * tp / (b2*cp + max(tp, min_size))
+    bound *= 1 + BOUND_TOLERANCE
+    return bound
+
+def merge_Frontiers(frontier_1, frontier_2):
+    """Merges two recall/precision frontiers
+
+    Parameters
+    ----------
+    frontier_1 : list of tuple
+        List of (recall, precision, path) of clusters.
+
+    frontier_2 : list of tuple
+        List of (recall, precision, path) of clusters.
+
+    Returns
+    -------
+    frontier : list of tuple
+        The clusters of both frontiers that are not dominated by another cluster (i.e. there is no other cluster with both
+        higher or equal recall and higher or equal precision). It is sorted from the highest to the lowest recall.
+
+    Notes
+    -------
+    The F-score increases with the recall and with the precision, so for any beta and any minimum recall the best cluster is in
+    the frontier.
+    """
+    points_l = sorted(frontier_1 + frontier_2, key=lambda x: (-x[0], -x[1]))
+    frontier = []
+    max_precision = -1.0
+    for point in points_l:
+        if point[1] > max_precision:
+            frontier.append(point)
+            max_precision = point[1]
+    return frontier
+
+def top_K_Clusters(index, beta, k=1, topic=None, references=None, min_recall=0.0):
+    """Finds the clusters with the highest F-score in the whole tree
+
+    Parameters
+    ----------
+    index : dict
+        Index created by c_Best_Cluster_Index().
+
+    beta : float
+        Beta of the F-score.
+
+    k : int, optional
+        Number of clusters to return.
+
+    topic : int, optional
+        Topic of the index to use.
+
+    references : set, optional
+        Ad-hoc set of references (e.g. the relevant documents of a new query), used instead of a topic of the index.
+
+    min_recall : float, optional
+        Only clusters with this recall or higher are returned.
+
+    Returns
+    -------
+    top_l : list of dict
+        The k best clusters, from the best to the worst. Each cluster is a dictionary with the path of the cluster ('path', the
+        clusters from the first level to the cluster), 'level', 'cluster', 'fscore', 'recall', 'precision', 'tp' and 'cr'.
+
+    Notes
+    -------
+    Best-first branch and bound search. The heap contains clusters (with their exact F-score) and branches under clusters (with
+    the upper bound of their F-score). A cluster that leaves the heap is better than everything left in the heap, so the search
+    stops after k clusters and the branches whose bound is lower than the k-th cluster are never visited.
+    For a topic of the index and a beta of the index the bound is the exact highest F-score of the branch. Otherwise (other beta
+    or ad-hoc references) the bound is fscore_Upper_Bound(), and the true positives are counted only for the visited clusters.
+    A branch is also skipped if its cluster does not reach min_recall, because the clusters under it have less true positives.
+    """
+    assert ((topic is None) != (references is None)), 'Give either a topic or a set of references'
+    if topic is not None:
+        references = index['t_references_d'][topic]
+    cp = len(references)
+    use_precomputed = topic is not None and beta in index['beta_l']
+    heap = []
+    order = 0  # Tie breaker, keeps the order of the tree
+    top_l = []
+    heap_l = [index['root']]  # Index nodes to push into the heap
+    while True:
+        for index_node in heap_l:
+            level_data = index_node['level_data']
+            jclu_d = level_data['merging_data']['jclu_d']
+            for c in jclu_d:
+                if topic is not None:
+                    tp = len(level_data['t_positive_clusters_d'][topic].get(c, ()))
+                else:
+                    tp = len(references.intersection(jclu_d[c]))
+                if tp == 0 or float(tp) / cp < min_recall:  # Neither the cluster nor the clusters under it can be returned
+                    continue
+                cr = index_node['cluster_size'][c]
+                fscore = cluster_Fscore(tp, cr, cp, beta)
+                heapq.heappush(heap, (-fscore, 0, order, index_node, c, tp))
+                order += 1
+                if c in index_node['children']:
+                    if use_precomputed:
+                        bound = index_node['desc_max_fscore'][topic][c][beta]
+                    else:
+                        bound = fscore_Upper_Bound(tp, cp, index_node['desc_min_size'][c], beta)
+                    if bound > 0.0:
+                        heapq.heappush(heap, (-bound, 1, order, index_node, c, tp))
+                        order += 1
+        heap_l = []
+        if len(top_l) >= k or len(heap) == 0:
+            break
+        neg_value, is_branch, _, index_node, c, tp = heapq.heappop(heap)
+        if is_branch:
+            heap_l = [index_node['children'][c]]
+        else:
+            cr = index_node['cluster_size'][c]
+            path = index_node['path'] + (c,)
+            top_l.append({'path': path, 'level': len(path), 'cluster': c, 'fscore': -neg_value, 'recall': float(tp) / cp,
+                          'precision': float(tp) / cr, 'tp': tp, 'cr': cr})
+    return top_l
+
+def best_Cluster(index, beta, topic=None, references=None, min_recall=0.0):
+    """Finds the cluster with the highest F-score in the whole tree
+
+    Parameters
+    ----------
+    The same as top_K_Clusters().
+
+    Returns
+    -------
+    best_cluster_d : dict
+        The best cluster (see top_K_Clusters()), or None if no cluster has references (or reaches min_recall).
+    """
+    top_l = top_K_Clusters(index, beta, 1, topic=topic, references=references, min_recall=min_recall)
+    if len(top_l) == 0:
+        return None
+    best_cluster_d = top_l[0]
+    return best_cluster_d
+
+def best_Cluster_By_Recall(index, topic, beta, min_recall):
+    """Finds the cluster with the highest F-score among the clusters with a minimum recall using the frontier
+
+    Parameters
+    ----------
+    index : dict
+        Index created by c_Best_Cluster_Index().
+
+    topic : int
+        Topic of the index.
+
+    beta : float
+        Beta of the F-score. It does not need to be in the betas of the index.
+
+    min_recall : float
+        Minimum recall of the cluster.
+
+    Returns
+    -------
+    best_cluster_d : dict
+        The best cluster, with the keys 'path', 'level', 'cluster', 'fscore', 'recall' and 'precision', or None if no cluster
+        reaches min_recall.
+
+    Notes
+    -------
+    The frontier of the tree is precomputed, so the query only reads the frontier points with recall >= min_recall.
+    """
+    best_cluster_d = None
+    for recall, precision, path in index['root']['subtree_frontier'].get(topic, []):
+        if recall < min_recall:
+            break  # The frontier is sorted from the highest to the lowest recall
+        fscore = metrics.f_Score_From_Rec_Pre(recall, precision, beta)
+        if best_cluster_d is None or fscore > best_cluster_d['fscore']:
+            best_cluster_d = {'path': path, 'level': len(path), 'cluster': path[-1], 'fscore': fscore, 'recall': recall, 'precision': precision}
+    return best_cluster_d
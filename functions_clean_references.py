@@ -0,0 +1,232 @@
+import numpy as np
+import functions_reading as reading
+
+PMID_BITS = 32  # PubMed IDs are lower than 2**32, so (topic index, PubMed ID) fits in an int64 key
+
+def int_Columns(rows, column_l):
+    """Converts columns of a tab delimited file to arrays
+
+    Parameters
+    ----------
+    rows : list of list
+        Rows of the file without the header, as returned by functions_reading.p_Tab_Delimited().
+
+    column_l : list of int
+        Indices of the columns.
+
+    Returns
+    -------
+    array_l : list of numpy.ndarray
+        One array of int64 per column.
+    """
+    array_l = [np.fromiter((int(row[column]) for row in rows), dtype=np.int64, count=len(rows)) for column in column_l]
+    return array_l
+
+def c_Pmid_Netid_Table_D(union_row):
+    """Creates the PubMed ID -> net ID tables of each network
+
+    Parameters
+    ----------
+    union_row : list of list
+        Rows of PAPER2_netid_pmid_pubid_year_UNION.txt without the header (columns: net ID, PubMed ID, pub ID, year).
+
+    Returns
+    -------
+    table_d : dict of dict
+        The key is the year of the network. Each table contains the sorted unique PubMed IDs ('pmid'), the net ID of each PubMed
+        ID ('netid'), the number of net IDs of each PubMed ID ('n_netids'), and all the net IDs sorted by PubMed ID and net ID
+        ('all_netid'), where the net IDs of the PubMed ID i start at 'start'[i].
+
+    Notes
+    -------
+    Some pub IDs of Dimensions have the same PubMed ID, so a PubMed ID can have more than one net ID. As in clean_references.ipynb,
+    the net ID of the PubMed ID is the lowest one (the lower pub ID usually has more citation links). The collisions can be
+    reported with c_Collision_Report_D().
+    """
+    netid_array, pmid_array, year_array = int_Columns(union_row, [0, 1, 3])
+    order = np.lexsort((netid_array, pmid_array, year_array))  # Sorted by year, PubMed ID and net ID
+    netid_array, pmid_array, year_array = netid_array[order], pmid_array[order], year_array[order]
+    table_d = {}
+    for year in np.unique(year_array).tolist():
+        start, end = np.searchsorted(year_array, [year, year + 1])
+        year_pmid_array = pmid_array[start:end]
+        year_netid_array = netid_array[start:end]
+        first_array = np.flatnonzero(np.r_[True, year_pmid_array[1:] != year_pmid_array[:-1]])  # The first net ID is the lowest
+        table_d[year] = {'pmid': year_pmid_array[first_array], 'netid': year_netid_array[first_array],
+                         'n_netids': np.diff(np.r_[first_array, len(year_pmid_array)]), 'start': first_array,
+                         'all_netid': year_netid_array}
+    return table_d
+
+def read_Pmid_Netid_Table_D(filename, encoding=None, errors=None):
+    """Reads PAPER2_netid_pmid_pubid_year_UNION.txt and creates the tables of c_Pmid_Netid_Table_D()"""
+    union = reading.p_Tab_Delimited(filename, encoding=encoding, errors=errors)
+    return c_Pmid_Netid_Table_D(union[1:])
+
+def lookup_Netids(table, pmid_array):
+    """Finds the net IDs of PubMed IDs
+
+    Parameters
+    ----------
+    table : dict
+        Table of a year (see c_Pmid_Netid_Table_D()).
+
+    pmid_array : numpy.ndarray
+        PubMed IDs.
+
+    Returns
+    -------
+    in_net : numpy.ndarray
+        Boolean array, True if the PubMed ID is in the network.
+
+    netid_array : numpy.ndarray
+        Net IDs of the PubMed IDs that are in the network, in the order of pmid_array.
+    """
+    if len(table['pmid']) == 0:
+        return np.zeros(len(pmid_array), dtype=bool), np.zeros(0, dtype=np.int64)
+    index_array = np.searchsorted(table['pmid'], pmid_array)
+    index_array[index_array == len(table['pmid'])] = 0
+    in_net = table['pmid'][index_array] == pmid_array
+    netid_array = table['netid'][index_array[in_net]]
+    return in_net, netid_array
+
+def lookup_All_Netids(table, pmid_array):
+    """Finds all the net IDs of PubMed IDs
+
+    Parameters
+    ----------
+    table : dict
+        Table of a year (see c_Pmid_Netid_Table_D()).
+
+    pmid_array : numpy.ndarray
+        PubMed IDs.
+
+    Returns
+    -------
+    in_net : numpy.ndarray
+        Boolean array, True if the PubMed ID is in the network.
+
+    netid_l : list of numpy.ndarray
+        Sorted net IDs of each PubMed ID that is in the network, in the order of pmid_array. The first one is the net ID of
+        lookup_Netids(), and there is more than one for the collisions (see c_Collision_Report_D()).
+    """
+    in_net, _ = lookup_Netids(table, pmid_array)
+    index_array = np.searchsorted(table['pmid'], pmid_array[in_net])
+    netid_l = [table['all_netid'][start:start + n_netids] for start, n_netids in zip(table['start'][index_array].tolist(), table['n_netids'][index_array].tolist())]
+    return in_net, netid_l
+
+def c_Year_Topic_Retrieved_D(reference_d, table_d, connect_topics_d):
+    """Translates the documents retrieved by the Boolean queries to net IDs, for all the years and topics
+
+    Parameters
+    ----------
+    reference_d : dict of dict
+        References of each topic (see functions_reference_table.reference_Arrays_D()).
+
+    table_d : dict of dict
+        PubMed ID -> net ID tables of each year (see c_Pmid_Netid_Table_D()).
+
+    connect_topics_d : dict
+        Output of functions_read_query.topic_Api_D(). connect_topics_d[topic]['id_list'] are the PubMed IDs retrieved by the
+        Boolean query of the topic.
+
+    Returns
+    -------
+    year_topic_retrieved_d : dict of dict
+        The first key is the year and the second key is the topic. The value contains the net IDs of the retrieved documents that
+        are in the network ('retrieved_in_net') and of the references among them ('positives_retrieved_in_net'), as lists in the
+        order of the Boolean query. It is the same as year_topic_retrieved_d in clean_references.ipynb.
+
+    Notes
+    -------
+    The retrieved documents of all the topics of a year are joined with the table of the year in one searchsorted() call, and
+    the references are found with one numpy.isin() over (topic, PubMed ID) keys.
+    """
+    year_topic_retrieved_d = {}
+    for year in reference_d:
+        year_topic_retrieved_d[year] = {}
+        topic_l = [topic for topic in reference_d[year] if topic in connect_topics_d]
+        retrieved_l = [np.array(connect_topics_d[topic]['id_list'], dtype=np.int64) for topic in topic_l]
+        if len(topic_l) == 0:
+            continue
+        retrieved_array = np.concatenate(retrieved_l)
+        topic_i_array = np.repeat(np.arange(len(topic_l), dtype=np.int64), [len(x) for x in retrieved_l])
+        in_net, netid_array = lookup_Netids(table_d.get(year, empty_Table()), retrieved_array)
+        retrieved_key_array = (topic_i_array[in_net] << PMID_BITS) | retrieved_array[in_net]
+        positive_key_array = np.concatenate([(topic_i << PMID_BITS) | reference_d[year][topic]['pmid'] for topic_i, topic in enumerate(topic_l)])
+        is_positive = np.isin(retrieved_key_array, positive_key_array)
+        limit_array = np.searchsorted(topic_i_array[in_net], np.arange(len(topic_l) + 1))
+        for topic_i, topic in enumerate(topic_l):
+            start, end = limit_array[topic_i], limit_array[topic_i + 1]
+            year_topic_retrieved_d[year][topic] = {'retrieved_in_net': netid_array[start:end].tolist(),
+                                                   'positives_retrieved_in_net': netid_array[start:end][is_positive[start:end]].tolist()}
+    return year_topic_retrieved_d
+
+def empty_Table():
+    """Table of a year without documents"""
+    empty_array = np.zeros(0, dtype=np.int64)
+    return {'pmid': empty_array, 'netid': empty_array, 'n_netids': empty_array, 'start': empty_array, 'all_netid': empty_array}
+
+def threshold_Year_Topic_Retrieved_D(year_topic_retrieved_d, min_positives=10):
+    """Removes the topics with less than min_positives references retrieved in the network, as year_topic_retrieved_THRESHOLD_d in
+    clean_references.ipynb"""
+    threshold_d = {}
+    for year in year_topic_retrieved_d:
+        threshold_d[year] = {}
+        for topic in year_topic_retrieved_d[year]:
+            if len(year_topic_retrieved_d[year][topic]['positives_retrieved_in_net']) >= min_positives:
+                threshold_d[year][topic] = year_topic_retrieved_d[year][topic]
+    return threshold_d
+
+def c_Collision_Report_D(table_d, reference_d=None, connect_topics_d=None):
+    """Reports the PubMed IDs with more than one net ID
+
+    Parameters
+    ----------
+    table_d : dict of dict
+        PubMed ID -> net ID tables of each year (see c_Pmid_Netid_Table_D()).
+
+    reference_d : dict of dict, optional
+        References of each topic (see functions_reference_table.reference_Arrays_D()). If it is given with connect_topics_d, the report also counts the
+        retrieved documents in the network and the ones with more than one net ID, as clean_references.ipynb did.
+
+    connect_topics_d : dict, optional
+        Output of functions_read_query.topic_Api_D().
+
+    Returns
+    -------
+    report_d : dict
+        The key is the year. 'collisions' is a dictionary where the key is each PubMed ID with more than one net ID and the value
+        is the list of its net IDs (the lowest one is the one used), 'n_pmids' is the number of PubMed IDs of the network,
+        and 'total_retrieved' and 'retrieved_collisions' are the retrieved counts. Besides, report_d['mismatches'] are the
+        (year, topic, PubMed ID) of the references whose net ID is not the lowest net ID of the table.
+    """
+    report_d = {'mismatches': []}
+    for year in table_d:
+        table = table_d[year]
+        collision_array = np.flatnonzero(table['n_netids'] > 1)
+        collisions = {}
+        for pmid, start, n_netids in zip(table['pmid'][collision_array].tolist(), table['start'][collision_array].tolist(),
+                                         table['n_netids'][collision_array].tolist()):
+            collisions[pmid] = table['all_netid'][start:start + n_netids].tolist()
+        report_d[year] = {'collisions': collisions, 'n_pmids': len(table['pmid'])}
+    if reference_d is not None:
+        for year in reference_d:
+            table = table_d.get(year, empty_Table())
+            for topic in reference_d[year]:
+                in_net, netid_array = lookup_Netids(table, reference_d[year][topic]['pmid'])
+                wrong_array = np.flatnonzero(~in_net)
+                wrong_array = np.r_[wrong_array, np.flatnonzero(in_net)[netid_array != reference_d[year][topic]['netid'][in_net]]]
+                report_d['mismatches'] += [(year, topic, pmid) for pmid in reference_d[year][topic]['pmid'][np.sort(wrong_array)].tolist()]
+            if connect_topics_d is not None and year in report_d:
+                total_retrieved = 0
+                retrieved_collisions = 0
+                for topic in reference_d[year]:
+                    if topic in connect_topics_d:
+                        retrieved_array = np.array(connect_topics_d[topic]['id_list'], dtype=np.int64)
+                        in_net, _ = lookup_Netids(table, retrieved_array)
+                        index_array = np.searchsorted(table['pmid'], retrieved_array[in_net])
+                        total_retrieved += int(in_net.sum())
+                        retrieved_collisions += int((table['n_netids'][index_array] > 1).sum())
+                report_d[year]['total_retrieved'] = total_retrieved
+                report_d[year]['retrieved_collisions'] = retrieved_collisions
+    return report_d
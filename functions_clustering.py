@@ -1,6 +1,121 @@
 import igraph
 import random
+import time
+import numpy as np
+import functions_merging as merging
+import functions_coarsening as coarsening
+import functions_warm_start as warm_start
+import functions_reading as reading
+import functions_profiling as profiling
 
+LEIDEN_PARAMS_D = {'adaptive': False}  # Iteration control of get_Partition_Class(), see set_Leiden_Params()
+LEIDEN_LOG_L = []  # One record per clustering in adaptive mode, see adaptive_Leiden()
+COARSEN_D = {'min_vcount': None}  # Graphs clustered on their coarsened core, see set_Coarsening()
+WARM_START_D = {'labels_d': None, 'cache_d': None, 'record_cache_d': None, 'node_map': None}  # Reuse of the previous year, see set_Warm_Start()
+
+def set_Leiden_Params(adaptive=False, min_iterations=2, quality_tol=1e-6, change_tol=1e-4, large_vcount=100000, max_iterations_large=4, max_iterations_small=20, log=True):
+    """Sets the iteration control of the Leiden algorithm
+
+    Parameters
+    ----------
+    adaptive : bool, optional
+        If False (default) get_Partition_Class() runs community_leiden() with the default number of iterations of igraph, so
+        the output is exactly the same as always. If True it runs adaptive_Leiden().
+
+    min_iterations : int, optional
+        Iterations of the first call. With 2 (the default of igraph) the first partition is the partition of the default mode.
+        With -1 the first call runs until an iteration does not change the partition (n_iterations=-1 of igraph), and there are
+        no more calls.
+
+    quality_tol : float, optional
+        Stop when an iteration improves the quality less than quality_tol times the quality.
+
+    change_tol : float, optional
+        Stop when an iteration moves less than this fraction of the nodes to another cluster (see membership_Change()).
+
+    large_vcount : int, optional
+        Graphs with at least this number of vertices use max_iterations_large, the rest use max_iterations_small.
+
+    max_iterations_large : int, optional
+        Maximum number of iterations for large graphs (the top levels of the tree, which dominate the runtime). If it is not
+        more than min_iterations, there is only the first call (e.g. min_iterations=1 and max_iterations_large=1 runs half
+        the iterations of the default mode).
+
+    max_iterations_small : int, optional
+        Maximum number of iterations for small graphs.
+
+    log : bool, optional
+        If True each clustering is recorded in LEIDEN_LOG_L.
+
+    Notes
+    -------
+    The parameters are global (as the profiling), so they apply to all the levels of the tree. They are not sent to other
+    processes, except to the workers of functions_work_queue, which receive them with the job (see clustering_Settings_D()).
+    """
+    LEIDEN_PARAMS_D.clear()
+    LEIDEN_PARAMS_D.update({'adaptive': adaptive, 'min_iterations': min_iterations, 'quality_tol': quality_tol, 'change_tol': change_tol,
+                            'large_vcount': large_vcount, 'max_iterations_large': max_iterations_large,
+                            'max_iterations_small': max_iterations_small, 'log': log})
+
+def reset_Leiden_Log():
+    """Removes the records of LEIDEN_LOG_L"""
+    del LEIDEN_LOG_L[:]
+
+def set_Coarsening(min_vcount=None):
+    """Clusters the graphs with at least min_vcount vertices on their core, with the pendant trees contracted into their anchor
+    (see coarsened_Partition()). None (default) turns it off
+
+    Notes
+    -------
+    As the parameters of the Leiden algorithm, it is global and it is only sent to the workers of functions_work_queue. pipeline_Clustering(coarsen=True)
+    sets it to the number of vertices of the network, so only the top level is coarsened.
+    """
+    COARSEN_D['min_vcount'] = min_vcount
+
+def set_Warm_Start(labels_d=None, cache_d=None, record_cache_d=None, node_map=None):
+    """Sets the reuse of the clustering of the previous year. With the default values it is off
+
+    Parameters
+    ----------
+    labels_d : dict, optional
+        Labels of each resolution of the previous year (see functions_warm_start.c_Warm_Labels_D()). The Leiden algorithm starts
+        from them instead of from singletons.
+
+    cache_d : dict, optional
+        Partitions of the previous year (see functions_warm_start.c_Partition_Cache_D()). The graphs that are in the cache are
+        not clustered again.
+
+    record_cache_d : dict, optional
+        Cache where the partitions of this year are stored for the next year.
+
+    node_map : dict, optional
+        Net IDs of this year -> net IDs of the next year, for the keys of record_cache_d (see functions_warm_start.c_Node_Map_D()).
+
+    Notes
+    -------
+    As the parameters of the Leiden algorithm, it is global and it is only sent to the workers of functions_work_queue.
+    """
+    WARM_START_D.update({'labels_d': labels_d, 'cache_d': cache_d, 'record_cache_d': record_cache_d, 'node_map': node_map})
+
+def clustering_Settings_D():
+    """Copy of the global settings of the clustering (LEIDEN_PARAMS_D, COARSEN_D and WARM_START_D), e.g. to send them to the
+    workers of functions_work_queue (see set_Clustering_Settings())"""
+    return {'leiden_params_d': dict(LEIDEN_PARAMS_D), 'coarsen_d': dict(COARSEN_D), 'warm_start_d': dict(WARM_START_D)}
+
+def set_Clustering_Settings(settings_d):
+    """Sets the global settings of the clustering copied by clustering_Settings_D()"""
+    LEIDEN_PARAMS_D.clear()
+    LEIDEN_PARAMS_D.update(settings_d['leiden_params_d'])
+    COARSEN_D.update(settings_d['coarsen_d'])
+    WARM_START_D.update(settings_d['warm_start_d'])
+
+def partition_Settings(ig_network):
+    """Settings that change the partition of a graph besides the graph and the resolution (part of the key of the partition cache)"""
+    coarsen = COARSEN_D['min_vcount'] is not None and ig_network.vcount() >= COARSEN_D['min_vcount']
+    return {'weights': leiden_Weights(ig_network), 'node_weights': leiden_Node_Weights(ig_network), 'coarsen': coarsen,
+            'leiden_params': repr(sorted(LEIDEN_PARAMS_D.items()))}
+
+@profiling.timed()
 def get_Partition_Class(ig_network, resolution, random_seed=0):
     """Creates an Igraph representation of the network
 
@@ -26,12 +141,395 @@ def get_Partition_Class(ig_network, resolution, random_seed=0):
     Requires the random module
     The purpose of the function is to fix the random seed of the Leiden algorihm so the results of the clustering
     become replicable.
+    If the adaptive mode is on (see set_Leiden_Params()) the number of iterations depends on the convergence (see adaptive_Leiden()).
+    The edge weights are used only if the graph is weighted (see leiden_Weights()).
+    If the coarsening is on (see set_Coarsening()) the large graphs are clustered on their core (see coarsened_Partition()).
+    If the reuse of the previous year is on (see set_Warm_Start()) the partitions are looked up in and recorded to the partition
+    caches, and the Leiden algorithm starts from the labels of the previous year.
     """
     igraph.set_random_number_generator(random)
     random.seed(random_seed)
-    partition = ig_network.community_leiden(resolution_parameter=resolution)
+    if WARM_START_D['cache_d'] is not None or WARM_START_D['record_cache_d'] is not None:
+        settings = partition_Settings(ig_network)
+        settings['random_seed'] = random_seed
+    if WARM_START_D['cache_d'] is not None:
+        partition = warm_start.cached_Partition(WARM_START_D['cache_d'], ig_network, resolution, settings)
+        if partition is not None:
+            return partition
+    if COARSEN_D['min_vcount'] is not None and ig_network.vcount() >= COARSEN_D['min_vcount']:
+        partition = coarsened_Partition(ig_network, resolution)
+    else:
+        partition = leiden_Partition(ig_network, resolution)
+    if WARM_START_D['record_cache_d'] is not None:
+        warm_start.store_Partition(WARM_START_D['record_cache_d'], ig_network, resolution, partition, settings, node_map=WARM_START_D['node_map'])
+    return partition
+
+def leiden_Partition(ig_network, resolution):
+    """Runs the Leiden algorithm in the default or in the adaptive mode. The random generator must be seeded before (see
+    get_Partition_Class())"""
+    initial_membership = None
+    if WARM_START_D['labels_d'] is not None:
+        initial_membership = warm_start.initial_Membership(WARM_START_D['labels_d'], ig_network, resolution)
+    if LEIDEN_PARAMS_D['adaptive']:
+        return adaptive_Leiden(ig_network, resolution, LEIDEN_PARAMS_D, initial_membership=initial_membership)
+    partition = ig_network.community_leiden(weights=leiden_Weights(ig_network), node_weights=leiden_Node_Weights(ig_network), resolution_parameter=resolution,
+                                            initial_membership=initial_membership)
+    return partition
+
+def coarsened_Partition(ig_network, resolution):
+    """Clusters the core of the graph, with the pendant trees contracted into their anchor (see
+    functions_coarsening.c_Coarse_D()), and expands the membership to all the vertices
+
+    Notes
+    -------
+    The pendant trees are in the cluster of their anchor instead of being tiny clusters, so there are fewer clusters to merge in
+    join_Clusters(). The quality of the partition is its CPM quality in ig_network (see functions_coarsening.cpm_Quality()).
+    The number of vertices of the core is added to the profiling node.
+    """
+    coarse_d = coarsening.c_Coarse_D(ig_network)
+    core_partition = leiden_Partition(coarse_d['core'], resolution)
+    profiling.add_Node_Values(core_vcount=coarse_d['core_vcount'], contracted_vertices=coarse_d['contracted_vertices'])
+    return coarsening.expand_Partition(ig_network, coarse_d, core_partition, resolution, weights=leiden_Weights(ig_network))
+
+def leiden_Weights(ig_network):
+    """Weights of the Leiden algorithm: the 'weight' attribute if the graph has the graph attribute 'weighted' (see
+    functions_reading.create_Weighted_Igraph_Network()), otherwise None (all the edges count 1, as in create_Igraph_Network())"""
+    if 'weighted' in ig_network.attributes() and ig_network['weighted']:
+        return 'weight'
+    return None
+
+def leiden_Node_Weights(ig_network):
+    """Node weights of the Leiden algorithm: the 'node_weight' attribute of a coarsened core (see functions_coarsening.c_Coarse_D()),
+    otherwise None (all the vertices count 1)"""
+    if 'node_weight' in ig_network.vs.attributes():
+        return 'node_weight'
+    return None
+
+def adaptive_Leiden(ig_network, resolution, params_d, initial_membership=None):
+    """Runs the Leiden algorithm until the partition converges
+
+    Parameters
+    ----------
+    ig_network : igraph.Graph object
+        Igraph representation of the network.
+
+    resolution: float
+        Resolution to be used in the Leiden algorithm clustering.
+
+    params_d : dict
+        Iteration control (see set_Leiden_Params()).
+
+    initial_membership : list, optional
+        Membership the first call starts from (see set_Warm_Start()). By default each vertex starts in its own cluster.
+
+    Returns
+    -------
+    partition : igraph.clustering.VertexClustering object
+        Partition of the nodes into clusters.
+
+    Notes
+    -------
+    The random generator must be seeded before (see get_Partition_Class()). The first call runs min_iterations iterations, and
+    then the partition is improved one iteration at a time (starting from the previous membership) until the quality gain or the
+    fraction of moved nodes is below its tolerance, or until the maximum number of iterations for the size of the graph. An
+    iteration that lowers the quality is discarded. The fraction of moved nodes is only computed if the quality gain is above
+    its tolerance and change_tol is positive. With min_iterations=-1, or a maximum not above min_iterations, there is only the
+    first call.
+    The number of iterations, the quality and the reason to stop are added to the profiling node (see functions_profiling) and,
+    with params_d['log'], to LEIDEN_LOG_L.
+    """
+    start = time.perf_counter()
+    if ig_network.vcount() >= params_d['large_vcount']:
+        max_iterations = params_d['max_iterations_large']
+    else:
+        max_iterations = params_d['max_iterations_small']
+    weights = leiden_Weights(ig_network)
+    node_weights = leiden_Node_Weights(ig_network)
+    partition = ig_network.community_leiden(weights=weights, node_weights=node_weights, resolution_parameter=resolution, n_iterations=params_d['min_iterations'],
+                                         initial_membership=initial_membership)
+    first_quality = partition.quality
+    iterations = params_d['min_iterations']
+    change = None
+    stop = 'max_iterations'
+    if iterations < 0:  # igraph iterated until the partition did not change
+        max_iterations = iterations
+        stop = 'converged'
+    while iterations < max_iterations:
+        new_partition = ig_network.community_leiden(weights=weights, node_weights=node_weights, resolution_parameter=resolution, n_iterations=1, initial_membership=partition.membership)
+        iterations += 1
+        gain = new_partition.quality - partition.quality
+        if gain < 0:
+            stop = 'quality'
+            break
+        if gain <= params_d['quality_tol'] * abs(new_partition.quality):
+            partition = new_partition
+            stop = 'quality'
+            break
+        if params_d['change_tol'] > 0:
+            change = membership_Change(partition.membership, new_partition.membership)
+        partition = new_partition
+        if change is not None and change <= params_d['change_tol']:
+            stop = 'membership'
+            break
+    profiling.add_Node_Values(leiden_iterations=iterations)
+    if params_d['log']:
+        LEIDEN_LOG_L.append({'vcount': ig_network.vcount(), 'ecount': ig_network.ecount(), 'resolution': resolution, 'iterations': iterations,
+                             'first_quality': first_quality, 'quality': partition.quality, 'last_change': change, 'stop': stop,
+                             'clusters': len(partition), 'seconds': time.perf_counter() - start})
     return partition
 
+def membership_Change(old_membership, new_membership):
+    """Fraction of the nodes that changed cluster between two memberships
+
+    Notes
+    -------
+    The clusters are renumbered by each call of the Leiden algorithm, so the clusters are matched first: a pair of clusters
+    (old, new) is matched if each one is the cluster with the largest overlap of the other. The nodes outside the matched
+    pairs changed cluster.
+    """
+    old_array = np.asarray(old_membership, dtype=np.int64)
+    new_array = np.asarray(new_membership, dtype=np.int64)
+    n_new = int(new_array.max()) + 1
+    pair_key, count = np.unique(old_array * n_new + new_array, return_counts=True)
+    old_pair, new_pair = pair_key // n_new, pair_key % n_new
+    best_old = np.zeros(int(old_array.max()) + 1, dtype=np.int64)
+    best_new = np.zeros(n_new, dtype=np.int64)
+    np.maximum.at(best_old, old_pair, count)
+    np.maximum.at(best_new, new_pair, count)
+    matched = np.flatnonzero((count == best_old[old_pair]) & (count == best_new[new_pair]))
+    matched = matched[np.unique(old_pair[matched], return_index=True)[1]]  # With ties, one match per cluster
+    matched = matched[np.unique(new_pair[matched], return_index=True)[1]]
+    return 1.0 - float(count[matched].sum()) / len(new_array)
+
+def benchmark_Leiden_Modes(ig_network, resolution, resolution_factor=3.0, clusters_per_level=10, settings_l=None, random_seed=0):
+    """Compares the time and the quality of the default and the adaptive Leiden on the top two levels of the tree
+
+    Parameters
+    ----------
+    ig_network : igraph.Graph object
+        Network of the first level (e.g. cs['igraph_network']).
+
+    resolution : float
+        Resolution of the first level.
+
+    resolution_factor : float, optional
+        Factor of the resolution of the second level.
+
+    clusters_per_level : int, optional
+        The graphs of the second level are the merged clusters of the first level (as in the tree).
+
+    settings_l : list of dict, optional
+        Parameters of set_Leiden_Params() of each adaptive setting. By default a few settings with different tolerances and caps.
+
+    random_seed : int, optional
+        Parameter of get_Partition_Class().
+
+    Returns
+    -------
+    benchmark_l : list of dict
+        One record per setting and level: the setting ('default' is the default mode), the level, the number of graphs, the
+        seconds, the total quality, the quality gain over the default mode, the mean number of iterations (-1 with
+        min_iterations=-1, igraph does not report them) and the minimum NMI with the partition of the default mode (1.0 is the
+        same partition).
+
+    Notes
+    -------
+    The parameters of the Leiden algorithm and LEIDEN_LOG_L are restored at the end. The second level graphs are created from the default partition,
+    so all the settings cluster the same graphs.
+    """
+    if settings_l is None:
+        settings_l = [{'adaptive': True, 'min_iterations': 1, 'max_iterations_large': 1, 'max_iterations_small': 1},
+                      {'adaptive': True, 'min_iterations': -1},
+                      {'adaptive': True, 'min_iterations': 1, 'quality_tol': 1e-4, 'change_tol': 1e-3},
+                      {'adaptive': True},
+                      {'adaptive': True, 'quality_tol': 0.0, 'change_tol': 0.0, 'max_iterations_large': 20}]
+    saved_params_d = dict(LEIDEN_PARAMS_D)
+    saved_log_l = list(LEIDEN_LOG_L)
+    try:
+        set_Leiden_Params()
+        partition = get_Partition_Class(ig_network, resolution, random_seed)
+        merging_data = merging.join_Clusters(c_Cluster_D(partition), c_Connections_D(partition), clusters_per_level, resolution)
+        level_graph_d = {1: [ig_network], 2: [ig_network.subgraph(ig_network.vs.select(name_in=nodes)) for nodes in merging_data['jclu_d'].values()]}
+        level_resolution_d = {1: resolution, 2: resolution*resolution_factor}
+        default_d = {}
+        benchmark_l = []
+        for setting_i, setting_d in enumerate([{'adaptive': False}] + settings_l):
+            set_Leiden_Params(**dict(setting_d, log=True))
+            for level in level_graph_d:
+                reset_Leiden_Log()
+                record = {'setting': 'default' if setting_i == 0 else setting_d, 'level': level, 'graphs': len(level_graph_d[level]),
+                          'seconds': 0.0, 'quality': 0.0, 'min_nmi': 1.0}
+                membership_l = []
+                for graph in level_graph_d[level]:
+                    start = time.perf_counter()
+                    partition = get_Partition_Class(graph, level_resolution_d[level], random_seed)
+                    record['seconds'] += time.perf_counter() - start
+                    record['quality'] += partition.quality
+                    membership_l.append(partition.membership)
+                if setting_i == 0:
+                    default_d[level] = {'quality': record['quality'], 'membership_l': membership_l, 'seconds': record['seconds']}
+                    record['mean_iterations'] = 2  # Default of igraph
+                else:
+                    record['mean_iterations'] = float(np.mean([x['iterations'] for x in LEIDEN_LOG_L]))
+                    record['min_nmi'] = min([igraph.compare_communities(x, y, method='nmi') for x, y in zip(default_d[level]['membership_l'], membership_l)])
+                record['quality_gain'] = record['quality'] - default_d[level]['quality']
+                record['time_ratio'] = record['seconds'] / default_d[level]['seconds']
+                benchmark_l.append(record)
+    finally:
+        LEIDEN_PARAMS_D.clear()
+        LEIDEN_PARAMS_D.update(saved_params_d)
+        LEIDEN_LOG_L[:] = saved_log_l
+    return benchmark_l
+
+def benchmark_Edge_Normalization(parsed_network, resolution, resolution_factor=3.0, clusters_per_level=10, self_loops='drop', random_seed=0):
+    """Compares the time of the Leiden algorithm and of the merging of the clusters before and after the normalization of the edges
+
+    Parameters
+    ----------
+    parsed_network : set of tuple
+        Edges of the network (see functions_reading.parse_Network()).
+
+    resolution : float
+        Resolution of the first level.
+
+    resolution_factor : float, optional
+        Factor of the resolution of the second level.
+
+    clusters_per_level : int, optional
+        Parameter of functions_merging.join_Clusters().
+
+    self_loops : str, optional
+        Parameter of functions_reading.normalize_Network().
+
+    random_seed : int, optional
+        Parameter of get_Partition_Class().
+
+    Returns
+    -------
+    benchmark_d : dict
+        'edge_report': the report of functions_reading.normalize_Network(). 'records': one record per network ('multigraph' is
+        create_Igraph_Network(), 'normalized' is create_Weighted_Igraph_Network()) and level, with the number of graphs, edges and
+        clusters, the seconds of the creation of the graph (level 1), of the Leiden algorithm and of the merging (c_Cluster_D(),
+        c_Connections_D() and join_Clusters()), and the quality. 'nmi': NMI of the first level partitions of both networks.
+
+    Notes
+    -------
+    The second level graphs of each network are created from its own first level, as in the tree.
+    """
+    benchmark_d = {'records': []}
+    membership_d = {}
+    for name in ['multigraph', 'normalized']:
+        start = time.perf_counter()
+        if name == 'multigraph':
+            ig_network = reading.create_Igraph_Network(parsed_network)
+        else:
+            weighted_network, benchmark_d['edge_report'] = reading.normalize_Network(parsed_network, self_loops=self_loops)
+            ig_network = reading.create_Weighted_Igraph_Network(weighted_network)
+            del weighted_network
+        build_seconds = time.perf_counter() - start
+        graph_l = [ig_network]
+        level_resolution = resolution
+        for level in [1, 2]:
+            record = {'network': name, 'level': level, 'graphs': len(graph_l), 'edges': sum([g.ecount() for g in graph_l]),
+                      'clusters': 0, 'leiden_seconds': 0.0, 'merge_seconds': 0.0, 'quality': 0.0}
+            if level == 1:
+                record['build_seconds'] = build_seconds
+            children_l = []
+            for graph in graph_l:
+                start = time.perf_counter()
+                partition = get_Partition_Class(graph, level_resolution, random_seed)
+                record['leiden_seconds'] += time.perf_counter() - start
+                record['quality'] += partition.quality
+                record['clusters'] += len(partition)
+                start = time.perf_counter()
+                merging_data = merging.join_Clusters(c_Cluster_D(partition), c_Connections_D(partition), clusters_per_level, level_resolution)
+                record['merge_seconds'] += time.perf_counter() - start
+                if level == 1:
+                    membership_d[name] = dict(zip(graph.vs['name'], partition.membership))
+                    children_l = [graph.subgraph(graph.vs.select(name_in=nodes)) for nodes in merging_data['jclu_d'].values()]
+            benchmark_d['records'].append(record)
+            graph_l = children_l
+            level_resolution = level_resolution*resolution_factor
+    common_l = [x for x in membership_d['multigraph'] if x in membership_d['normalized']]  # Without the nodes that only had self-loops
+    benchmark_d['nmi'] = igraph.compare_communities([membership_d['multigraph'][x] for x in common_l],
+                                                    [membership_d['normalized'][x] for x in common_l], method='nmi')
+    return benchmark_d
+
+def benchmark_Coarsening(ig_network, resolution, clusters_per_level=10, random_seed=0):
+    """Compares the clustering of the first level with and without the coarsening of the pendant trees
+
+    Parameters
+    ----------
+    ig_network : igraph.Graph object
+        Network of the first level (e.g. cs['igraph_network']).
+
+    resolution : float
+        Resolution of the first level.
+
+    clusters_per_level : int, optional
+        Parameter of functions_merging.join_Clusters().
+
+    random_seed : int, optional
+        Parameter of get_Partition_Class().
+
+    Returns
+    -------
+    benchmark_d : dict
+        'records': one record per run ('full' and 'coarsened') with the seconds of the coarsening, of the Leiden algorithm and of
+        the merging (c_Cluster_D(), c_Connections_D() and join_Clusters()), the number of Leiden clusters, of merged clusters and
+        of removed clusters, the CPM quality in ig_network and, for the coarsened run, the size of the core.
+        'quality_ratio': quality of the coarsened partition / quality of the full partition. 'nmi': NMI of both partitions.
+        'anchored': True if every contracted vertex is in the cluster of its anchor. 'merged_nmi': NMI of the clusters after
+        join_Clusters() (the removed clusters are one more group).
+
+    Notes
+    -------
+    Both runs call the Leiden algorithm directly (leiden_Partition()), so set_Coarsening() does not change them.
+    """
+    benchmark_d = {'records': []}
+    membership_d = {}
+    for name in ['full', 'coarsened']:
+        record = {'run': name, 'coarsen_seconds': 0.0}
+        igraph.set_random_number_generator(random)
+        random.seed(random_seed)
+        start = time.perf_counter()
+        if name == 'full':
+            partition = leiden_Partition(ig_network, resolution)
+        else:
+            coarse_d = coarsening.c_Coarse_D(ig_network)
+            record['coarsen_seconds'] = time.perf_counter() - start
+            record['vcount'] = coarse_d['vcount']
+            record['core_vcount'] = coarse_d['core_vcount']
+            record['core_ecount'] = coarse_d['core'].ecount()
+            start = time.perf_counter()
+            partition = coarsening.expand_Partition(ig_network, coarse_d, leiden_Partition(coarse_d['core'], resolution), resolution, weights=leiden_Weights(ig_network))
+        record['leiden_seconds'] = time.perf_counter() - start
+        record['quality'] = coarsening.cpm_Quality(ig_network, partition.membership, resolution, weights=leiden_Weights(ig_network))
+        start = time.perf_counter()
+        clu_d = c_Cluster_D(partition)
+        merging_data = merging.join_Clusters(clu_d, c_Connections_D(partition), clusters_per_level, resolution)
+        record['merge_seconds'] = time.perf_counter() - start
+        record['leiden_clusters'] = len(clu_d)
+        record['clusters'] = len(merging_data['jclu_d'])
+        record['removed_clusters'] = len(merging_data['jrem_d'])
+        record['total_seconds'] = record['coarsen_seconds'] + record['leiden_seconds'] + record['merge_seconds']
+        membership_d[name] = partition.membership
+        merged_d = {}
+        for group, cluster_d in enumerate([merging_data['jclu_d'], {'removed': set().union(*merging_data['jrem_d'].values())}]):
+            for cluster_id, nodes in cluster_d.items():
+                for node in nodes:
+                    merged_d[node] = (group, cluster_id)
+        label_d = {}
+        membership_d[name + '_merged'] = [label_d.setdefault(merged_d[x], len(label_d)) for x in ig_network.vs['name']]
+        benchmark_d['records'].append(record)
+    benchmark_d['quality_ratio'] = benchmark_d['records'][1]['quality'] / benchmark_d['records'][0]['quality']
+    benchmark_d['nmi'] = igraph.compare_communities(membership_d['full'], membership_d['coarsened'], method='nmi')
+    benchmark_d['merged_nmi'] = igraph.compare_communities(membership_d['full_merged'], membership_d['coarsened_merged'], method='nmi')
+    coarsened_array = np.asarray(membership_d['coarsened'])
+    benchmark_d['anchored'] = bool((coarsened_array == coarsened_array[coarse_d['core_vertices']][coarse_d['anchor']]).all())
+    return benchmark_d
+
+@profiling.timed()
 def c_Cluster_D(partition):
     """Creates clusters dictionary
 
@@ -60,6 +558,7 @@ def c_Cluster_D(partition):
             cluster_d[cluster_i].add(node_name)
     return cluster_d
 
+@profiling.timed()
 def c_Connections_D(partition):
     """Creates connections dictionary
 
@@ -79,7 +578,8 @@ def c_Connections_D(partition):
     -------
     The function uses igraph.clustering.VertexClustering.cluster_graph() to efficienly obtain the number of edges between the clusters.
     The parameter cluster_graph(combine_edges=sum) sums the attributes of the edges. The atrribute of the edges is 'weight', and
-    the value is '1'. Therefore, the attrribute 'weight' will tell you hom many edges there were originaly.
+    the value is '1'. Therefore, the attrribute 'weight' will tell you hom many edges there were originaly. In a normalized network
+    (see functions_reading.normalize_Network()) the weight is the multiplicity of the edge, so the sum is the same.
     The index of the clusters is the same as in the c_Cluster_D function output. It becomes the de-facto cluster name.
     c_1_i = Cluster 1 index
     c_2_i = Cluster 2 index
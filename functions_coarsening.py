@@ -0,0 +1,118 @@
+import numpy as np
+import igraph
+
+def c_Coarse_D(ig_network):
+    """Contracts the pendant trees of a graph into their anchor vertex
+
+    Parameters
+    ----------
+    ig_network : igraph.Graph object
+        Graph to coarsen.
+
+    Returns
+    -------
+    coarse_d : dict
+        - 'core': graph induced by the vertices that are not contracted, in the same order as in ig_network. The vertex
+          attribute 'node_weight' is the number of vertices of ig_network that each core vertex represents (itself included).
+        - 'core_vertices': indices in ig_network of the core vertices.
+        - 'anchor': for each vertex of ig_network, the index in the core of the vertex it is contracted into (itself if it
+          is in the core).
+        - 'tree_weight': weight (or number) of the edges of ig_network with a contracted vertex. They are always inside a cluster.
+        - 'vcount', 'core_vcount' and 'contracted_vertices'.
+
+    Notes
+    -------
+    A pendant vertex (only one neighbor, not counting loops and repeated edges) is contracted into its neighbor, and so on
+    until no pendant vertex is left, so the dangling chains and trees are contracted into the vertex that joins them to the
+    rest of the graph. A component that is a tree is contracted into one vertex. The chains between two core vertices are
+    kept, because their vertices can belong to the cluster of either end.
+    With the CPM quality of the Leiden algorithm and the node weights, the quality of a partition of the core is the quality of
+    the expanded partition of ig_network minus a constant (the tree edges), so clustering the core is the same as clustering
+    ig_network with the constraint that each tree goes to the cluster of its anchor (see expand_Membership()).
+    """
+    n = ig_network.vcount()
+    edge_array = np.array(ig_network.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+    if 'weight' in ig_network.es.attributes():
+        weight_array = np.array(ig_network.es['weight'], dtype=float)
+    else:
+        weight_array = np.ones(len(edge_array))
+    pair_array = np.sort(edge_array[edge_array[:, 0] != edge_array[:, 1]], axis=1)
+    key_array = np.unique(pair_array[:, 0] * n + pair_array[:, 1])  # Each neighbor once
+    pair_array = np.stack([key_array // n, key_array % n], axis=1)
+    degree_l = np.bincount(pair_array.ravel(), minlength=n).tolist()
+    xor_array = np.zeros(n, dtype=np.int64)  # XOR of the neighbors left, so the only neighbor of a pendant vertex is xor_l[v]
+    np.bitwise_xor.at(xor_array, pair_array[:, 0], pair_array[:, 1])
+    np.bitwise_xor.at(xor_array, pair_array[:, 1], pair_array[:, 0])
+    xor_l = xor_array.tolist()
+    del key_array, pair_array, xor_array
+    parent_l = list(range(n))
+    removal_l = []
+    stack = [v for v in range(n) if degree_l[v] == 1]
+    while len(stack) > 0:
+        v = stack.pop()
+        if degree_l[v] != 1:  # Already contracted (0) or no longer pendant
+            continue
+        u = xor_l[v]
+        parent_l[v] = u
+        removal_l.append(v)
+        degree_l[v] = 0
+        degree_l[u] -= 1
+        xor_l[u] ^= v
+        if degree_l[u] == 1:
+            stack.append(u)
+    removed = np.zeros(n, dtype=bool)
+    removed[removal_l] = True
+    root_l = list(range(n))
+    for v in reversed(removal_l):  # The parent of a vertex is removed after it, or never
+        root_l[v] = root_l[parent_l[v]]
+    root_array = np.array(root_l, dtype=np.int64)
+    del root_l, parent_l, degree_l, xor_l
+    core_vertices = np.flatnonzero(~removed)
+    core_index_array = np.full(n, -1, dtype=np.int64)
+    core_index_array[core_vertices] = np.arange(len(core_vertices))
+    core = ig_network.subgraph(core_vertices.tolist())
+    core.vs['node_weight'] = np.bincount(root_array, minlength=n)[core_vertices].tolist()
+    tree_mask = removed[edge_array[:, 0]] | removed[edge_array[:, 1]]
+    coarse_d = {'core': core, 'core_vertices': core_vertices, 'anchor': core_index_array[root_array],
+                'tree_weight': float(weight_array[tree_mask].sum()), 'vcount': n, 'core_vcount': len(core_vertices),
+                'contracted_vertices': len(removal_l)}
+    return coarse_d
+
+def expand_Membership(coarse_d, core_membership):
+    """Membership of the vertices of the original graph from the membership of the core (each vertex goes to the cluster of its anchor)"""
+    return np.asarray(core_membership)[coarse_d['anchor']].tolist()
+
+def cpm_Quality(ig_network, membership, resolution, weights=None):
+    """CPM quality of a partition as reported by the Leiden algorithm of igraph, (2*internal weight - resolution*sum of the squared
+    cluster sizes) / (2*total weight)
+
+    Parameters
+    ----------
+    weights : str, optional
+        Edge attribute with the weights. By default each edge counts 1.
+    """
+    membership_array = np.asarray(membership)
+    edge_array = np.array(ig_network.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+    if weights is None:
+        weight_array = np.ones(len(edge_array))
+    else:
+        weight_array = np.array(ig_network.es[weights], dtype=float)
+    internal = weight_array[membership_array[edge_array[:, 0]] == membership_array[edge_array[:, 1]]].sum()
+    size_array = np.bincount(membership_array)
+    total = weight_array.sum()
+    if total == 0:
+        return 0.0
+    return float((2*internal - resolution*(size_array.astype(float)**2).sum()) / (2*total))
+
+def expand_Partition(ig_network, coarse_d, core_partition, resolution, weights=None):
+    """Partition of the original graph from a partition of its core
+
+    Returns
+    -------
+    partition : igraph.clustering.VertexClustering object
+        Partition of ig_network. The quality is the CPM quality in ig_network (see cpm_Quality()), so it can be compared with the
+        quality of a partition of the Leiden algorithm in ig_network.
+    """
+    membership = expand_Membership(coarse_d, core_partition.membership)
+    quality = cpm_Quality(ig_network, membership, resolution, weights=weights)
+    return igraph.VertexClustering(ig_network, membership, params={'quality': quality})
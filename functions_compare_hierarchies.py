@@ -0,0 +1,226 @@
+import itertools
+import numpy as np
+
+def level_Membership_Iter(level_data, include_removed=True):
+    """Yields the membership of each level of a tree, one level at a time
+
+    Parameters
+    ----------
+    level_data : dict
+        Tree of clusters (cs['level_data']).
+
+    include_removed : bool, optional
+        If True the removed clusters of join_Clusters() (jrem_d) are clusters of their level too, otherwise their documents
+        are left out of the level.
+
+    Yields
+    ------
+    level : int
+        Level of the tree (1 is the first level).
+
+    node_array : numpy.ndarray
+        Net IDs of the documents of the level.
+
+    label_array : numpy.ndarray
+        Cluster of each document. The clusters of different branches have different labels.
+
+    Notes
+    -------
+    The levels are created from the top, keeping only the branches of the current level, so only one level of arrays is in
+    memory. The levels under the first level only contain the documents of the positive clusters that were expanded. In a lazy
+    tree only the levels that were created are used.
+    """
+    frontier_l = [level_data]
+    level = 1
+    while len(frontier_l) > 0:
+        node_part_l = []
+        label_part_l = []
+        n_labels = 0
+        next_frontier_l = []
+        for level_data in frontier_l:
+            cluster_d_l = [level_data['merging_data']['jclu_d']]
+            if include_removed:
+                cluster_d_l.append(level_data['merging_data']['jrem_d'])
+            for cluster_d in cluster_d_l:
+                for nodes in cluster_d.values():
+                    node_part_l.append(np.fromiter(nodes, dtype=np.int64, count=len(nodes)))
+                    label_part_l.append(np.full(len(nodes), n_labels, dtype=np.int64))
+                    n_labels += 1
+            if 'children_clusters' in level_data:
+                next_frontier_l += [child for child in level_data['children_clusters'].values() if child is not None]
+        if len(node_part_l) > 0:
+            yield level, np.concatenate(node_part_l), np.concatenate(label_part_l)
+        else:
+            yield level, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        del node_part_l, label_part_l
+        frontier_l = next_frontier_l
+        level += 1
+
+def map_Nodes(node_array, label_array, node_map):
+    """Translates the net IDs of a membership with a node map (e.g. functions_warm_start.c_Node_Map_D()). The documents that are
+    not in the map are left out. The map must be injective, otherwise two documents would become the same document"""
+    key_array = np.fromiter(node_map.keys(), dtype=np.int64, count=len(node_map))
+    value_array = np.fromiter(node_map.values(), dtype=np.int64, count=len(node_map))
+    assert (len(np.unique(value_array)) == len(value_array)), 'The node map is not injective (see functions_warm_start.c_Node_Map_D())'
+    order = np.argsort(key_array)
+    key_array, value_array = key_array[order], value_array[order]
+    index_array = np.searchsorted(key_array, node_array)
+    index_array[index_array == len(key_array)] = 0
+    found = key_array[index_array] == node_array if len(key_array) > 0 else np.zeros(len(node_array), dtype=bool)
+    return value_array[index_array[found]], label_array[found]
+
+def c_Contingency_D(node_array_1, label_array_1, node_array_2, label_array_2):
+    """Creates the sparse contingency matrix of two memberships over their shared documents
+
+    Parameters
+    ----------
+    node_array_1, label_array_1 : numpy.ndarray
+        Membership of the first partition (see level_Membership_Iter()). A document must appear once.
+
+    node_array_2, label_array_2 : numpy.ndarray
+        Membership of the second partition.
+
+    Returns
+    -------
+    contingency_d : dict
+        'row', 'col' and 'count': the non-zero cells (number of shared documents in cluster row of the first partition and in
+        cluster col of the second one). 'row_sum' and 'col_sum': size of each cluster restricted to the shared documents.
+        'n': number of shared documents. 'n_1' and 'n_2': number of documents of each partition.
+
+    Notes
+    -------
+    Only the non-zero cells are created (np.unique of the pairs of labels), so the memory is linear in the number of documents
+    and not quadratic in the number of clusters.
+    """
+    shared_array, index_array_1, index_array_2 = np.intersect1d(node_array_1, node_array_2, assume_unique=True, return_indices=True)
+    row_label_array, row_array = np.unique(label_array_1[index_array_1], return_inverse=True)
+    col_label_array, col_array = np.unique(label_array_2[index_array_2], return_inverse=True)
+    n_cols = max(1, len(col_label_array))
+    cell_array, count_array = np.unique(row_array.reshape(-1).astype(np.int64) * n_cols + col_array.reshape(-1), return_counts=True)
+    contingency_d = {'row': cell_array // n_cols, 'col': cell_array % n_cols, 'count': count_array.astype(np.int64),
+                     'row_sum': np.bincount(row_array.reshape(-1), minlength=len(row_label_array)),
+                     'col_sum': np.bincount(col_array.reshape(-1), minlength=len(col_label_array)),
+                     'row_label': row_label_array, 'col_label': col_label_array,
+                     'n': len(shared_array), 'n_1': len(node_array_1), 'n_2': len(node_array_2)}
+    return contingency_d
+
+def entropy(count_array, n):
+    """Entropy (natural logarithm) of a partition given the size of its clusters"""
+    p_array = count_array[count_array > 0] / n
+    return float(-(p_array * np.log(p_array)).sum())
+
+def nmi_From_Contingency(contingency_d):
+    """Normalized mutual information, 2*I(1, 2) / (H(1) + H(2)), as method='nmi' of igraph.compare_communities(). It is 1 if both
+    partitions are the same (also if both have only one cluster)"""
+    n = contingency_d['n']
+    if n == 0:
+        return float('nan')
+    h_1 = entropy(contingency_d['row_sum'], n)
+    h_2 = entropy(contingency_d['col_sum'], n)
+    if h_1 + h_2 == 0:
+        return 1.0
+    count_array = contingency_d['count']
+    mutual_information = (count_array / n * np.log(count_array * n / (contingency_d['row_sum'][contingency_d['row']] * contingency_d['col_sum'][contingency_d['col']].astype(float)))).sum()
+    return float(2 * mutual_information / (h_1 + h_2))
+
+def ari_From_Contingency(contingency_d):
+    """Adjusted Rand index (Hubert and Arabie), as method='adjusted_rand' of igraph.compare_communities()"""
+    n = contingency_d['n']
+    if n < 2:
+        return float('nan')
+    pairs = lambda x: (x * (x - 1) / 2.0).sum()
+    sum_cells = pairs(contingency_d['count'].astype(float))
+    sum_rows = pairs(contingency_d['row_sum'].astype(float))
+    sum_cols = pairs(contingency_d['col_sum'].astype(float))
+    expected = sum_rows * sum_cols / (n * (n - 1) / 2.0)
+    maximum = (sum_rows + sum_cols) / 2.0
+    if maximum == expected:
+        return 1.0
+    return float((sum_cells - expected) / (maximum - expected))
+
+def best_Match_Jaccard(contingency_d):
+    """Best-match Jaccard of each cluster of both partitions
+
+    Returns
+    -------
+    jaccard_1 : numpy.ndarray
+        For each cluster of the first partition (in the order of contingency_d['row_label']), the largest Jaccard index
+        |A and B| / |A or B| with a cluster B of the second partition, over the shared documents.
+
+    jaccard_2 : numpy.ndarray
+        The same for the clusters of the second partition.
+    """
+    count_array = contingency_d['count'].astype(float)
+    jaccard_array = count_array / (contingency_d['row_sum'][contingency_d['row']] + contingency_d['col_sum'][contingency_d['col']] - count_array)
+    jaccard_1 = np.zeros(len(contingency_d['row_sum']))
+    jaccard_2 = np.zeros(len(contingency_d['col_sum']))
+    np.maximum.at(jaccard_1, contingency_d['row'], jaccard_array)
+    np.maximum.at(jaccard_2, contingency_d['col'], jaccard_array)
+    return jaccard_1, jaccard_2
+
+def c_Level_Comparison_D(level, contingency_d):
+    """Summary of the comparison of one level (see compare_Hierarchies())"""
+    jaccard_1, jaccard_2 = best_Match_Jaccard(contingency_d)
+    record = {'level': level, 'documents_1': contingency_d['n_1'], 'documents_2': contingency_d['n_2'], 'shared_documents': contingency_d['n'],
+              'clusters_1': len(jaccard_1), 'clusters_2': len(jaccard_2), 'nmi': nmi_From_Contingency(contingency_d),
+              'ari': ari_From_Contingency(contingency_d)}
+    for name, jaccard_array, size_array in [('1', jaccard_1, contingency_d['row_sum']), ('2', jaccard_2, contingency_d['col_sum'])]:
+        record['mean_jaccard_' + name] = float(jaccard_array.mean()) if len(jaccard_array) > 0 else float('nan')
+        record['weighted_jaccard_' + name] = float((jaccard_array * size_array).sum() / size_array.sum()) if size_array.sum() > 0 else float('nan')
+        record['matched_' + name] = float((jaccard_array >= 0.5).mean()) if len(jaccard_array) > 0 else float('nan')  # A match >= 0.5 is unique
+    return record
+
+def compare_Hierarchies(level_data_1, level_data_2, node_map=None, max_level=None, include_removed=True, return_jaccard=False):
+    """Compares two trees of clusters level by level (e.g. two years, two seeds or two settings)
+
+    Parameters
+    ----------
+    level_data_1 : dict
+        First tree (cs['level_data']).
+
+    level_data_2 : dict
+        Second tree.
+
+    node_map : dict, optional
+        Net IDs of the first tree -> net IDs of the second tree (e.g. functions_warm_start.c_Node_Map_D() between two years).
+        By default the trees share the IDs.
+
+    max_level : int, optional
+        Last level to compare. By default all the levels of both trees.
+
+    include_removed : bool, optional
+        Parameter of level_Membership_Iter().
+
+    return_jaccard : bool, optional
+        If True each record also has the best-match Jaccard of each cluster ('jaccard_1' and 'jaccard_2').
+
+    Returns
+    -------
+    comparison_l : list of dict
+        One record per level with the number of documents of each tree and shared, the number of clusters (of the shared
+        documents), the NMI, the ARI and the best-match Jaccard of the clusters of each tree: the mean, the mean weighted by
+        size and the fraction of clusters with a match of at least 0.5.
+
+    Notes
+    -------
+    Each level is compared over the documents that are in the level in both trees, so in the lower levels (which only have the
+    positive branches) the coverage ('shared_documents') matters as much as the measures. A level that only one tree has is
+    compared with an empty membership (no shared documents, the measures are nan). The levels are streamed (see
+    level_Membership_Iter()), so the memory is the memory of one level of each tree.
+    """
+    comparison_l = []
+    iter_1 = level_Membership_Iter(level_data_1, include_removed=include_removed)
+    iter_2 = level_Membership_Iter(level_data_2, include_removed=include_removed)
+    empty = (None, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))  # Levels that one tree does not have
+    for (level_1, node_array_1, label_array_1), (level_2, node_array_2, label_array_2) in itertools.zip_longest(iter_1, iter_2, fillvalue=empty):
+        level = level_1 if level_1 is not None else level_2
+        if max_level is not None and level > max_level:
+            break
+        if node_map is not None:
+            node_array_1, label_array_1 = map_Nodes(node_array_1, label_array_1, node_map)
+        contingency_d = c_Contingency_D(node_array_1, label_array_1, node_array_2, label_array_2)
+        record = c_Level_Comparison_D(level, contingency_d)
+        if return_jaccard:
+            record['jaccard_1'], record['jaccard_2'] = best_Match_Jaccard(contingency_d)
+        comparison_l.append(record)
+    return comparison_l
@@ -0,0 +1,164 @@
+import numpy as np
+
+POPCOUNT_TABLE = np.array([bin(x).count('1') for x in range(256)], dtype=np.uint8)  # Number of 1 bits of each byte
+VENN_COUNT_NAMES = ('positives', 'b_retrieved', 's_retrieved', 'b_positives', 'b_negatives', 's_positives', 's_negatives',
+                    'positives_intersection', 'negatives_intersection', 'b_positives_not_in_s', 'b_negatives_not_in_s',
+                    's_positives_not_in_b', 's_negatives_not_in_b')  # The sets of Topic_Retrieve_Data in results.ipynb
+
+def c_Bitset(id_l, n_bits):
+    """Creates a set of documents as a bit array
+
+    Parameters
+    ----------
+    id_l : iterable of int
+        Net IDs of the documents (non-negative integers lower than n_bits). It can be a numpy array.
+
+    n_bits : int
+        Size of the space of net IDs (the maximum net ID plus one). All the sets that are compared must have the same n_bits.
+
+    Returns
+    -------
+    bitset : numpy.ndarray
+        Array of uint8 with n_bits bits (the last byte is padded with zeros). The bit of the net ID x is the bit x % 8 of the byte
+        x // 8 (little bit order, as numpy.packbits(bitorder='little')).
+
+    Notes
+    -------
+    A set of net IDs of the whole network needs n_bits / 8 bytes, much less than a Python set of the same documents when the set
+    is large, and the intersection and difference of two sets are operations over the bytes instead of over the elements.
+    """
+    id_array = id_Array(id_l)
+    if len(id_array) > 0:
+        assert (id_array.min() >= 0 and id_array.max() < n_bits), 'The net IDs must be between 0 and n_bits - 1'
+    bool_array = np.zeros(n_bits, dtype=bool)
+    bool_array[id_array] = True  # Repeated IDs are set once
+    bitset = np.packbits(bool_array, bitorder='little')
+    return bitset
+
+def id_Array(id_l):
+    """Converts net IDs (set, list or numpy array) to a numpy array of int64"""
+    if isinstance(id_l, np.ndarray):
+        return id_l.astype(np.int64, copy=False)
+    return np.fromiter(id_l, dtype=np.int64, count=len(id_l))
+
+def bitset_And(bitset_a, bitset_b):
+    """Intersection of two sets"""
+    return np.bitwise_and(bitset_a, bitset_b)
+
+def bitset_Or(bitset_a, bitset_b):
+    """Union of two sets"""
+    return np.bitwise_or(bitset_a, bitset_b)
+
+def bitset_Andnot(bitset_a, bitset_b):
+    """Difference of two sets (the documents of bitset_a that are not in bitset_b)"""
+    return np.bitwise_and(bitset_a, np.invert(bitset_b))
+
+def bitset_Count(bitset):
+    """Number of documents of a set"""
+    return int(POPCOUNT_TABLE[bitset].sum(dtype=np.int64))
+
+def bitset_And_Count(bitset_a, bitset_b):
+    """Number of documents of the intersection of two sets"""
+    return bitset_Count(np.bitwise_and(bitset_a, bitset_b))
+
+def bitset_Ids(bitset):
+    """Net IDs of the documents of a set, as a sorted array"""
+    return np.flatnonzero(np.unpackbits(bitset, bitorder='little'))
+
+def c_Venn_Counts_D(metrics_d):
+    """Counts the documents of each region of the Venn diagram of positives, Boolean retrieved and cluster retrieved, for all the
+    years, topics and betas
+
+    Parameters
+    ----------
+    metrics_d : dict
+        Dictionary of results.ipynb. metrics_d[year][topic] contains the positives ('condition_postitive_ids'), the documents
+        retrieved by the Boolean query ('boolean_retrieved_ids') and, for each beta name, the documents of the selected cluster
+        (metrics_d[year][topic]['betas'][beta_name]['scimacro_retrieved_ids']). All of them are net IDs.
+
+    Returns
+    -------
+    venn_d : dict
+        venn_d[year][topic][beta_name] is a dictionary with the size of each set of Topic_Retrieve_Data (see VENN_COUNT_NAMES).
+
+    Notes
+    -------
+    The sets of a topic that are the same for every beta (positives, Boolean retrieved, Boolean positives and Boolean negatives)
+    are created once, so for each beta there is only one new bitset (the cluster) and three intersections. The rest of the regions
+    are obtained by subtraction:
+    s_positives = |S & P|, positives_intersection = |S & B & P|, negatives_intersection = |S & B_negatives|,
+    b_positives_not_in_s = |B_positives| - |S & B & P|, s_positives_not_in_b = |S & P| - |S & B & P|, etc.
+    The size of the bitsets of a topic is the maximum net ID of the topic plus one.
+    """
+    venn_d = {}
+    for year in metrics_d:
+        venn_d[year] = {}
+        for topic in metrics_d[year]:
+            topic_d = metrics_d[year][topic]
+            p_array = id_Array(topic_d['condition_postitive_ids'])
+            b_array = id_Array(topic_d['boolean_retrieved_ids'])
+            s_array_d = {beta_name: id_Array(topic_d['betas'][beta_name]['scimacro_retrieved_ids']) for beta_name in topic_d['betas']}
+            n_bits = max([int(x.max()) + 1 for x in [p_array, b_array] + list(s_array_d.values()) if len(x) > 0] + [0])
+            p_bitset = c_Bitset(p_array, n_bits)
+            b_bitset = c_Bitset(b_array, n_bits)
+            bp_bitset = bitset_And(b_bitset, p_bitset)
+            bn_bitset = bitset_Andnot(b_bitset, p_bitset)
+            p_count = bitset_Count(p_bitset)
+            b_count = bitset_Count(b_bitset)
+            bp_count = bitset_Count(bp_bitset)
+            bn_count = b_count - bp_count
+            venn_d[year][topic] = {}
+            for beta_name in s_array_d:
+                s_bitset = c_Bitset(s_array_d[beta_name], n_bits)
+                s_count = bitset_Count(s_bitset)
+                sp_count = bitset_And_Count(s_bitset, p_bitset)
+                sbp_count = bitset_And_Count(s_bitset, bp_bitset)
+                sbn_count = bitset_And_Count(s_bitset, bn_bitset)
+                sn_count = s_count - sp_count
+                counts = {'positives': p_count, 'b_retrieved': b_count, 's_retrieved': s_count,
+                          'b_positives': bp_count, 'b_negatives': bn_count, 's_positives': sp_count, 's_negatives': sn_count,
+                          'positives_intersection': sbp_count, 'negatives_intersection': sbn_count,
+                          'b_positives_not_in_s': bp_count - sbp_count, 'b_negatives_not_in_s': bn_count - sbn_count,
+                          's_positives_not_in_b': sp_count - sbp_count, 's_negatives_not_in_b': sn_count - sbn_count}
+                venn_d[year][topic][beta_name] = counts
+    return venn_d
+
+def venn_Counts_With_Sets(positives, b_retrieved, s_retrieved):
+    """Counts the regions of the Venn diagram with Python sets, as Topic_Retrieve_Data in results.ipynb. It is used by
+    check_Venn_Counts()"""
+    positives = set(positives)
+    b_retrieved = set(b_retrieved)
+    s_retrieved = set(s_retrieved)
+    b_positives = b_retrieved.intersection(positives)
+    b_negatives = b_retrieved.difference(positives)
+    s_positives = s_retrieved.intersection(positives)
+    s_negatives = s_retrieved.difference(positives)
+    counts = {'positives': len(positives), 'b_retrieved': len(b_retrieved), 's_retrieved': len(s_retrieved),
+              'b_positives': len(b_positives), 'b_negatives': len(b_negatives), 's_positives': len(s_positives),
+              's_negatives': len(s_negatives),
+              'positives_intersection': len(b_positives.intersection(s_positives)),
+              'negatives_intersection': len(b_negatives.intersection(s_negatives)),
+              'b_positives_not_in_s': len(b_positives.difference(s_retrieved)),
+              'b_negatives_not_in_s': len(b_negatives.difference(s_retrieved)),
+              's_positives_not_in_b': len(s_positives.difference(b_retrieved)),
+              's_negatives_not_in_b': len(s_negatives.difference(b_retrieved))}
+    return counts
+
+def check_Venn_Counts(venn_d, metrics_d):
+    """Checks that the counts of c_Venn_Counts_D() are the same as the counts with Python sets
+
+    Returns
+    -------
+    wrong_l : list of tuple
+        (year, topic, beta_name) of the counts that are different. It is empty if all the counts are right.
+    """
+    wrong_l = []
+    for year in metrics_d:
+        for topic in metrics_d[year]:
+            topic_d = metrics_d[year][topic]
+            for beta_name in topic_d['betas']:
+                counts = venn_Counts_With_Sets(topic_d['condition_postitive_ids'], topic_d['boolean_retrieved_ids'],
+                                               topic_d['betas'][beta_name]['scimacro_retrieved_ids'])
+                if counts != venn_d[year][topic][beta_name]:
+                    wrong_l.append((year, topic, beta_name))
+    return wrong_l
@@ -0,0 +1,255 @@
+import gzip
+import io
+import os
+import time
+import numpy as np
+
+MISSING = -1  # Value of the matrix when a document is not in a cluster of the level (written as '-')
+
+def anotate_Cluster(clusters_d, data):
+    """Original function of create_data.ipynb, kept as the reference of c_Cluster_Matrix()"""
+    level = data['level']
+    clusters_members_d = data['merging_data']['jclu_d']
+    for cluster_id in clusters_members_d:
+        for netid in clusters_members_d[cluster_id]:
+             clusters_d[netid][level] = cluster_id
+    if level < 13:
+        positive_clusters_id = data['children_clusters']
+        for pclusterid in positive_clusters_id:
+            clusters_d = anotate_Cluster(clusters_d, data['children_clusters'][pclusterid])
+    return clusters_d
+
+def write_String_Clusters(clusters_d, netid_pmid_d):
+    """Original function of create_data.ipynb, kept as the reference of write_Clusters_File()"""
+    out_file = 'pmid\tlevel1\tlevel2\tlevel3\tlevel4\tlevel5\tlevel6\tlevel7\tlevel8\tlevel9\tlevel10\tlevel11\tlevel12\tlevel13\n'
+    for netid in clusters_d:
+        n = clusters_d[netid]
+        out_file += (str(netid_pmid_d[netid]) + '\t' + str(n[1]) + '\t' + str(n[2]) + '\t' +
+            str(n[3]) + '\t' + str(n[4]) + '\t' + str(n[5]) + '\t' + str(n[6]) + '\t' + str(n[7]) + '\t' + str(n[8]) +
+            '\t' + str(n[9]) + '\t' + str(n[10]) + '\t' + str(n[11]) + '\t' + str(n[12]) + '\t' + str(n[13]) + '\n')
+    while out_file[-1] == '\n':
+        out_file = out_file[:-1]
+    return out_file
+
+def c_Netid_Array(cs):
+    """Sorted net IDs of the network of a clustering solution (the rows of the export, as nedid_L() in create_data.ipynb)
+
+    Notes
+    -------
+    The net IDs are taken from the first level of the tree: its merged and removed clusters (jclu_d and jrem_d) have all the
+    documents of the network. So it also works when the network is not in cs (e.g. the budget mode of pipeline_Clustering()).
+    """
+    merging_data = cs['level_data']['merging_data']
+    netid_part_l = [np.fromiter(netid_l, dtype=np.int64, count=len(netid_l)) for cluster_d in (merging_data['jclu_d'], merging_data['jrem_d']) for netid_l in cluster_d.values()]
+    netid_array = np.sort(np.concatenate(netid_part_l)) if len(netid_part_l) > 0 else np.zeros(0, dtype=np.int64)
+    return netid_array
+
+def c_Cluster_Matrix(level_data, netid_array, n_levels=13):
+    """Creates the matrix of the cluster of each document at each level
+
+    Parameters
+    ----------
+    level_data : dict
+        Tree of clusters created by c_Clus_Recursion() (the root is level 1).
+
+    netid_array : numpy.ndarray
+        Sorted net IDs of the documents (see c_Netid_Array()).
+
+    n_levels : int, optional
+        Number of levels (columns) of the matrix.
+
+    Returns
+    -------
+    cluster_m : numpy.ndarray
+        Matrix of int64 with one row per document (in the order of netid_array) and one column per level. cluster_m[i, level - 1]
+        is the cluster of the document i at the level, or MISSING if the document is not in a positive cluster of the previous level.
+
+    Notes
+    -------
+    It replaces the dictionary of 13 entries per document of anotate_Cluster(). The tree is walked once, and the rows of the
+    members of each cluster are found with numpy.searchsorted().
+    A lazy tree (c_Lazy_Clus_Recursion()) only exports the clusters that were created, so expand it first with
+    expand_Lazy_Recursion().
+    """
+    cluster_m = np.full((len(netid_array), n_levels), MISSING, dtype=np.int64)
+    pending_l = [level_data]
+    while len(pending_l) > 0:
+        data = pending_l.pop()
+        column = data['level'] - 1
+        for cluster_id, netid_l in data['merging_data']['jclu_d'].items():
+            row_array = np.searchsorted(netid_array, np.fromiter(netid_l, dtype=np.int64, count=len(netid_l)))
+            cluster_m[row_array, column] = cluster_id
+        if data['level'] < n_levels and 'children_clusters' in data:
+            pending_l += list(data['children_clusters'].values())
+    return cluster_m
+
+def open_Export(path, compress=False, buffer_size=1048576):
+    """Opens an export file for writing text
+
+    Notes
+    -------
+    The file is opened in text mode with the default encoding and line breaks, as open(path, 'w') in create_data.ipynb, so the
+    bytes are the same as the ones of the notebook. With compress=True it is a gzip file with the same content.
+    """
+    if compress:
+        return io.TextIOWrapper(io.BufferedWriter(gzip.GzipFile(path, 'wb'), buffer_size))
+    return open(path, 'w', buffering=buffer_size)
+
+def write_Clusters_File(path, cluster_m, netid_array, netid_pmid_d, compress=False, chunk_size=100000, buffer_size=1048576):
+    """Writes the cluster of each document at each level as a tab delimited file
+
+    Parameters
+    ----------
+    path : str
+        Path of the file (e.g. 'pmid_clusters_2014.txt').
+
+    cluster_m : numpy.ndarray
+        Matrix created by c_Cluster_Matrix().
+
+    netid_array : numpy.ndarray
+        Sorted net IDs of the documents (the rows of cluster_m).
+
+    netid_pmid_d : dict
+        The key is the net ID and the value is the PubMed ID.
+
+    compress : bool, optional
+        If True the file is compressed with gzip.
+
+    chunk_size : int, optional
+        Number of rows formatted at once.
+
+    buffer_size : int, optional
+        Size of the write buffer in bytes.
+
+    Notes
+    -------
+    The content is the same as write_String_Clusters() (header, '-' for the missing levels and no line break at the end), but
+    the rows are written in chunks, so the file is never held in memory as a string.
+    """
+    n_levels = cluster_m.shape[1]
+    header = 'pmid\t' + '\t'.join(['level' + str(level) for level in range(1, n_levels + 1)])
+    max_cluster = int(cluster_m.max()) if cluster_m.size > 0 else MISSING
+    label_l = [str(cluster_id) for cluster_id in range(max_cluster + 1)] + ['-']  # MISSING (-1) is the last label
+    out_file = open_Export(path, compress=compress, buffer_size=buffer_size)
+    try:
+        out_file.write(header)
+        for start in range(0, len(netid_array), chunk_size):
+            pmid_l = [str(netid_pmid_d[netid]) for netid in netid_array[start:start + chunk_size].tolist()]
+            row_l = cluster_m[start:start + chunk_size].tolist()
+            out_file.write(''.join(['\n' + pmid + '\t' + '\t'.join([label_l[x] for x in row]) for pmid, row in zip(pmid_l, row_l)]))
+    finally:
+        out_file.close()
+
+def c_Hierarchy_Matrix(cluster_m):
+    """Creates the matrix of the distinct paths of the tree (the rows of the hirearchy_clusters_<year>.txt files)
+
+    Parameters
+    ----------
+    cluster_m : numpy.ndarray
+        Matrix created by c_Cluster_Matrix().
+
+    Returns
+    -------
+    hierarchy_m : numpy.ndarray
+        Distinct rows of cluster_m, sorted level by level with MISSING after all the clusters (as hierarchy_L() in
+        create_data.ipynb, which sorted '-' as infinity).
+    """
+    if cluster_m.shape[0] == 0:
+        return cluster_m.copy()
+    missing_key = int(cluster_m.max()) + 1
+    key_m = np.where(cluster_m == MISSING, missing_key, cluster_m)
+    hierarchy_m = np.unique(key_m, axis=0)  # Sorted lexicographically
+    hierarchy_m[hierarchy_m == missing_key] = MISSING
+    return hierarchy_m
+
+def write_Hierarchy_File(path, hierarchy_m, compress=False, buffer_size=1048576):
+    """Writes the paths of the tree (see c_Hierarchy_Matrix()) as a tab delimited file, with the same content as
+    write_String_Hierarchy() in create_data.ipynb (header, '-' for the missing levels and no line break at the end)"""
+    n_levels = hierarchy_m.shape[1]
+    header = '\t'.join(['level' + str(level) for level in range(1, n_levels + 1)])
+    out_file = open_Export(path, compress=compress, buffer_size=buffer_size)
+    try:
+        out_file.write(header)
+        out_file.write(''.join(['\n' + '\t'.join([str(x) if x != MISSING else '-' for x in row]) for row in hierarchy_m.tolist()]))
+    finally:
+        out_file.close()
+
+def export_Clusters(cs, netid_pmid_d, path, n_levels=13, compress=False, chunk_size=100000, buffer_size=1048576):
+    """Exports the clusters of a clustering solution (the pmid_clusters_<year>.txt files of Zenodo)
+
+    Parameters
+    ----------
+    cs : dict
+        Clustering solution created by pipeline_Clustering().
+
+    netid_pmid_d : dict
+        The key is the net ID and the value is the PubMed ID.
+
+    path : str
+        Path of the file.
+
+    The rest of the parameters are the same as in c_Cluster_Matrix() and write_Clusters_File().
+
+    Returns
+    -------
+    cluster_m : numpy.ndarray
+        Matrix of the clusters (see c_Cluster_Matrix()).
+
+    netid_array : numpy.ndarray
+        Net IDs of the rows of cluster_m.
+    """
+    netid_array = c_Netid_Array(cs)
+    cluster_m = c_Cluster_Matrix(cs['level_data'], netid_array, n_levels=n_levels)
+    write_Clusters_File(path, cluster_m, netid_array, netid_pmid_d, compress=compress, chunk_size=chunk_size, buffer_size=buffer_size)
+    return cluster_m, netid_array
+
+def read_Export_Bytes(path, compress=False):
+    """Reads the bytes of an export file (decompressed if compress=True)"""
+    if compress:
+        with gzip.open(path, 'rb') as f:
+            return f.read()
+    with open(path, 'rb') as f:
+        return f.read()
+
+def benchmark_Export(cs, netid_pmid_d, path, compress=False):
+    """Compares the export of create_data.ipynb with export_Clusters()
+
+    Parameters
+    ----------
+    cs : dict
+        Clustering solution created by pipeline_Clustering() (13 levels, as in create_data.ipynb).
+
+    netid_pmid_d : dict
+        The key is the net ID and the value is the PubMed ID.
+
+    path : str
+        Path of the file written by export_Clusters(). The file of the notebook functions is written to path + '.reference'.
+
+    compress : bool, optional
+        Parameter of export_Clusters(). The decompressed content is compared.
+
+    Returns
+    -------
+    benchmark_d : dict
+        Seconds of each method, the speedup and if both files have the same bytes ('same_bytes').
+    """
+    benchmark_d = {'documents': len(c_Netid_Array(cs)), 'compress': compress}
+    reference_path = path + '.reference'
+    start = time.perf_counter()
+    clusters_d = {}
+    for netid in c_Netid_Array(cs).tolist():
+        clusters_d[netid] = {x:'-' for x in range(1,14)}
+    clusters_d = anotate_Cluster(clusters_d, cs['level_data'])
+    out_file = write_String_Clusters(clusters_d, netid_pmid_d)
+    f = open(reference_path, 'w')
+    f.write(out_file)
+    f.close()
+    benchmark_d['reference_seconds'] = time.perf_counter() - start
+    del clusters_d, out_file
+    start = time.perf_counter()
+    export_Clusters(cs, netid_pmid_d, path, compress=compress)
+    benchmark_d['export_seconds'] = time.perf_counter() - start
+    benchmark_d['speedup'] = benchmark_d['reference_seconds'] / benchmark_d['export_seconds']
+    benchmark_d['same_bytes'] = read_Export_Bytes(reference_path) == read_Export_Bytes(path, compress=compress)
+    benchmark_d['bytes'] = os.path.getsize(path)
+    return benchmark_d
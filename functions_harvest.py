@@ -0,0 +1,182 @@
+import os
+import json
+import time
+import threading
+import concurrent.futures
+import functions_read_query as read_query
+
+def harvest_Pubmed_Docsums(pubmed_id_l, journal_path, client_d=None, batch_size=200, max_workers=4, progress_d=None, progress_function=None):
+    """Retrieves the DocSum records (title and metadata) of many PubMed documents, writing them to a journal as they arrive
+
+    Parameters
+    ----------
+    pubmed_id_l : list
+        PubMed IDs of the documents.
+
+    journal_path : str
+        Path of the journal file. If it exists, the documents already in it are not retrieved again.
+
+    client_d : dict, optional
+        Client created by functions_read_query.c_Pubmed_Client_D(). By default a new client is created.
+
+    batch_size : int, optional
+        Number of IDs per esummary request.
+
+    max_workers : int, optional
+        Maximum number of batches requested at the same time.
+
+    progress_d : dict, optional
+        Progress counters created by c_Progress_D(). It can be read from another thread while the job runs. By default a new one
+        is created.
+
+    progress_function : function, optional
+        Function called with progress_d after each batch (e.g. to print progress_Stats_D()).
+
+    Returns
+    -------
+    docsum_d : dict of dict
+        The first key is the PubMed ID and the second key is the name of the item (see functions_read_query.parse_Docsum_D()).
+        It includes the documents of the journal from previous runs.
+
+    failed_l : list
+        PubMed IDs that could not be retrieved. They are not written to the journal, so the next run tries them again.
+
+    Notes
+    -------
+    Resumable version of functions_read_query.retrieve_Pubmed_Titles_D() for long lists of IDs. The journal is an append-only
+    file with one JSON record per line, and each batch is flushed to disk as soon as it arrives. If the job is interrupted (e.g.
+    NCBI drops the connection or the kernel is stopped), running it again with the same journal resumes from where it stopped.
+    At most max_workers batches are pending at any time, so the memory does not depend on the number of IDs.
+    """
+    if client_d is None:
+        client_d = read_query.c_Pubmed_Client_D()
+    docsum_d = read_Journal_D(journal_path)
+    unique_id_l = list(dict.fromkeys(pubmed_id_l))
+    pending_l = [pubmed_id for pubmed_id in unique_id_l if pubmed_id not in docsum_d]
+    if progress_d is None:
+        progress_d = c_Progress_D()
+    progress_d['total'] = len(unique_id_l)
+    progress_d['resumed'] = len(unique_id_l) - len(pending_l)
+    batch_l = [pending_l[i:i + batch_size] for i in range(0, len(pending_l), batch_size)]
+    failed_l = []
+    journal_file = open_Journal(journal_path)
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            jobs_d = {}
+            batch_i = 0
+            while batch_i < len(batch_l) or len(jobs_d) > 0:
+                while batch_i < len(batch_l) and len(jobs_d) < max_workers:  # Bounded concurrency
+                    batch = batch_l[batch_i]
+                    jobs_d[executor.submit(read_query.retrieve_Docsum_Batch_D, batch, client_d)] = batch
+                    batch_i += 1
+                done_jobs, _ = concurrent.futures.wait(jobs_d, return_when=concurrent.futures.FIRST_COMPLETED)
+                for job in done_jobs:
+                    batch = jobs_d.pop(job)
+                    batch_docsum_d = job.result()
+                    write_Journal(journal_file, batch_docsum_d)
+                    docsum_d.update(batch_docsum_d)
+                    batch_failed_l = [pubmed_id for pubmed_id in batch if pubmed_id not in batch_docsum_d]
+                    failed_l += batch_failed_l
+                    update_Progress(progress_d, len(batch_docsum_d), len(batch_failed_l))
+                    if progress_function is not None:
+                        progress_function(progress_d)
+    finally:
+        journal_file.close()
+    return docsum_d, failed_l
+
+def open_Journal(journal_path):
+    """Opens a journal to append records
+
+    Notes
+    -------
+    If the last line of the journal was cut (the job was killed while writing it), a line break is added so the new records
+    start in a new line. The cut line is ignored by read_Journal_D().
+    """
+    if os.path.exists(journal_path) and os.path.getsize(journal_path) > 0:
+        with open(journal_path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            ends_with_jump = f.read(1) == b'\n'
+    else:
+        ends_with_jump = True
+    journal_file = open(journal_path, 'a', encoding='UTF-8')
+    if not ends_with_jump:
+        journal_file.write('\n')
+    return journal_file
+
+def write_Journal(journal_file, docsum_d):
+    """Appends the records of a batch to the journal and forces them to disk"""
+    journal_file.write(''.join([json.dumps({'pmid': pubmed_id, 'docsum': docsum_d[pubmed_id]}) + '\n' for pubmed_id in docsum_d]))
+    journal_file.flush()
+    os.fsync(journal_file.fileno())
+
+def read_Journal_D(journal_path):
+    """Reads the records of a journal
+
+    Parameters
+    ----------
+    journal_path : str
+        Path of the journal file. It does not need to exist.
+
+    Returns
+    -------
+    docsum_d : dict of dict
+        The first key is the PubMed ID and the second key is the name of the item. Lines that can't be parsed (a line cut by an
+        interruption) are ignored.
+    """
+    docsum_d = {}
+    if not os.path.exists(journal_path):
+        return docsum_d
+    with open(journal_path, 'r', encoding='UTF-8') as journal_file:
+        for line in journal_file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            docsum_d[record['pmid']] = record['docsum']
+    return docsum_d
+
+def journal_Titles_D(journal_path):
+    """Reads the titles of a journal as a dictionary where the key is the PubMed ID and the value is the title"""
+    docsum_d = read_Journal_D(journal_path)
+    titles_d = {pubmed_id: docsum_d[pubmed_id].get('Title') for pubmed_id in docsum_d}
+    return titles_d
+
+def c_Progress_D():
+    """Creates the progress counters of a harvesting job
+
+    Returns
+    -------
+    progress_d : dict
+        'total' IDs of the job, 'resumed' IDs that were already in the journal, 'done' and 'failed' IDs in this run, and the time
+        when the first batch arrived ('start').
+    """
+    progress_d = {'total': 0, 'resumed': 0, 'done': 0, 'failed': 0, 'start': time.monotonic(), 'lock': threading.Lock()}
+    return progress_d
+
+def update_Progress(progress_d, n_done, n_failed):
+    """Adds the IDs of a batch to the progress counters"""
+    with progress_d['lock']:
+        progress_d['done'] += n_done
+        progress_d['failed'] += n_failed
+
+def progress_Stats_D(progress_d):
+    """Reports the progress of a harvesting job
+
+    Returns
+    -------
+    stats : dict
+        Counters of the job plus the fraction of IDs finished ('fraction', including the resumed and the failed IDs), the elapsed
+        seconds and the throughput in documents per second.
+    """
+    with progress_d['lock']:
+        stats = {key: progress_d[key] for key in ('total', 'resumed', 'done', 'failed')}
+    stats['elapsed'] = time.monotonic() - progress_d['start']
+    if stats['total'] > 0:
+        stats['fraction'] = float(stats['resumed'] + stats['done'] + stats['failed']) / stats['total']
+    else:
+        stats['fraction'] = 1.0
+    if stats['elapsed'] > 0:
+        stats['throughput'] = stats['done'] / stats['elapsed']
+    else:
+        stats['throughput'] = 0.0
+    return stats
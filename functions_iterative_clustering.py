@@ -1,5 +1,9 @@
 import functions_clustering as clustering
 import functions_merging as merging
+import functions_metrics as metrics
+import functions_profiling as profiling
+import functions_memory as memory
+import functions_reference_table as reference_table
 
 def level_Data(graph, resolution, clusters_per_level, t_references_d):
     """Create the dictionary of positive clusters
@@ -29,9 +33,13 @@ def level_Data(graph, resolution, clusters_per_level, t_references_d):
     merging_data = merging.join_Clusters(clu_d, con_d, clusters_per_level, resolution)
     t_positive_clusters_d = t_Positive_Clusters_Dict(t_references_d, merging_data['jclu_d'])
     all_positive_clusters_id = all_Positive_Clusters_Id(t_positive_clusters_d)
+    merge_steps = max(0, len(clu_d) - clusters_per_level)  # Each step of join_Clusters() merges or removes one cluster
+    profiling.add_Node_Values(leiden_clusters=len(clu_d), clusters=len(merging_data['jclu_d']), merge_steps=merge_steps,
+                              removed_clusters=len(merging_data['jrem_d']), positive_clusters=len(all_positive_clusters_id))
     level_data = {'merging_data': merging_data, 't_positive_clusters_d': t_positive_clusters_d, 'all_positive_clusters_id': all_positive_clusters_id}
     return level_data
 
+@profiling.timed()
 def t_Positive_Clusters_Dict(t_references_d, clu_d):
     """Create the dictionary of positive clusters
 
@@ -123,19 +131,112 @@ def c_Clus_Recursion(parent_graph, resolution, parent_level, max_depth, clusters
     The parameters max_depth, clusters_per_level, t_references_d and resolution_factor are constant.
     The parameter parent_level is used to stop the iterations.
     """
+    t_references_d = reference_table.t_References_D(t_references_d)
     ITERATIONS_COUNT += 1
-    level_data = level_Data(parent_graph, resolution, clusters_per_level, t_references_d)
-    level_data['level'] = level = parent_level + 1
+    with profiling.node_Timer(parent_level + 1, resolution, parent_graph):  # Does nothing if the profiling is off
+        level_data = level_Data(parent_graph, resolution, clusters_per_level, t_references_d)
+        level_data['level'] = level = parent_level + 1
+        if level < max_depth:
+            assert (len(level_data['all_positive_clusters_id']) > 0), 'Level ' + str(level) + ' Iteration ' + str(ITERATIONS_COUNT) # Report if there are no positive clusters
+            level_data['children_resolution'] = children_resolution = resolution*resolution_factor
+            level_data['children_clusters'] = {}
+            for cluster_id in level_data['all_positive_clusters_id']:
+                cluster_nodes_l = level_data['merging_data']['jclu_d'][cluster_id]
+                cluster_subgraph = create_Subgraph(parent_graph, cluster_nodes_l)
+                level_data['children_clusters'][cluster_id], ITERATIONS_COUNT = c_Clus_Recursion(cluster_subgraph, children_resolution, level, max_depth, clusters_per_level, t_references_d, resolution_factor, ITERATIONS_COUNT)
+    return level_data, ITERATIONS_COUNT
+
+def extend_Clus_Recursion(level_data, parent_graph, new_t_references_d, t_references_d, max_depth, clusters_per_level, resolution_factor, ITERATIONS_COUNT):
+    """Add new topics to an existing tree of clusters
+
+    Parameters
+    ----------
+    level_data : dict
+        Dictionary with the data of the level, created by c_Clus_Recursion(). It is modified in place.
+
+    parent_graph : igraph.Graph
+        Graph of the parent cluster (i.e. the graph that was used to create level_data).
+
+    new_t_references_d : dict of set
+        The key is the new topic and the value is the set of references of the topic. The references are int type.
+
+    t_references_d : dict of set
+        The old and the new topics. It is used for the new branches.
+
+    max_depth : int
+        Lowest level of the clustering
+
+    clusters_per_level : int
+        Maximum number of clusters.
+
+    resolution_factor : float
+        Factor by which the value of the resolution increases at each level.
+
+    Returns
+    -------
+    level_data : dict
+        Dictionary with the data of the level.
+
+    Notes
+    -------
+    The result is the same as running c_Clus_Recursion() with t_references_d:
+        - The clusters of the existing levels do not change, so only the positive clusters of the new topics are added.
+        - The clusters that become positive because of the new topics get a new branch with c_Clus_Recursion().
+        - The clusters that were already positive and have references of the new topics are extended recursively.
+        - The clusters that were already positive and have no references of the new topics only get empty positive clusters
+          for the new topics (a child cluster can't have references that its parent does not have), so their graph is not needed.
+    The subgraphs are created from the parent subgraph, as in c_Clus_Recursion(), so the graphs (and the order of their
+    vertices and edges) are the same as in the original run.
+    The tree must be eager (see c_Clus_Recursion()), not lazy.
+    """
+    jclu_d = level_data['merging_data']['jclu_d']
+    new_t_positive_clusters_d = t_Positive_Clusters_Dict(new_t_references_d, jclu_d)
+    level_data['t_positive_clusters_d'].update(new_t_positive_clusters_d)
+    old_positive_clusters_id = level_data['all_positive_clusters_id']
+    level_data['all_positive_clusters_id'] = all_Positive_Clusters_Id(level_data['t_positive_clusters_d'])
+    new_positive_clusters_id = all_Positive_Clusters_Id(new_t_positive_clusters_d)
+    level = level_data['level']
     if level < max_depth:
-        assert (len(level_data['all_positive_clusters_id']) > 0), 'Level ' + str(level) + ' Iteration ' + str(ITERATIONS_COUNT) # Report if there are no positive clusters
-        level_data['children_resolution'] = children_resolution = resolution*resolution_factor
-        level_data['children_clusters'] = {}
+        children_resolution = level_data['children_resolution']
         for cluster_id in level_data['all_positive_clusters_id']:
-            cluster_nodes_l = level_data['merging_data']['jclu_d'][cluster_id]
-            cluster_subgraph = create_Subgraph(parent_graph, cluster_nodes_l)
-            level_data['children_clusters'][cluster_id], ITERATIONS_COUNT = c_Clus_Recursion(cluster_subgraph, children_resolution, level, max_depth, clusters_per_level, t_references_d, resolution_factor, ITERATIONS_COUNT)
+            if cluster_id in new_positive_clusters_id:
+                cluster_subgraph = create_Subgraph(parent_graph, jclu_d[cluster_id])
+                if cluster_id in old_positive_clusters_id:
+                    level_data['children_clusters'][cluster_id], ITERATIONS_COUNT = extend_Clus_Recursion(level_data['children_clusters'][cluster_id], cluster_subgraph, new_t_references_d, t_references_d, max_depth, clusters_per_level, resolution_factor, ITERATIONS_COUNT)
+                else:  # The cluster is new positive, create its branch
+                    level_data['children_clusters'][cluster_id], ITERATIONS_COUNT = c_Clus_Recursion(cluster_subgraph, children_resolution, level, max_depth, clusters_per_level, t_references_d, resolution_factor, ITERATIONS_COUNT)
+            else:
+                level_data['children_clusters'][cluster_id] = add_Empty_Topics(level_data['children_clusters'][cluster_id], new_t_references_d)
     return level_data, ITERATIONS_COUNT
 
+def add_Empty_Topics(level_data, new_t_references_d):
+    """Add topics without positive clusters to a branch
+
+    Parameters
+    ----------
+    level_data : dict
+        Dictionary with the data of the level. It is modified in place.
+
+    new_t_references_d : dict of set
+        The key is the new topic and the value is the set of references of the topic.
+
+    Returns
+    -------
+    level_data : dict
+        Dictionary with the data of the level, where the new topics have no positive clusters.
+
+    Notes
+    -------
+    It is used by extend_Clus_Recursion() for the branches that have no references of the new topics.
+    """
+    for t in new_t_references_d:
+        level_data['t_positive_clusters_d'][t] = {}
+    if 'children_clusters' in level_data.keys():
+        for cluster_id in level_data['children_clusters']:
+            level_data['children_clusters'][cluster_id] = add_Empty_Topics(level_data['children_clusters'][cluster_id], new_t_references_d)
+    return level_data
+
+@profiling.timed()
 def create_Subgraph(grahph, nodes_l):
     """Create a subgraph
 
@@ -159,4 +260,225 @@ def create_Subgraph(grahph, nodes_l):
     """
     vertex_l = grahph.vs.select(name_in=nodes_l)
     subgraph = grahph.subgraph(vertex_l)
-    return subgraph
\ No newline at end of file
+    return subgraph
+
+class Lazy_Children_D(dict):
+    """Dictionary of children clusters that creates each child level the first time it is accessed
+
+    Parameters
+    ----------
+    parent_graph : igraph.Graph
+        Graph of the parent cluster.
+
+    jclu_d : dict of set
+        The key is the cluster id and the value is the set of nodes in the cluster (i.e. the 'jclu_d' of the parent level).
+
+    all_positive_clusters_id : set
+        Clusters that have children (i.e. the 'all_positive_clusters_id' of the parent level).
+
+    children_resolution : float
+        Resolution of the clustering of the children level.
+
+    level : int
+        Level of the parent cluster.
+
+    lazy_params : dict
+        Constant parameters of c_Lazy_Clus_Recursion() (max_depth, clusters_per_level, t_references_d, resolution_factor and beta_l).
+
+    Notes
+    -------
+    The purpose of this class is that the code that reads the tree (e.g. recursive_T_Greedy_D(), or the notebooks with
+    level_data['children_clusters'][cluster_id]) does not need to know if the tree is lazy or not. Asking for a child that
+    has not been created yet creates it, stores it and returns it.
+    Iterating over the dictionary (or using len() or 'in') only sees the children that have already been created. Use
+    expand_Lazy_Recursion() before using functions that iterate over all the tree (e.g. c_T_Universal_Fscore_D()).
+    Asking for a cluster that is not positive raises KeyError, as in the eager tree.
+    The parent graph is released once all the children are created.
+    """
+    def __init__(self, parent_graph, jclu_d, all_positive_clusters_id, children_resolution, level, lazy_params):
+        super().__init__()
+        self.parent_graph = parent_graph
+        self.jclu_d = jclu_d
+        self.all_positive_clusters_id = all_positive_clusters_id
+        self.children_resolution = children_resolution
+        self.level = level
+        self.lazy_params = lazy_params
+
+    def __missing__(self, cluster_id):
+        if cluster_id not in self.all_positive_clusters_id:
+            raise KeyError(cluster_id)
+        cluster_subgraph = create_Subgraph(self.parent_graph, self.jclu_d[cluster_id])
+        self[cluster_id] = c_Lazy_Clus_Recursion(cluster_subgraph, self.children_resolution, self.level, **self.lazy_params)
+        if len(self) == len(self.all_positive_clusters_id):  # All the children exist, the parent graph is not needed anymore
+            self.parent_graph = None
+        return self[cluster_id]
+
+    def pending_Clusters(self):
+        """Returns the set of positive clusters whose child level has not been created yet"""
+        return set(self.all_positive_clusters_id).difference(self.keys())
+
+def c_Lazy_Clus_Recursion(parent_graph, resolution, parent_level, max_depth, clusters_per_level, t_references_d, resolution_factor, beta_l=None):
+    """Create the data of a level whose children levels are created only when they are accessed
+
+    Parameters
+    ----------
+    parent_graph : igraph.Graph
+        Graph of the parent cluster.
+
+    resolution : float
+        Resolution of the clustering of the current level.
+
+    parent_level : int
+        Level of the parent cluster.
+
+    max_depth : int
+        Lowest level of the clustering
+
+    clusters_per_level : int
+        Maximum number of clusters.
+
+    t_references_d : dict of set
+        The key is the topic and the value is the set of references of the topic. The references are int type.
+
+    resolution_factor : float
+        Factor by which the value of the resolution increases at each level.
+
+    beta_l : list, optional
+        List of the betas to use for the F-score. If it is given, the metrics of each level ('t_cluster_metrics') are
+        calculated when the level is created, so the greedy algorithm can be used over the lazy tree.
+
+    Returns
+    -------
+    level_data : dict
+        Dictionary with the data of the level.
+
+    Notes
+    -------
+    Lazy version of c_Clus_Recursion(). The level data has the same keys, but 'children_clusters' is a Lazy_Children_D, so
+    the child levels are clustered (and stored) only when something asks for them. For example, c_T_Greedy_D() only creates
+    the branches followed by the greedy algorithm. Once fully expanded (see expand_Lazy_Recursion()) the tree is the same as
+    the tree of c_Clus_Recursion(), because the clustering of each level only depends on the graph and the resolution.
+    It does not count the iterations.
+    """
+    t_references_d = reference_table.t_References_D(t_references_d)
+    with profiling.node_Timer(parent_level + 1, resolution, parent_graph):
+        level_data = level_Data(parent_graph, resolution, clusters_per_level, t_references_d)
+        level_data['level'] = level = parent_level + 1
+        if beta_l is not None:
+            level_data['t_cluster_metrics'] = metrics.t_Cluster_Metrics(level_data, t_references_d, beta_l)
+    if level < max_depth:
+        assert (len(level_data['all_positive_clusters_id']) > 0), 'Level ' + str(level)  # Report if there are no positive clusters
+        level_data['children_resolution'] = children_resolution = resolution*resolution_factor
+        lazy_params = {'max_depth': max_depth, 'clusters_per_level': clusters_per_level, 't_references_d': t_references_d,
+                       'resolution_factor': resolution_factor, 'beta_l': beta_l}
+        level_data['children_clusters'] = Lazy_Children_D(parent_graph, level_data['merging_data']['jclu_d'], level_data['all_positive_clusters_id'],
+                                                          children_resolution, level, lazy_params)
+    return level_data
+
+def expand_Lazy_Recursion(level_data, max_level=None):
+    """Create all the pending child levels of a lazy tree
+
+    Parameters
+    ----------
+    level_data : dict
+        Dictionary with the data of the clustering solution of the current level.
+
+    max_level : int, optional
+        Do not create levels below this level. By default the tree is expanded until max_depth.
+
+    Returns
+    -------
+    level_data : dict
+        Dictionary with the data of the clustering solution of the current level, with all its child levels created.
+
+    Notes
+    -------
+    The child levels that were already created are not clustered again.
+    """
+    if 'children_clusters' in level_data.keys():
+        if max_level is None or level_data['level'] < max_level:
+            children_clusters = level_data['children_clusters']
+            for cluster_id in sorted(level_data['all_positive_clusters_id']):
+                expand_Lazy_Recursion(children_clusters[cluster_id], max_level)  # Accessing the child creates it if it is pending
+    return level_data
+
+def count_Created_Levels(level_data):
+    """Count the levels (i.e. nodes of the tree) that have been clustered
+
+    Parameters
+    ----------
+    level_data : dict
+        Dictionary with the data of the clustering solution of the current level.
+
+    Returns
+    -------
+    n_levels : int
+        Number of levels in the tree, including the current one. In a lazy tree it only counts the created levels.
+    """
+    n_levels = 1
+    if 'children_clusters' in level_data.keys():
+        for cluster_id in list(level_data['children_clusters'].keys()):
+            n_levels += count_Created_Levels(level_data['children_clusters'][cluster_id])
+    return n_levels
+
+def c_Budget_Clus_Recursion(graph_entry, resolution, parent_level, max_depth, clusters_per_level, t_references_d, resolution_factor, ITERATIONS_COUNT, memory_d):
+    """Create the recursion of the clustering in budget mode
+
+    Parameters
+    ----------
+    graph_entry : dict
+        Graph of the current level ('graph'), or path of the file of the graph if it was spilled to disk ('path'). The graph is
+        taken out of the dictionary, so the caller does not keep it alive. A graph given in memory must already be in the
+        accounting of memory_d (see functions_memory.add_Live_Graph()).
+
+    memory_d : dict
+        Memory accounting of the run (see functions_memory.c_Memory_D()).
+
+    The rest of the parameters are the same as in c_Clus_Recursion().
+
+    Returns
+    -------
+    level_data : dict
+        Dictionary with the data of the level.
+
+    ITERATIONS_COUNT : int
+        Number of levels clustered so far.
+
+    Notes
+    -------
+    Budget version of c_Clus_Recursion(). The tree is the same (same clusters, same order of the children and same
+    ITERATIONS_COUNT), but the memory is bounded:
+    - The subgraphs of the children are extracted one by one. After each extraction the budget is checked, and if the graphs in
+      memory are over it, the new subgraph is spilled to disk as arrays (see functions_memory.spill_Subgraph()) and loaded
+      again when its turn comes.
+    - Once the children are extracted, the graph of the level is released, so the graphs of the ancestors (including the root
+      graph) are not kept alive during the recursion.
+    The graphs in memory are estimated from their number of vertices and edges (see functions_memory.over_Budget()).
+    """
+    t_references_d = reference_table.t_References_D(t_references_d)
+    if 'graph' in graph_entry:
+        parent_graph = graph_entry.pop('graph')
+    else:
+        parent_graph = memory.load_Subgraph(memory_d, graph_entry.pop('path'))
+    ITERATIONS_COUNT += 1
+    child_l = []
+    with profiling.node_Timer(parent_level + 1, resolution, parent_graph):
+        level_data = level_Data(parent_graph, resolution, clusters_per_level, t_references_d)
+        level_data['level'] = level = parent_level + 1
+        if level < max_depth:
+            assert (len(level_data['all_positive_clusters_id']) > 0), 'Level ' + str(level) + ' Iteration ' + str(ITERATIONS_COUNT) # Report if there are no positive clusters
+            level_data['children_resolution'] = children_resolution = resolution*resolution_factor
+            level_data['children_clusters'] = {}
+            for cluster_id in level_data['all_positive_clusters_id']:
+                child_graph = create_Subgraph(parent_graph, level_data['merging_data']['jclu_d'][cluster_id])
+                memory.add_Live_Graph(memory_d, child_graph)
+                if memory.over_Budget(memory_d):
+                    child_l.append((cluster_id, {'path': memory.spill_Subgraph(memory_d, child_graph)}))
+                else:
+                    child_l.append((cluster_id, {'graph': child_graph}))
+                child_graph = None
+        memory.remove_Live_Graph(memory_d, parent_graph)
+        parent_graph = None  # The children are extracted, release the graph of the level
+        for cluster_id, child_entry in child_l:
+            level_data['children_clusters'][cluster_id], ITERATIONS_COUNT = c_Budget_Clus_Recursion(child_entry, children_resolution, level, max_depth, clusters_per_level, t_references_d, resolution_factor, ITERATIONS_COUNT, memory_d)
+    return level_data, ITERATIONS_COUNT
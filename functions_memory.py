@@ -0,0 +1,221 @@
+import os
+import time
+import tempfile
+import tracemalloc
+import numpy as np
+import igraph
+
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
+
+GRAPH_VERTEX_BYTES = 64  # Estimated memory of a vertex of a graph (igraph indexes and the 'name' attribute)
+GRAPH_EDGE_BYTES = 48  # Estimated memory of an edge of a graph (igraph indexes and the 'weight' attribute)
+
+def rss_Bytes():
+    """Current resident memory of the process in bytes, or None if it can't be known (e.g. on Windows)"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:  # Without /proc (e.g. macOS) the peak is the best available value
+        return peak_Rss_Bytes()
+    return None
+
+def peak_Rss_Bytes(children=False):
+    """Peak resident memory of the process (or of its finished child processes) in bytes, or None if it can't be known
+
+    Notes
+    -------
+    On Linux the peak of the process is read from /proc/self/status (VmHWM), so it can be reset with reset_Peak_Rss().
+    """
+    if not children:
+        try:
+            with open('/proc/self/status', 'r') as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        return int(line.split()[1]) * 1024
+        except (OSError, ValueError):
+            pass
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    if os.uname().sysname == 'Darwin':  # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+        return usage.ru_maxrss
+    return usage.ru_maxrss * 1024
+
+def reset_Peak_Rss():
+    """Resets the peak resident memory of the process (Linux only), so the peak of each yearly run can be measured in the same
+    kernel. Returns True if the peak was reset"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def c_Memory_D(memory_budget=None, spill_dir=None, trace_memory=False, memory_report=False):
+    """Creates the memory accounting of a run
+
+    Parameters
+    ----------
+    memory_budget : int, optional
+        Ceiling in bytes of the graphs held in memory. If it is given, the pipeline runs in budget mode (see
+        pipeline_Clustering()).
+
+    spill_dir : str, optional
+        Directory for the subgraphs spilled to disk. By default a temporary directory.
+
+    trace_memory : bool, optional
+        If True the Python allocations of each stage are traced with tracemalloc (slower).
+
+    memory_report : bool, optional
+        If True the peak resident memory is reset (see reset_Peak_Rss()), so 'peak_rss' is the peak of this run and not of the
+        whole process. It is also reset in budget mode.
+
+    Returns
+    -------
+    memory_d : dict
+        Accounting of the run: 'stages' (one record per stage), 'budget', 'spilled_subgraphs', 'spilled_bytes', the estimated
+        bytes of the graphs in memory ('live_graph_bytes' and its peak 'peak_live_graph_bytes', see add_Live_Graph()) and, after
+        finish_Memory_D(), 'peak_rss' and 'children_peak_rss'.
+
+    Notes
+    -------
+    The reset writes to /proc/self/clear_refs, which also clears the referenced bits of all the pages of the process, so it is
+    only done when the peak of the run is requested.
+    """
+    memory_d = {'budget': memory_budget, 'spill_dir': spill_dir, 'trace_memory': trace_memory, 'stages': [],
+                'spilled_subgraphs': 0, 'spilled_bytes': 0, 'live_graph_bytes': 0, 'peak_live_graph_bytes': 0,
+                'peak_reset': (memory_budget is not None or memory_report) and reset_Peak_Rss(), 'start_rss': rss_Bytes()}
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        memory_d['started_tracemalloc'] = True
+    return memory_d
+
+class Memory_Stage:
+    """Context manager that records the memory of a stage. It is created by memory_Stage()"""
+    def __init__(self, memory_d, name):
+        self.memory_d = memory_d
+        self.name = name
+
+    def __enter__(self):
+        self.record = {'stage': self.name, 'rss_before': rss_Bytes()}
+        if self.memory_d['trace_memory'] and tracemalloc.is_tracing():
+            if hasattr(tracemalloc, 'reset_peak'):  # Python 3.9+. Before, the peak is the peak since the start of the tracing
+                tracemalloc.reset_peak()
+            self.record['traced_before'] = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter()
+        return self.record
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.record['seconds'] = time.perf_counter() - self.start
+        self.record['rss_after'] = rss_Bytes()
+        self.record['peak_rss'] = peak_Rss_Bytes()
+        if 'traced_before' in self.record:
+            self.record['traced_after'], self.record['traced_peak'] = tracemalloc.get_traced_memory()
+        self.memory_d['stages'].append(self.record)
+        return False
+
+def memory_Stage(memory_d, name):
+    """Records the resident memory before and after a stage, the peak, and (with trace_memory) the Python allocations
+
+    Use it as "with memory.memory_Stage(memory_d, 'name'):".
+    """
+    return Memory_Stage(memory_d, name)
+
+def finish_Memory_D(memory_d):
+    """Records the peak memory of the run, stops tracemalloc if c_Memory_D() started it and removes the temporary spill directory"""
+    memory_d['peak_rss'] = peak_Rss_Bytes()
+    memory_d['children_peak_rss'] = peak_Rss_Bytes(children=True)
+    if memory_d.pop('started_tracemalloc', False):
+        tracemalloc.stop()
+    if memory_d.pop('temporary_spill_dir', False):
+        os.rmdir(memory_d['spill_dir'])  # The spilled files are removed when they are loaded
+    return memory_d
+
+def graph_Bytes(graph):
+    """Estimated memory of a graph in bytes, from its number of vertices and edges"""
+    return graph.vcount() * GRAPH_VERTEX_BYTES + graph.ecount() * GRAPH_EDGE_BYTES
+
+def add_Live_Graph(memory_d, graph):
+    """Adds a graph that is held in memory to the accounting of the run (see over_Budget())"""
+    memory_d['live_graph_bytes'] += graph_Bytes(graph)
+    memory_d['peak_live_graph_bytes'] = max(memory_d['peak_live_graph_bytes'], memory_d['live_graph_bytes'])
+
+def remove_Live_Graph(memory_d, graph):
+    """Removes a graph that is released or spilled from the accounting of the run"""
+    memory_d['live_graph_bytes'] -= graph_Bytes(graph)
+
+def over_Budget(memory_d):
+    """True if the graphs held in memory are over the budget of the run
+
+    Notes
+    -------
+    The size of the graphs is estimated from their number of vertices and edges (see graph_Bytes()) and not taken from the
+    resident memory, because the resident memory of the process rarely goes down when the graphs are released (the allocator
+    keeps the freed memory), so it would stay over the budget for the rest of the run.
+    """
+    if memory_d is None or memory_d['budget'] is None:
+        return False
+    return memory_d['live_graph_bytes'] > memory_d['budget']
+
+def save_Graph_Arrays(graph, path):
+    """Saves a graph as arrays (names of the vertices, edges as pairs of vertex indices and weights)
+
+    Parameters
+    ----------
+    graph : igraph.Graph
+        Graph with the 'name' vertex attribute and the 'weight' edge attribute (and the 'weighted' graph attribute, if any).
+
+    path : str
+        Path of the file (a .npz file).
+
+    Returns
+    -------
+    n_bytes : int
+        Size of the file.
+
+    Notes
+    -------
+    load_Graph_Arrays() creates a graph with the same order of the vertices and edges, so the clustering of the loaded graph is the
+    same as the clustering of the saved graph.
+    """
+    edge_array = np.array(graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+    weighted = 'weighted' in graph.attributes() and bool(graph['weighted'])
+    np.savez(path, names=np.array(graph.vs['name'], dtype=np.int64), edges=edge_array,
+             weights=np.array(graph.es['weight']), weighted=weighted)  # Keeps the type of the weights (int in create_Igraph_Network())
+    return os.path.getsize(path)
+
+def load_Graph_Arrays(path, remove=True):
+    """Loads a graph saved by save_Graph_Arrays(). With remove=True the file is deleted"""
+    with np.load(path) as arrays:
+        graph = igraph.Graph(n=len(arrays['names']), edges=arrays['edges'].tolist(), directed=False)
+        graph.vs['name'] = arrays['names'].tolist()
+        graph.es['weight'] = arrays['weights'].tolist()
+        if 'weighted' in arrays and bool(arrays['weighted']):
+            graph['weighted'] = True
+    if remove:
+        os.remove(path)
+    return graph
+
+def spill_Subgraph(memory_d, graph):
+    """Saves a pending subgraph to the spill directory, removes it from the graphs held in memory and returns the path of the
+    file. The caller must drop its references to the graph"""
+    if memory_d['spill_dir'] is None:
+        memory_d['spill_dir'] = tempfile.mkdtemp(prefix='spilled_subgraphs_')
+        memory_d['temporary_spill_dir'] = True
+    os.makedirs(memory_d['spill_dir'], exist_ok=True)
+    path = os.path.join(memory_d['spill_dir'], 'subgraph_' + str(memory_d['spilled_subgraphs']) + '.npz')
+    memory_d['spilled_bytes'] += save_Graph_Arrays(graph, path)
+    memory_d['spilled_subgraphs'] += 1
+    remove_Live_Graph(memory_d, graph)
+    return path
+
+def load_Subgraph(memory_d, path):
+    """Loads a subgraph spilled by spill_Subgraph() (the file is deleted) and adds it to the graphs held in memory"""
+    graph = load_Graph_Arrays(path)
+    add_Live_Graph(memory_d, graph)
+    return graph
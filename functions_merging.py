@@ -1,5 +1,7 @@
 import copy
+import functions_profiling as profiling
 
+@profiling.timed()
 def join_Clusters(clu_d, con_d, n_desired, resolution): # No more need for the resolution argument, discontinue in the future
     """Creates dictionary of joined clusters
 
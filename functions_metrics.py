@@ -1,3 +1,8 @@
+import numpy as np
+import functions_profiling as profiling
+import functions_reference_table as reference_table
+
+@profiling.timed()
 def t_Cluster_Metrics(level_data, t_references_d, beta_l):
     """Create the metrics for each topic and each cluster
 
@@ -49,6 +54,32 @@ def t_Cluster_Metrics(level_data, t_references_d, beta_l):
     return  t_cluster_metrics_d
 
 
+def c_Metrics_Array_D(cluster_m_d, beta_l):
+    """Creates the array version of the metrics of the clusters of a topic
+
+    Parameters
+    ----------
+    cluster_m_d : dict
+        First level is the cluster, second level is the metrics of the cluster (t_Cluster_Metrics()[topic]).
+
+    beta_l : list
+        List of the betas to use for the F-score.
+
+    Returns
+    -------
+    metrics_array_d : dict
+        Dictionary with the list of clusters ('clusters') and the arrays of the metrics, where the position i is the cluster i
+        of the list. 'recall' and 'precision' have one dimension, 'fscore' has two dimensions (clusters x betas).
+        'beta_index_d' is the column of each beta in 'fscore'.
+    """
+    cluster_l = list(cluster_m_d)
+    recall = np.array([cluster_m_d[c]['recall'] for c in cluster_l], dtype=float)
+    precision = np.array([cluster_m_d[c]['precision'] for c in cluster_l], dtype=float)
+    fscore = np.array([[cluster_m_d[c]['fscore'][beta] for beta in beta_l] for c in cluster_l], dtype=float).reshape(len(cluster_l), len(beta_l))
+    metrics_array_d = {'clusters': cluster_l, 'recall': recall, 'precision': precision, 'fscore': fscore,
+                       'beta_index_d': {beta: i for i, beta in enumerate(beta_l)}}
+    return metrics_array_d
+
 def f_Score_From_Rec_Pre(recall, precision, b):
     """Calculate the F-Score
 
@@ -103,8 +134,45 @@ def c_Metric_Recursion(level_data, t_references_d, beta_l):
     The condition " if 'children_clusters' in level_data.keys() " is the stop condition, and asks if there are more levels under
     the current level.
     """
+    t_references_d = reference_table.t_References_D(t_references_d)
     level_data['t_cluster_metrics'] = t_Cluster_Metrics(level_data, t_references_d, beta_l)
     if 'children_clusters' in level_data.keys():
         for cluster in level_data['children_clusters']:
             level_data['children_clusters'][cluster] = c_Metric_Recursion(level_data['children_clusters'][cluster], t_references_d, beta_l)
-    return level_data
\ No newline at end of file
+    return level_data
+
+def extend_Metric_Recursion(level_data, new_t_references_d, t_references_d, beta_l):
+    """Add the metrics of new topics to the metrics dictionary
+
+    Parameters
+    ----------
+    level_data : dict
+        Dictionary with the data of the clustering solution of the current level.
+
+    new_t_references_d : dict of set
+        The key is the new topic and the value is the set of references of the topic. The references are int type.
+
+    t_references_d : dict of set
+        The old and the new topics.
+
+    beta_l : list
+        List of the betas to use for the F-score.
+
+    Returns
+    -------
+    level_data : dict
+        Dictionary with the data of the clustering solution of the current level.
+
+    Notes
+    -------
+    Incremental version of c_Metric_Recursion(), used after extend_Clus_Recursion(). The levels that already have metrics only
+    get the metrics of the new topics, while the new levels (the new branches) get the metrics of all the topics.
+    """
+    if 't_cluster_metrics' in level_data.keys():
+        level_data['t_cluster_metrics'].update(t_Cluster_Metrics(level_data, new_t_references_d, beta_l))
+    else:
+        level_data['t_cluster_metrics'] = t_Cluster_Metrics(level_data, t_references_d, beta_l)
+    if 'children_clusters' in level_data.keys():
+        for cluster in level_data['children_clusters']:
+            level_data['children_clusters'][cluster] = extend_Metric_Recursion(level_data['children_clusters'][cluster], new_t_references_d, t_references_d, beta_l)
+    return level_data
@@ -0,0 +1,239 @@
+import http.server
+import threading
+import random
+import time
+import zlib
+import urllib.parse
+import xml.sax.saxutils
+import functions_read_query as read_query
+
+def start_Mock_Server(port=0, esearch_count=None, latency=0.0, error_rate=0.0, throttle_rate=0.0, drop_rate=0.0, max_requests_per_second=None, seed=0):
+    """Starts a local stand-in of the PubMed E-utilities
+
+    Parameters
+    ----------
+    port : int, optional
+        Port of the server. With 0 a free port is used.
+
+    esearch_count : int, optional
+        Number of IDs retrieved by every esearch query. By default it depends on the query (between 1000 and 5999).
+
+    latency : float, optional
+        Seconds that the server waits before answering each request.
+
+    error_rate : float, optional
+        Fraction of the requests answered with a 500 error.
+
+    throttle_rate : float, optional
+        Fraction of the requests answered with a 429 error.
+
+    drop_rate : float, optional
+        Fraction of the requests whose connection is closed without an answer (as when NCBI drops the connection).
+
+    max_requests_per_second : int, optional
+        If it is given, the requests over this number in the same second are answered with a 429 error, as NCBI does.
+
+    seed : int, optional
+        Random seed of the injected errors.
+
+    Returns
+    -------
+    server_d : dict
+        Dictionary with the server ('server'), its thread ('thread'), the base URL to use in c_Pubmed_Client_D() ('base'),
+        the configuration ('config') and the counters of requests per endpoint and injected faults ('counters').
+
+    Notes
+    -------
+    The server answers esearch.fcgi (with retstart, retmax, rettype=count and usehistory=y), efetch.fcgi (rettype=uilist with the
+    WebEnv of a previous esearch) and esummary.fcgi (GET or POST, with several IDs separated by commas) in the same XML format as
+    the E-utilities. The responses are deterministic: the IDs of a query depend
+    only on the query and the title of a document is 'Title of document <id>'.
+    It is used to test and benchmark the functions of functions_read_query without network access.
+    """
+    config = {'esearch_count': esearch_count, 'latency': latency, 'error_rate': error_rate, 'throttle_rate': throttle_rate,
+              'drop_rate': drop_rate, 'max_requests_per_second': max_requests_per_second}
+    server_d = {'config': config, 'counters': {}, 'lock': threading.Lock(), 'random': random.Random(seed), 'second': (None, 0)}
+    handler = type('Mock_Eutils_Handler', (Mock_Eutils_Handler,), {'server_d': server_d})
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    server_d['server'] = server
+    server_d['base'] = 'http://127.0.0.1:' + str(server.server_address[1]) + '/'
+    server_d['thread'] = threading.Thread(target=server.serve_forever, daemon=True)
+    server_d['thread'].start()
+    return server_d
+
+def stop_Mock_Server(server_d):
+    """Stops a server started by start_Mock_Server()"""
+    server_d['server'].shutdown()
+    server_d['server'].server_close()
+    server_d['thread'].join()
+
+def count_Request(server_d, name):
+    """Adds one to a counter of the server"""
+    with server_d['lock']:
+        server_d['counters'][name] = server_d['counters'].get(name, 0) + 1
+
+def esearch_Ids(term, esearch_count=None):
+    """Creates the deterministic list of IDs retrieved by a query in the mock server"""
+    term_hash = zlib.crc32(term.encode('UTF-8'))
+    if esearch_count is None:
+        esearch_count = 1000 + term_hash % 5000
+    first_id = 10000000 + (term_hash % 1000) * 100000
+    id_list = range(first_id, first_id + 3*esearch_count, 3)
+    return id_list
+
+def mock_Title(pubmed_id):
+    """Title of a document in the mock server"""
+    return 'Title of document ' + str(pubmed_id)
+
+def esearch_Xml(term, params_d, esearch_count=None):
+    """Creates the esearch response of the mock server"""
+    id_list = esearch_Ids(term, esearch_count)
+    retstart = int(params_d.get('retstart', 0))
+    retmax = int(params_d.get('retmax', 20))
+    xml_l = ['<?xml version="1.0" encoding="UTF-8" ?>\n<eSearchResult><Count>', str(len(id_list)), '</Count>']
+    if params_d.get('usehistory') == 'y':
+        xml_l += ['<QueryKey>1</QueryKey><WebEnv>', urllib.parse.quote(term), '</WebEnv>']  # The mock WebEnv is the query itself
+    if params_d.get('rettype') != 'count':
+        page = id_list[retstart:retstart + retmax]
+        xml_l += ['<RetMax>', str(len(page)), '</RetMax><RetStart>', str(retstart), '</RetStart><IdList>']
+        xml_l += ['<Id>' + str(pubmed_id) + '</Id>' for pubmed_id in page]
+        xml_l.append('</IdList>')
+    xml_l.append('</eSearchResult>\n')
+    return ''.join(xml_l)
+
+def efetch_Uilist_Xml(params_d, esearch_count=None):
+    """Creates the efetch (rettype=uilist) response of the mock server for a query stored with usehistory=y"""
+    id_list = esearch_Ids(urllib.parse.unquote(params_d.get('WebEnv', '')), esearch_count)
+    retstart = int(params_d.get('retstart', 0))
+    retmax = int(params_d.get('retmax', 20))
+    xml_l = ['<?xml version="1.0" encoding="UTF-8" ?>\n<IdList>']
+    xml_l += ['<Id>' + str(pubmed_id) + '</Id>\n' for pubmed_id in id_list[retstart:retstart + retmax]]
+    xml_l.append('</IdList>\n')
+    return ''.join(xml_l)
+
+def esummary_Xml(id_l):
+    """Creates the esummary response of the mock server. IDs that are not positive integers get an ERROR element, as in PubMed"""
+    xml_l = ['<?xml version="1.0" encoding="UTF-8" ?>\n<eSummaryResult>']
+    for pubmed_id in id_l:
+        if pubmed_id.isdigit() and int(pubmed_id) > 0:
+            xml_l.append('<DocSum><Id>' + pubmed_id + '</Id><Item Name="PubDate" Type="Date">2010</Item><Item Name="Title" Type="String">'
+                         + xml.sax.saxutils.escape(mock_Title(pubmed_id)) + '</Item></DocSum>')
+        else:
+            xml_l.append('<ERROR>UID=' + xml.sax.saxutils.escape(pubmed_id) + ': cannot get document summary</ERROR>')
+    xml_l.append('</eSummaryResult>\n')
+    return ''.join(xml_l)
+
+class Mock_Eutils_Handler(http.server.BaseHTTPRequestHandler):
+    """Request handler of the mock server. The server_d attribute is set by start_Mock_Server()"""
+    protocol_version = 'HTTP/1.1'  # Keep-alive connections, as the E-utilities
+    server_d = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        self.answer(url.path, urllib.parse.parse_qs(url.query))
+
+    def do_POST(self):
+        url = urllib.parse.urlsplit(self.path)
+        length = int(self.headers.get('Content-Length', 0))
+        params = urllib.parse.parse_qs(url.query)
+        params.update(urllib.parse.parse_qs(self.rfile.read(length).decode('UTF-8')))
+        self.answer(url.path, params)
+
+    def answer(self, path, params):
+        server_d = self.server_d
+        config = server_d['config']
+        params_d = {key: value[0] for key, value in params.items()}
+        endpoint = path.rsplit('/', 1)[-1]
+        count_Request(server_d, endpoint)
+        if config['latency'] > 0:
+            time.sleep(config['latency'])
+        status = 200
+        with server_d['lock']:
+            second, n_requests = server_d['second']
+            now_second = int(time.monotonic())
+            n_requests = n_requests + 1 if second == now_second else 1
+            server_d['second'] = (now_second, n_requests)
+            draw = server_d['random'].random()
+        if config['max_requests_per_second'] is not None and n_requests > config['max_requests_per_second']:
+            status = 429
+        elif draw < config['throttle_rate']:
+            status = 429
+        elif draw < config['throttle_rate'] + config['error_rate']:
+            status = 500
+        elif draw < config['throttle_rate'] + config['error_rate'] + config['drop_rate']:
+            count_Request(server_d, 'dropped')
+            self.close_connection = True  # Close the connection without answering
+            return
+        if status != 200:
+            count_Request(server_d, 'error_' + str(status))
+            self.send_Body(status, 'error')
+        elif endpoint == 'esearch.fcgi':
+            self.send_Body(200, esearch_Xml(params_d.get('term', ''), params_d, config['esearch_count']))
+        elif endpoint == 'efetch.fcgi':
+            self.send_Body(200, efetch_Uilist_Xml(params_d, config['esearch_count']))
+        elif endpoint == 'esummary.fcgi':
+            self.send_Body(200, esummary_Xml([x for x in params_d.get('id', '').split(',') if x != '']))
+        else:
+            self.send_Body(404, 'unknown endpoint')
+
+    def send_Body(self, status, body):
+        body = body.encode('UTF-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/xml; charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        if status == 429:
+            self.send_header('Retry-After', '0')
+        self.end_headers()
+        self.wfile.write(body)
+
+def benchmark_Title_Retrieval(n_ids=300, batch_size=200, latency=0.02, requests_per_second=10, max_workers=None):
+    """Compares the per-ID title retrieval with the batched retrieval on the mock server
+
+    Parameters
+    ----------
+    n_ids : int, optional
+        Number of PubMed IDs to retrieve.
+
+    batch_size : int, optional
+        Parameter of retrieve_Pubmed_Titles_D().
+
+    latency : float, optional
+        Latency of the mock server in seconds.
+
+    requests_per_second : float, optional
+        Rate limit of the client.
+
+    max_workers : int, optional
+        Parameter of retrieve_Pubmed_Titles_D().
+
+    Returns
+    -------
+    benchmark_d : dict
+        Seconds and number of requests of each method, the speedup and if both methods retrieved the same titles.
+    """
+    server_d = start_Mock_Server(latency=latency)
+    try:
+        pubmed_id_l = list(range(20000000, 20000000 + n_ids))
+        benchmark_d = {'n_ids': n_ids, 'batch_size': batch_size}
+        client_d = read_query.c_Pubmed_Client_D(requests_per_second=requests_per_second, pubmed_api_base=server_d['base'])
+        start = time.perf_counter()
+        loop_titles_d = {}
+        for pubmed_id in pubmed_id_l:
+            pubmed_title = read_query.retrieve_Pubmed_Title(pubmed_id, client_d=client_d)
+            loop_titles_d[pubmed_title[0]] = pubmed_title[1]
+        benchmark_d['loop_seconds'] = time.perf_counter() - start
+        benchmark_d['loop_requests'] = read_query.client_Stats_D(client_d)['requests']
+        client_d = read_query.c_Pubmed_Client_D(requests_per_second=requests_per_second, pubmed_api_base=server_d['base'])
+        start = time.perf_counter()
+        batch_titles_d, failed_l = read_query.retrieve_Pubmed_Titles_D(pubmed_id_l, batch_size=batch_size, client_d=client_d, max_workers=max_workers)
+        benchmark_d['batch_seconds'] = time.perf_counter() - start
+        benchmark_d['batch_requests'] = read_query.client_Stats_D(client_d)['requests']
+        benchmark_d['speedup'] = benchmark_d['loop_seconds'] / benchmark_d['batch_seconds']
+        benchmark_d['same_titles'] = loop_titles_d == batch_titles_d and len(failed_l) == 0
+    finally:
+        stop_Mock_Server(server_d)
+    return benchmark_d
@@ -0,0 +1,303 @@
+import collections
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+NOUN_POS = ('NOUN', 'PROPN')  # Part of speech of the last word of a noun phrase
+NOUN_PHRASE_POS = ('NOUN', 'ADJ', 'PROPN')  # Part of speech of the words of a noun phrase
+DISABLED_COMPONENTS = ('parser', 'ner')  # The noun phrases only need the part of speech and the lemmas
+
+def get_Noun_Index_L(doc_class):
+    """Finds the nouns of a title
+
+    Parameters
+    ----------
+    doc_class : spacy.tokens.Doc
+        Title processed by the pipeline.
+
+    Returns
+    -------
+    index_l : list of int
+        Indices of the words whose part of speech is a noun or a proper noun (NOUN_POS), in the order of the title.
+    """
+    index_l = []
+    for index in range(len(doc_class)):
+        pos = doc_class[index].pos_
+        if pos == 'NOUN' or pos == 'PROPN':
+            index_l.append(index)
+    return index_l
+
+def expand_Noun_Phrase(np_index, doc_class):
+    """Expands a noun to the noun phrase that ends with it
+
+    Parameters
+    ----------
+    np_index : int
+        Index of the noun (see get_Noun_Index_L()).
+
+    doc_class : spacy.tokens.Doc
+        Title processed by the pipeline.
+
+    Returns
+    -------
+    noun_phrase_indices : list of int
+        Indices of the words of the noun phrase, in the order of the title. The noun phrase extends to the left of the noun while
+        the words are nouns, adjectives or proper nouns (NOUN_PHRASE_POS).
+    """
+    noun_phrase_indices = [np_index]
+    for index in list(reversed(range(np_index))):
+        pos = doc_class[index].pos_
+        if pos == 'NOUN' or pos == 'ADJ' or pos == 'PROPN':
+            noun_phrase_indices.append(index)
+        else:
+            break
+    noun_phrase_indices = list(reversed(noun_phrase_indices))
+    return noun_phrase_indices
+
+def np_List_List_Loop(titles_list, nlp):
+    """Extracts the noun phrases of each title, one title at a time
+
+    Notes
+    -------
+    This is the original function of results.ipynb (np_List_List), kept as the reference for np_List_List() and
+    benchmark_Noun_Phrases(). It runs the full pipeline of nlp on each title.
+    """
+    np_words_l_l = []
+    for title in titles_list:
+        lower_title = title.lower()
+        doc_class = nlp(lower_title)
+        noun_index_l = get_Noun_Index_L(doc_class)
+        done_np_indices = set()
+        np_words_l = []
+        for index in reversed(noun_index_l):
+            if index not in done_np_indices:
+                expanded_np_indices = expand_Noun_Phrase(index, doc_class)
+                done_np_indices = done_np_indices.union(set(expanded_np_indices))
+                np_words = tuple([doc_class[x].lemma_ for x in expanded_np_indices])
+                np_words_l.append(np_words)
+        np_words_l_l.append(np_words_l)
+    return np_words_l_l
+
+def doc_Noun_Phrases(pos_l, lemma_l):
+    """Extracts the noun phrases of a title
+
+    Parameters
+    ----------
+    pos_l : list of str
+        Part of speech of each word of the title.
+
+    lemma_l : list of str
+        Lemma of each word of the title.
+
+    Returns
+    -------
+    np_words_l : list of tuple
+        Noun phrases of the title, from the last one to the first one. Each noun phrase is a tuple of lemmas.
+
+    Notes
+    -------
+    A noun phrase ends with a noun (or proper noun) and extends to the left while the words are nouns, adjectives or proper nouns.
+    The nouns are visited from the last one to the first one, and the nouns inside a noun phrase that was already extracted are
+    skipped. The words of the extracted noun phrases always are a contiguous block at the right of the current word, so it is
+    enough to remember where the last noun phrase started (first_index) instead of the set of done indices of np_List_List_Loop().
+    """
+    np_words_l = []
+    first_index = len(pos_l)
+    for index in reversed(range(len(pos_l))):
+        if index < first_index and pos_l[index] in NOUN_POS:
+            first_index = index
+            while first_index > 0 and pos_l[first_index - 1] in NOUN_PHRASE_POS:
+                first_index -= 1
+            np_words_l.append(tuple(lemma_l[first_index:index + 1]))
+    return np_words_l
+
+def iter_Noun_Phrases(titles_list, nlp, batch_size=256, n_process=1, cache_d=None, chunk_size=10000):
+    """Extracts the noun phrases of each title as a stream
+
+    Parameters
+    ----------
+    titles_list : iterable of str
+        Titles.
+
+    nlp : spacy.language.Language
+        Pipeline (e.g. en_core_web_sm.load()).
+
+    batch_size : int, optional
+        Parameter of nlp.pipe().
+
+    n_process : int, optional
+        Parameter of nlp.pipe(). Number of processes that run the pipeline.
+
+    cache_d : dict, optional
+        Cache created by c_Phrase_Cache_D(). The titles in the cache are not processed again and the new titles are added to it.
+
+    chunk_size : int, optional
+        Number of titles read from titles_list at once.
+
+    Yields
+    -------
+    np_words_l : list of tuple
+        Noun phrases of each title (see doc_Noun_Phrases()), in the order of titles_list.
+
+    Notes
+    -------
+    The titles are processed with nlp.pipe(), so spaCy works by batches (and in parallel with n_process > 1), and the components
+    that are not needed for the part of speech and the lemmas (DISABLED_COMPONENTS) are disabled. The result is the same as
+    np_List_List_Loop().
+    """
+    disable = [name for name in DISABLED_COMPONENTS if name in nlp.pipe_names]
+    chunk = []
+    for title in titles_list:
+        chunk.append(title.lower())
+        if len(chunk) == chunk_size:
+            for np_words_l in chunk_Noun_Phrases(chunk, nlp, batch_size, n_process, disable, cache_d):
+                yield np_words_l
+            chunk = []
+    if len(chunk) > 0:
+        for np_words_l in chunk_Noun_Phrases(chunk, nlp, batch_size, n_process, disable, cache_d):
+            yield np_words_l
+
+def chunk_Noun_Phrases(lower_titles_l, nlp, batch_size, n_process, disable, cache_d):
+    """Extracts the noun phrases of a chunk of lowercase titles, see iter_Noun_Phrases()"""
+    if cache_d is None:
+        cached_d = {}
+    else:
+        cached_d = cache_Get_Many(cache_d, lower_titles_l)
+    new_titles_l = list(dict.fromkeys([title for title in lower_titles_l if title not in cached_d]))
+    new_d = {}
+    for title, doc_class in zip(new_titles_l, nlp.pipe(new_titles_l, batch_size=batch_size, n_process=n_process, disable=disable)):
+        new_d[title] = doc_Noun_Phrases([token.pos_ for token in doc_class], [token.lemma_ for token in doc_class])
+    if cache_d is not None and len(new_d) > 0:
+        cache_Put_Many(cache_d, new_d)
+    np_words_l_l = []
+    for title in lower_titles_l:
+        if title in new_d:
+            np_words_l_l.append(new_d[title])
+        else:
+            np_words_l_l.append(cached_d[title])
+    return np_words_l_l
+
+def np_List_List(titles_list, nlp, batch_size=256, n_process=1, cache_d=None):
+    """Extracts the noun phrases of each title
+
+    Parameters
+    ----------
+    The same as iter_Noun_Phrases().
+
+    Returns
+    -------
+    np_words_l_l : list of list of tuple
+        Noun phrases of each title.
+    """
+    np_words_l_l = list(iter_Noun_Phrases(titles_list, nlp, batch_size=batch_size, n_process=n_process, cache_d=cache_d))
+    return np_words_l_l
+
+def get_Nounphrases(titles_list, nlp, batch_size=256, n_process=1, cache_d=None):
+    """Extracts and counts the noun phrases of the titles
+
+    Parameters
+    ----------
+    The same as iter_Noun_Phrases().
+
+    Returns
+    -------
+    np_dict : dict
+        'titles' is the list of noun phrases of each title and 'count' is the list of (noun phrase, number of times), sorted
+        from the most common noun phrase to the least common.
+    """
+    np_words_l_l = np_List_List(titles_list, nlp, batch_size=batch_size, n_process=n_process, cache_d=cache_d)
+    flat_list = [item for sublist in np_words_l_l for item in sublist]
+    count_d = dict(collections.Counter(flat_list))
+    sorted_count = sorted(list(count_d.items()), key=lambda x: x[1], reverse=True)
+    np_dict = {'titles': np_words_l_l, 'count': sorted_count}
+    return np_dict
+
+def c_Phrase_Cache_D(path, nlp):
+    """Creates (or opens) an on-disk cache of the noun phrases of the titles
+
+    Parameters
+    ----------
+    path : str
+        Path of the cache file (an SQLite database).
+
+    nlp : spacy.language.Language
+        Pipeline used to extract the noun phrases. Its name and version are part of the key, so a different model does not use
+        the phrases of another model.
+
+    Returns
+    -------
+    cache_d : dict
+        Dictionary with the connection to the cache.
+
+    Notes
+    -------
+    The key of a title is the hash of the model and the lowercase title.
+    """
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.execute('CREATE TABLE IF NOT EXISTS phrases (key TEXT PRIMARY KEY, phrases TEXT)')
+    connection.commit()
+    model = str(nlp.meta.get('lang')) + '_' + str(nlp.meta.get('name')) + '-' + str(nlp.meta.get('version'))
+    cache_d = {'path': path, 'connection': connection, 'lock': threading.Lock(), 'model': model}
+    return cache_d
+
+def title_Key(cache_d, lower_title):
+    """Key of a title in the cache"""
+    return hashlib.sha256((cache_d['model'] + '\n' + lower_title).encode('UTF-8')).hexdigest()
+
+def cache_Get_Many(cache_d, lower_titles_l):
+    """Gets the noun phrases of the titles that are in the cache, as a dictionary where the key is the title"""
+    key_title_d = {title_Key(cache_d, title): title for title in lower_titles_l}
+    cached_d = {}
+    key_l = list(key_title_d)
+    with cache_d['lock']:
+        for start in range(0, len(key_l), 500):  # SQLite limits the number of parameters of a query
+            key_chunk = key_l[start:start + 500]
+            query = 'SELECT key, phrases FROM phrases WHERE key IN (' + ','.join(['?']*len(key_chunk)) + ')'
+            for key, phrases in cache_d['connection'].execute(query, key_chunk):
+                cached_d[key_title_d[key]] = [tuple(np_words) for np_words in json.loads(phrases)]
+    return cached_d
+
+def cache_Put_Many(cache_d, title_phrases_d):
+    """Stores the noun phrases of the titles (dictionary where the key is the title) in the cache"""
+    row_l = [(title_Key(cache_d, title), json.dumps(title_phrases_d[title])) for title in title_phrases_d]
+    with cache_d['lock']:
+        cache_d['connection'].executemany('INSERT OR REPLACE INTO phrases (key, phrases) VALUES (?, ?)', row_l)
+        cache_d['connection'].commit()
+
+def benchmark_Noun_Phrases(titles_list, nlp, batch_size=256, n_process=1):
+    """Compares the titles per second of np_List_List_Loop() and np_List_List()
+
+    Parameters
+    ----------
+    titles_list : list of str
+        Titles.
+
+    nlp : spacy.language.Language
+        Pipeline.
+
+    batch_size : int, optional
+        Parameter of np_List_List().
+
+    n_process : int, optional
+        Parameter of np_List_List().
+
+    Returns
+    -------
+    benchmark_d : dict
+        Titles per second of each function, the speedup and if both functions extracted the same noun phrases. The cache is not
+        used, so the time is the time of the extraction.
+    """
+    benchmark_d = {'titles': len(titles_list), 'batch_size': batch_size, 'n_process': n_process}
+    start = time.perf_counter()
+    loop_np_words_l_l = np_List_List_Loop(titles_list, nlp)
+    loop_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    np_words_l_l = np_List_List(titles_list, nlp, batch_size=batch_size, n_process=n_process)
+    pipe_seconds = time.perf_counter() - start
+    benchmark_d['loop_titles_per_second'] = len(titles_list) / loop_seconds
+    benchmark_d['pipe_titles_per_second'] = len(titles_list) / pipe_seconds
+    benchmark_d['speedup'] = loop_seconds / pipe_seconds
+    benchmark_d['same_phrases'] = loop_np_words_l_l == np_words_l_l
+    return benchmark_d
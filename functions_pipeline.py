@@ -0,0 +1,337 @@
+import time
+import functions_reading as reading
+import functions_iterative_clustering as iterative_clustering
+import functions_clustering as clustering
+import functions_metrics as metrics
+import functions_select_cluster as select_cluster
+import functions_profiling as profiling
+import functions_memory as memory
+import functions_work_queue as work_queue
+import functions_reference_table as reference_table
+import functions_warm_start as warm_start
+import functions_compare_hierarchies as compare_hierarchies
+
+def c_Cs_D(year, refferences_d, path_network, initial_resolution, clusters_per_level, max_depth, resolution_factor, beta_l, encoding=None, errors=None, normalize_edges=False, self_loops='drop'):
+    """Create the base of the clustering solution dictionary
+
+    Parameters
+    ----------
+    year : int
+        Publication year of the systematic reviews. It is used for retrieving the references of the systematic reviews.
+
+    refferences_d : dict
+        Dictionary with the references of each topic, or a reference table (see functions_reference_table). Only the
+        references of the year 'year' of the table are used.
+
+    path_network : str
+        Path of the file of the network.
+
+    initial_resolution : float
+        Resolution of the clustering algorithm in the first level.
+
+    clusters_per_level : int
+        Maximum number of clusters per branch per level (including the initial level).
+
+    max_depth : int
+        Lowest level of the clustering
+
+    resolution_factor : float
+        Factor by which the value of the resolution increases at each level.
+
+    encoding : str, optional
+        Parameter of p_Tab_Delimited()
+
+    errors : str, optional
+        Parameter of p_Tab_Delimited()
+
+    normalize_edges : bool, optional
+        If True the reciprocal citations are merged into one edge weighted by its multiplicity, the graph is weighted (see
+        functions_reading.normalize_Network()) and the report of the removed edges is cs['edge_report']. By default the graph
+        is created as before (create_Igraph_Network()).
+
+    self_loops : str, optional
+        Parameter of functions_reading.normalize_Network().
+
+    Returns
+    -------
+    cs : dict
+        Dictionary with the data of the clustering solution.
+
+    Notes
+    -------
+    t_references_d = dict of set (int -> set -> int). It only contains the references of the systematic reviews published on the year 'year'
+    """
+    cs = {}
+    cs['YEAR'] = year
+    cs['INITIAL_RESOLUTION'] = initial_resolution
+    cs['CLUSTERS_PER_LEVEL'] = clusters_per_level
+    cs['PATH_NETWORK'] = path_network
+    cs['t_references_d'] = reference_table.t_References_D(refferences_d, year)
+    with profiling.stage_Timer('read_Network'):
+        tab_del_net = reading.p_Tab_Delimited(path_network, encoding=encoding, errors=errors)
+        cs['parsed_network'] = reading.parse_Network(tab_del_net)
+        del tab_del_net  # The rows are not needed to create the graph
+        if normalize_edges:
+            weighted_network, cs['edge_report'] = reading.normalize_Network(cs['parsed_network'], self_loops=self_loops)
+            cs['igraph_network'] = reading.create_Weighted_Igraph_Network(weighted_network)
+            del weighted_network
+        else:
+            cs['igraph_network'] = reading.create_Igraph_Network(cs['parsed_network'])
+    cs['max_depth'] = max_depth
+    cs['resolution_factor'] = resolution_factor
+    cs['beta_l'] = beta_l
+    return cs
+
+def pipeline_Clustering(year, refferences_d, path_network, initial_resolution=0.000002, clusters_per_level=10, max_depth=13, resolution_factor=3.0, beta_l=[0.125, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0], encoding=None, errors=None, memory_budget=None, spill_dir=None, trace_memory=False, memory_report=False, queue_dir=None, split_level=1, normalize_edges=False, self_loops='drop', coarsen=False, warm_start_d=None):
+    """Create the clustering solution of a year
+
+    Parameters
+    ----------
+    year : int
+        Publication year of the systematic reviews.
+
+    refferences_d : dict of set
+        The key is the topic and the value is the set of references of the topic. The references are int type.
+        It can also be a reference table (see functions_reference_table).
+
+    path_network : str
+        Path of the file of the network.
+
+    memory_budget : int, optional
+        Ceiling in bytes of the graphs held in memory. If it is given, the pipeline runs in budget mode: the parsed network is
+        removed from cs once the graph is created, the graph is handed over (removed from cs) to c_Budget_Clus_Recursion(),
+        which releases the graph of each level once its children are extracted and spills the children subgraphs to disk while
+        the graphs in memory (estimated from their number of vertices and edges) are over the budget. The result is the same.
+
+    spill_dir : str, optional
+        Directory for the spilled subgraphs. By default a temporary directory.
+
+    trace_memory : bool, optional
+        If True the Python allocations of each stage are traced with tracemalloc (slower).
+
+    memory_report : bool, optional
+        If True the peak memory of the run is measured from its start (see functions_memory.c_Memory_D()), otherwise it is the
+        peak of the process.
+
+    queue_dir : str, optional
+        Directory of a work queue. If it is given, the subtrees below split_level are run by the workers of the queue (see
+        functions_work_queue.queue_Clus_Recursion()). The result is the same. It can't be used with memory_budget.
+
+    split_level : int, optional
+        Parameter of functions_work_queue.queue_Clus_Recursion().
+
+    coarsen : bool, optional
+        If True the top level is clustered on the core of the network, with the pendant trees contracted into their anchor (see
+        functions_clustering.set_Coarsening()). The lower levels are clustered as usual.
+
+    warm_start_d : dict, optional
+        Parameters of functions_clustering.set_Warm_Start() for the clustering of this year (see pipeline_Years()).
+
+    The rest of the parameters are the same as in c_Cs_D().
+
+    Returns
+    -------
+    cs : dict
+        Dictionary with the data of the clustering solution. Besides the keys of c_Cs_D(), it contains the tree of clusters
+        ('level_data'), the clusters selected by the greedy algorithm ('t_greedy_data'), all the F-scores of the tree
+        ('t_universal_fscore') and the memory of each stage and the peak memory of the run ('memory', see
+        functions_memory.c_Memory_D()). In budget mode it does not contain 'parsed_network' nor 'igraph_network' (the size of
+        the graph is in 'network_size'), so it can't be extended with extend_Pipeline_Clustering().
+
+    Notes
+    -------
+    The pipeline is: clustering tree (c_Clus_Recursion, see pipeline_Tree()), metrics of each level (c_Metric_Recursion), greedy
+    algorithm (c_T_Greedy_D) and all the F-scores (c_T_Universal_Fscore_D, see pipeline_Metrics()).
+    Each stage is timed if the profiling is on (see functions_profiling.enable_Profiling()).
+    """
+    assert (queue_dir is None or memory_budget is None), 'The work queue and the memory budget can not be used together'
+    memory_d = memory.c_Memory_D(memory_budget=memory_budget, spill_dir=spill_dir, trace_memory=trace_memory, memory_report=memory_report)
+    cs = pipeline_Tree(year, refferences_d, path_network, memory_d, initial_resolution, clusters_per_level, max_depth, resolution_factor, beta_l, encoding=encoding, errors=errors, queue_dir=queue_dir, split_level=split_level, normalize_edges=normalize_edges, self_loops=self_loops, coarsen=coarsen, warm_start_d=warm_start_d)
+    cs = pipeline_Metrics(cs, memory_d)
+    cs['memory'] = memory.finish_Memory_D(memory_d)
+    return cs
+
+def pipeline_Tree(year, refferences_d, path_network, memory_d, initial_resolution=0.000002, clusters_per_level=10, max_depth=13, resolution_factor=3.0, beta_l=[0.125, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0], encoding=None, errors=None, queue_dir=None, split_level=1, normalize_edges=False, self_loops='drop', coarsen=False, warm_start_d=None):
+    """Creates the tree of clusters of a year (the first stages of pipeline_Clustering())
+
+    Parameters
+    ----------
+    memory_d : dict
+        Memory accounting of the run (see functions_memory.c_Memory_D()). If it has a budget, the tree is created in budget
+        mode (see pipeline_Clustering()).
+
+    The rest of the parameters are the same as in pipeline_Clustering().
+
+    Returns
+    -------
+    cs : dict
+        The keys of c_Cs_D() and the tree of clusters ('level_data'), without metrics (see pipeline_Metrics()).
+
+    Notes
+    -------
+    The modes of the clustering (coarsening and warm start) are set only for this tree, and their previous values are restored
+    afterwards, also if the clustering fails.
+    """
+    memory_budget = memory_d['budget']
+    with memory.memory_Stage(memory_d, 'c_Cs_D'):
+        cs = c_Cs_D(year, refferences_d, path_network, initial_resolution, clusters_per_level, max_depth, resolution_factor, beta_l, encoding=encoding, errors=errors, normalize_edges=normalize_edges, self_loops=self_loops)
+        if memory_budget is not None:
+            del cs['parsed_network']  # The graph is created, the set of edges is not needed
+    saved_min_vcount = clustering.COARSEN_D['min_vcount']
+    saved_warm_start_d = dict(clustering.WARM_START_D)
+    if coarsen:
+        clustering.set_Coarsening(cs['igraph_network'].vcount())  # The children graphs are smaller, so only the top level
+    if warm_start_d is not None:
+        clustering.set_Warm_Start(**warm_start_d)
+    try:
+        with profiling.stage_Timer('c_Clus_Recursion', year=year), memory.memory_Stage(memory_d, 'c_Clus_Recursion'):
+            if queue_dir is not None:
+                cs['level_data'], ITERATIONS_COUNT = work_queue.queue_Clus_Recursion(cs['igraph_network'], cs['INITIAL_RESOLUTION'], 0, cs['max_depth'], cs['CLUSTERS_PER_LEVEL'], cs['t_references_d'], cs['resolution_factor'], 0, queue_dir, split_level=split_level)
+            elif memory_budget is None:
+                cs['level_data'], ITERATIONS_COUNT = iterative_clustering.c_Clus_Recursion(cs['igraph_network'], cs['INITIAL_RESOLUTION'], 0, cs['max_depth'], cs['CLUSTERS_PER_LEVEL'], cs['t_references_d'], cs['resolution_factor'], 0)
+            else:
+                cs['network_size'] = {'vcount': cs['igraph_network'].vcount(), 'ecount': cs['igraph_network'].ecount()}
+                graph_entry = {'graph': cs.pop('igraph_network')}  # The recursion releases the root graph after the first level
+                memory.add_Live_Graph(memory_d, graph_entry['graph'])
+                cs['level_data'], ITERATIONS_COUNT = iterative_clustering.c_Budget_Clus_Recursion(graph_entry, cs['INITIAL_RESOLUTION'], 0, cs['max_depth'], cs['CLUSTERS_PER_LEVEL'], cs['t_references_d'], cs['resolution_factor'], 0, memory_d)
+    finally:
+        clustering.set_Coarsening(saved_min_vcount)
+        clustering.set_Warm_Start(**saved_warm_start_d)
+    cs['level_data']['ITERATIONS_COUNT'] = ITERATIONS_COUNT
+    return cs
+
+def pipeline_Metrics(cs, memory_d):
+    """Calculates the metrics of each level, the greedy algorithm and all the F-scores of a tree created by pipeline_Tree() (the
+    last stages of pipeline_Clustering()), with the beta values of cs['beta_l']. cs is modified in place and returned"""
+    year = cs['YEAR']
+    with profiling.stage_Timer('c_Metric_Recursion', year=year), memory.memory_Stage(memory_d, 'c_Metric_Recursion'):
+        cs['level_data'] = metrics.c_Metric_Recursion(cs['level_data'], cs['t_references_d'], cs['beta_l'])
+    with profiling.stage_Timer('c_T_Greedy_D', year=year), memory.memory_Stage(memory_d, 'c_T_Greedy_D'):
+        cs['t_greedy_data'] = select_cluster.c_T_Greedy_D(cs['level_data'], cs['t_references_d'], cs['beta_l'])
+    with profiling.stage_Timer('c_T_Universal_Fscore_D', year=year), memory.memory_Stage(memory_d, 'c_T_Universal_Fscore_D'):
+        cs['t_universal_fscore'] = select_cluster.c_T_Universal_Fscore_D(cs['t_references_d'], cs['beta_l'], cs['level_data'])
+    return cs
+
+def extend_Pipeline_Clustering(cs, new_refferences_d):
+    """Add new topics to an existing clustering solution
+
+    Parameters
+    ----------
+    cs : dict
+        Clustering solution created by pipeline_Clustering(). It is modified in place.
+
+    new_refferences_d : dict of set
+        The key is the new topic and the value is the set of references of the topic. The references are int type.
+        The topics can not be already in the clustering solution. It can also be a reference table, whose references of the
+        year of the clustering solution are used.
+
+    Returns
+    -------
+    cs : dict
+        The clustering solution with the new topics. It is the same as running pipeline_Clustering() with the old and the
+        new topics together.
+
+    Notes
+    -------
+    The clustering of a level only depends on its graph and its resolution (the random seed is fixed), so adding topics does
+    not change the clusters that already exist. It only adds branches under the clusters that become positive because of
+    the new topics. Therefore, this function only clusters the new branches (see extend_Clus_Recursion()), and only
+    calculates the metrics, the greedy algorithm and the F-scores of the new topics (plus the metrics of the new branches).
+    """
+    assert ('igraph_network' in cs), 'The clustering solution has no network (it was created in budget mode)'
+    new_refferences_d = reference_table.t_References_D(new_refferences_d, cs['YEAR'])
+    repeated_topics = set(new_refferences_d).intersection(cs['t_references_d'])
+    assert (len(repeated_topics) == 0), 'Topics already in the clustering solution: ' + str(sorted(repeated_topics))
+    t_references_d = dict(cs['t_references_d'])
+    t_references_d.update(new_refferences_d)
+    cs['t_references_d'] = t_references_d
+    ITERATIONS_COUNT = cs['level_data']['ITERATIONS_COUNT']
+    cs['level_data'], ITERATIONS_COUNT = iterative_clustering.extend_Clus_Recursion(cs['level_data'], cs['igraph_network'], new_refferences_d, cs['t_references_d'], cs['max_depth'], cs['CLUSTERS_PER_LEVEL'], cs['resolution_factor'], ITERATIONS_COUNT)
+    cs['level_data']['ITERATIONS_COUNT'] = ITERATIONS_COUNT
+    cs['level_data'] = metrics.extend_Metric_Recursion(cs['level_data'], new_refferences_d, cs['t_references_d'], cs['beta_l'])
+    cs['t_greedy_data'].update(select_cluster.c_T_Greedy_D(cs['level_data'], new_refferences_d, cs['beta_l']))
+    cs['t_universal_fscore'].update(select_cluster.c_T_Universal_Fscore_D(new_refferences_d, cs['beta_l'], cs['level_data']))
+    return cs
+
+def pipeline_Years(year_l, year_references_d, network_d, node_map_d=None, warm=False, reuse=True, **pipeline_params):
+    """Runs pipeline_Clustering() for consecutive years, starting each year from the clustering of the previous year
+
+    Parameters
+    ----------
+    year_l : list
+        Years in the order to run them (e.g. [2014, 2015, 2016]).
+
+    year_references_d : dict
+        The key is the year and the value is the references of the year (refferences_d of pipeline_Clustering()).
+
+    network_d : dict
+        The key is the year and the value is the path of the network of the year.
+
+    node_map_d : dict, optional
+        The key is the year and the value is the node map from the net IDs of the year to the net IDs of the next year (see
+        functions_warm_start.c_Node_Map_D()). By default the years share the IDs.
+
+    warm : bool, optional
+        If True the Leiden algorithm starts from the clusters of the previous year (see functions_warm_start.c_Warm_Labels_D()).
+        The result is different from a cold run (see benchmark_Warm_Start()).
+
+    reuse : bool, optional
+        If True the partitions of the previous year are reused for the graphs that did not change (see
+        functions_warm_start.graph_Key()). With warm=False and the same IDs the result is the same as a cold run.
+
+    pipeline_params : optional
+        Parameters of pipeline_Clustering().
+
+    Returns
+    -------
+    cs_d : dict
+        The key is the year and the value is the clustering solution. cs['warm_start'] has the seconds of the clustering and
+        the hits and misses of the partition cache.
+
+    Notes
+    -------
+    The first year is a cold run. The warm start and the reuse only apply in this process, not in the workers of a work queue.
+    """
+    node_map_d = node_map_d or {}
+    cs_d = {}
+    labels_d = None
+    cache_d = None
+    for year_i, year in enumerate(year_l):
+        next_cache_d = warm_start.c_Partition_Cache_D() if reuse and year_i + 1 < len(year_l) else None
+        warm_start_d = {'labels_d': labels_d, 'cache_d': cache_d, 'record_cache_d': next_cache_d, 'node_map': node_map_d.get(year)}
+        start = time.perf_counter()
+        cs = pipeline_Clustering(year, year_references_d[year], network_d[year], warm_start_d=warm_start_d, **pipeline_params)
+        cs['warm_start'] = {'seconds': time.perf_counter() - start, 'warm': labels_d is not None}
+        if cache_d is not None:
+            cs['warm_start'].update({x: cache_d[x] for x in ['hits', 'misses']})
+        cs_d[year] = cs
+        if warm:
+            labels_d = warm_start.c_Warm_Labels_D(cs['level_data'], cs['INITIAL_RESOLUTION'], node_map=node_map_d.get(year))
+        cache_d = next_cache_d
+    return cs_d
+
+def benchmark_Warm_Start(year_l, year_references_d, network_d, node_map_d=None, **pipeline_params):
+    """Measures the speedup of the reuse and of the warm start, and how much their hierarchies differ from the cold runs
+
+    Returns
+    -------
+    benchmark_d : dict
+        'records': one record per mode ('cold', 'reuse', 'warm' and 'warm_reuse') and year, with the seconds, the speedup over
+        the cold run, the hits and misses of the partition cache and the comparison with the cold hierarchy of the year, level
+        by level (see functions_compare_hierarchies.compare_Hierarchies()).
+    """
+    mode_d = {'cold': {'warm': False, 'reuse': False}, 'reuse': {'warm': False, 'reuse': True},
+              'warm': {'warm': True, 'reuse': False}, 'warm_reuse': {'warm': True, 'reuse': True}}
+    cold_cs_d = None
+    record_l = []
+    for mode in mode_d:
+        cs_d = pipeline_Years(year_l, year_references_d, network_d, node_map_d=node_map_d, **dict(pipeline_params, **mode_d[mode]))
+        if mode == 'cold':
+            cold_cs_d = cs_d
+        for year in year_l:
+            record = {'mode': mode, 'year': year, 'seconds': cs_d[year]['warm_start']['seconds'],
+                      'speedup': cold_cs_d[year]['warm_start']['seconds'] / cs_d[year]['warm_start']['seconds'],
+                      'hits': cs_d[year]['warm_start'].get('hits', 0), 'misses': cs_d[year]['warm_start'].get('misses', 0)}
+            record['difference'] = compare_hierarchies.compare_Hierarchies(cold_cs_d[year]['level_data'], cs_d[year]['level_data'])
+            record_l.append(record)
+    return {'records': record_l}
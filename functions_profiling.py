@@ -0,0 +1,221 @@
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+PROFILE_D = {'enabled': False}  # Profiling state, see reset_Profiling(). It is off by default
+NULL_TIMER = contextlib.nullcontext()  # Returned by stage_Timer() and node_Timer() when the profiling is off
+
+def reset_Profiling():
+    """Removes the recorded data (the profiling stays on or off)"""
+    PROFILE_D['events'] = []  # One event per stage or node, in the order they finish
+    PROFILE_D['nodes'] = []  # One record per tree node, in the order they start
+    PROFILE_D['counters'] = {}  # Counters that are not inside a node
+    PROFILE_D['local'] = threading.local()  # Stack of open nodes of each thread
+    PROFILE_D['lock'] = threading.Lock()
+    PROFILE_D['origin'] = time.perf_counter()
+
+def enable_Profiling(reset=True):
+    """Turns the profiling on. With reset=True the data of a previous run is removed"""
+    if reset or 'events' not in PROFILE_D:
+        reset_Profiling()
+    PROFILE_D['enabled'] = True
+
+def disable_Profiling():
+    """Turns the profiling off. The recorded data is kept until the next reset"""
+    PROFILE_D['enabled'] = False
+
+def node_Stack():
+    """Stack of the open nodes of the current thread"""
+    local = PROFILE_D['local']
+    if not hasattr(local, 'stack'):
+        local.stack = []
+    return local.stack
+
+def record_Event(name, start, end, kind, args):
+    """Stores a finished stage or node"""
+    event = {'name': name, 'kind': kind, 'start': start - PROFILE_D['origin'], 'seconds': end - start,
+             'pid': os.getpid(), 'tid': threading.get_ident(), 'args': args}
+    with PROFILE_D['lock']:
+        PROFILE_D['events'].append(event)
+
+class Stage_Timer:
+    """Context manager that records the time of a stage. It is created by stage_Timer()"""
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = time.perf_counter()
+        stack = node_Stack()
+        if len(stack) > 0:
+            node = stack[-1]
+            node['stages'][self.name] = node['stages'].get(self.name, 0.0) + end - self.start
+            self.args['node'] = node['node']
+        record_Event(self.name, self.start, end, 'stage', self.args)
+        return False
+
+class Node_Timer:
+    """Context manager that records a node of the clustering tree. It is created by node_Timer()"""
+    def __init__(self, record):
+        self.record = record
+
+    def __enter__(self):
+        stack = node_Stack()
+        if len(stack) > 0:
+            self.record['parent'] = stack[-1]['node']
+        with PROFILE_D['lock']:
+            self.record['node'] = len(PROFILE_D['nodes'])
+            PROFILE_D['nodes'].append(self.record)
+        stack.append(self.record)
+        self.start = time.perf_counter()
+        return self.record
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = time.perf_counter()
+        node_Stack().pop()
+        self.record['seconds'] = end - self.start
+        self.record['self_seconds'] = self.record['seconds'] - self.record.pop('children_seconds', 0.0)
+        stack = node_Stack()
+        if len(stack) > 0:
+            stack[-1]['children_seconds'] = stack[-1].get('children_seconds', 0.0) + self.record['seconds']
+        args = {key: self.record[key] for key in ('node', 'level', 'resolution', 'vcount', 'ecount')}
+        record_Event('level ' + str(self.record['level']), self.start, end, 'node', args)
+        return False
+
+def stage_Timer(name, **args):
+    """Times a stage of the pipeline
+
+    Parameters
+    ----------
+    name : str
+        Name of the stage (e.g. 'get_Partition_Class').
+
+    **args
+        Values stored with the event (they are shown in the Chrome trace).
+
+    Returns
+    -------
+    timer : context manager
+        Use it as "with profiling.stage_Timer('name'):". If the profiling is off it does nothing.
+
+    Notes
+    -------
+    The time of the stage is added to the stages of the innermost open node (see node_Timer()), so the time of each stage can be
+    known per level.
+    """
+    if not PROFILE_D['enabled']:
+        return NULL_TIMER
+    return Stage_Timer(name, args)
+
+def timed(name=None):
+    """Decorator that times each call of a function as a stage (see stage_Timer()). The name of the stage is the name of the
+    function by default. If the profiling is off the only cost is one extra function call"""
+    def decorator(function):
+        stage_name = function.__name__ if name is None else name
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not PROFILE_D['enabled']:
+                return function(*args, **kwargs)
+            with Stage_Timer(stage_name, {}):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def node_Timer(level, resolution, graph):
+    """Records a node of the clustering tree
+
+    Parameters
+    ----------
+    level : int
+        Level of the node.
+
+    resolution : float
+        Resolution of the clustering of the node.
+
+    graph : igraph.Graph
+        Graph of the node.
+
+    Returns
+    -------
+    timer : context manager
+        Use it as "with profiling.node_Timer(level, resolution, graph):". If the profiling is off it does nothing.
+
+    Notes
+    -------
+    The record of the node contains the level, the resolution, the size of the graph ('vcount' and 'ecount'), the parent node,
+    the time of each stage inside the node ('stages'), the values added with add_Node_Values() (e.g. number of clusters and merge
+    steps), the total time ('seconds') and the time without the children nodes ('self_seconds').
+    """
+    if not PROFILE_D['enabled']:
+        return NULL_TIMER
+    record = {'level': level, 'resolution': resolution, 'vcount': graph.vcount(), 'ecount': graph.ecount(), 'parent': None,
+              'stages': {}, 'values': {}}
+    return Node_Timer(record)
+
+def add_Node_Values(**values):
+    """Stores values in the innermost open node (e.g. add_Node_Values(clusters=10)). Numeric values are added to the existing
+    ones. Outside a node they are added to the global counters. If the profiling is off it does nothing"""
+    if not PROFILE_D['enabled']:
+        return
+    stack = node_Stack()
+    if len(stack) > 0:
+        values_d = stack[-1]['values']
+    else:
+        values_d = PROFILE_D['counters']
+    with PROFILE_D['lock']:
+        for key, value in values.items():
+            values_d[key] = values_d.get(key, 0) + value
+
+def profile_Summary_D():
+    """Summarizes the recorded data
+
+    Returns
+    -------
+    summary_d : dict
+        'stages' is the total time and number of calls of each stage, 'levels' is, for each level, the number of nodes, their
+        total self time, the time of each stage and the sum of the node values, and 'counters' are the global counters.
+        The stages can be nested (e.g. get_Partition_Class runs inside c_Clus_Recursion), so the times of different stages must
+        not be added.
+    """
+    summary_d = {'stages': {}, 'levels': {}, 'counters': dict(PROFILE_D.get('counters', {}))}
+    for event in PROFILE_D.get('events', []):
+        if event['kind'] == 'stage':
+            stage_d = summary_d['stages'].setdefault(event['name'], {'seconds': 0.0, 'calls': 0})
+            stage_d['seconds'] += event['seconds']
+            stage_d['calls'] += 1
+    for node in PROFILE_D.get('nodes', []):
+        level_d = summary_d['levels'].setdefault(node['level'], {'nodes': 0, 'self_seconds': 0.0, 'stages': {}, 'values': {}})
+        level_d['nodes'] += 1
+        level_d['self_seconds'] += node.get('self_seconds', 0.0)
+        for name, seconds in node['stages'].items():
+            level_d['stages'][name] = level_d['stages'].get(name, 0.0) + seconds
+        for key, value in node['values'].items():
+            level_d['values'][key] = level_d['values'].get(key, 0) + value
+    return summary_d
+
+def write_Profile_Json(path):
+    """Writes the nodes, the events and the summary (see profile_Summary_D()) as a JSON file"""
+    with open(path, 'w', encoding='UTF-8') as f:
+        json.dump({'summary': profile_Summary_D(), 'nodes': PROFILE_D.get('nodes', []), 'events': PROFILE_D.get('events', [])}, f)
+
+def write_Chrome_Trace(path):
+    """Writes the events in the Chrome trace format
+
+    Notes
+    -------
+    The file can be opened in chrome://tracing or https://ui.perfetto.dev. Each node and stage is a complete event ('ph': 'X'),
+    and the nesting of the events shows the tree of clusters and the stages of each node.
+    """
+    trace_l = []
+    for event in PROFILE_D.get('events', []):
+        trace_l.append({'name': event['name'], 'cat': event['kind'], 'ph': 'X', 'ts': event['start']*1e6, 'dur': event['seconds']*1e6,
+                        'pid': event['pid'], 'tid': event['tid'], 'args': event['args']})
+    with open(path, 'w', encoding='UTF-8') as f:
+        json.dump({'traceEvents': trace_l, 'displayTimeUnit': 'ms'}, f)
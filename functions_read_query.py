@@ -1,5 +1,16 @@
+import array
+import collections
 import requests
+import requests.adapters
+import random
 import re
+import time
+import threading
+import concurrent.futures
+import hashlib
+import sqlite3
+import urllib.parse
+import zlib
 import xml
 import xml.etree
 import xml.etree.ElementTree
@@ -7,8 +18,10 @@ import functions_reading # for functions_reading.read_any
 
 pubmed_api_key = 'e1647cd2e088dcd7e5fa490cf69597b28908'
 pubmed_api_base = 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/'
+ESEARCH_MAX_RECORDS = 10000  # esearch can't page over the first 10000 IDs of a query, the rest need the history server
+LATENCY_SAMPLE_SIZE = 10000  # Latencies kept by a client for the percentiles (a uniform sample of all the requests)
 
-def topic_Api_D(topic_l, filename_part1='boolean_queries\\', filename_part3='_reviewed.txt'):
+def topic_Api_D(topic_l, filename_part1='boolean_queries\\', filename_part3='_reviewed.txt', client_d=None, max_workers=None, page_size=10000):
     """Creates the API dictionary for each topic
 
     Parameters
@@ -22,18 +35,41 @@ def topic_Api_D(topic_l, filename_part1='boolean_queries\\', filename_part3='_re
     filename_part3 : str
         Third part of the name of the query file
 
+    client_d : dict, optional
+        Client created by c_Pubmed_Client_D(). By default a new client is created.
+
+    max_workers : int, optional
+        Number of queries sent at the same time. By default the queries are sent one after another.
+
+    page_size : int, optional
+        Parameter of query_Pubmeds_Ids_Paged().
+
     Returns
     -------
     topic_api_d : dict of dict
-        Dictionary with the API data for each topic
+        Dictionary with the API data for each topic (see query_Pubmeds_Ids_Paged()). 'id_list' are the PubMed IDs of the query.
+
+    Notes
+    -------
+    The IDs are retrieved page by page (see query_Pubmeds_Ids_Paged()), so the queries with more than ESEARCH_MAX_RECORDS results are not cut.
     """
-    topic_api_d = {}
+    if client_d is None:
+        client_d = c_Pubmed_Client_D()
+    topic_query_d = {}
     for topic in topic_l:
         filename = filename_part1 + str(topic) + filename_part3
         f = functions_reading.read_Any(filename, encoding='UTF-8')
         query_remove_custom = remove_Custom(f, clean_number_rows=True)
-        query = format_Query(query_remove_custom)
-        topic_api_d[topic] = pumed_Api_Connect_D(query)
+        topic_query_d[topic] = format_Query(query_remove_custom)
+    topic_api_d = {}
+    if max_workers is None:
+        for topic in topic_l:
+            topic_api_d[topic] = query_Pubmeds_Ids_Paged(topic_query_d[topic], client_d, page_size=page_size)
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            jobs_d = {topic: executor.submit(query_Pubmeds_Ids_Paged, topic_query_d[topic], client_d, page_size=page_size) for topic in topic_l}
+            for topic in topic_l:
+                topic_api_d[topic] = jobs_d[topic].result()
     return topic_api_d
 
 
@@ -63,7 +99,7 @@ def format_Query(query):
     query = re.sub('\++', '+', query)
     return query
 
-def pumed_Api_Connect_D(query, pubmed_api_key=pubmed_api_key, pubmed_api_base=pubmed_api_base):
+def pumed_Api_Connect_D(query, pubmed_api_key=pubmed_api_key, pubmed_api_base=pubmed_api_base, client_d=None, page_size=10000):
     """Creates a dictionary with the data from the API
 
     Parameters
@@ -71,22 +107,63 @@ def pumed_Api_Connect_D(query, pubmed_api_key=pubmed_api_key, pubmed_api_base=pu
     query : str
         PubMed API query
 
+    pubmed_api_key : str, optional
+        API key of the PubMed API.
+
+    pubmed_api_base : str, optional
+        Base URL of the PubMed API.
+
+    client_d : dict, optional
+        Client created by c_Pubmed_Client_D(). If it is given, its base URL, API key and cache are used instead of the parameters.
+
+    page_size : int, optional
+        Parameter of query_Pubmeds_Ids_Paged().
+
     Returns
     -------
     d : dictionary
-        Dictionary with the data of the API
+        Dictionary with the data of the API: 'base', 'api_key', 'format_query', 'query_url' (URL of the first esearch page), 'count',
+        'n_pages', 'use_history', 'complete' and 'id_list' (list of the PubMed IDs). The keys are the same with and without client_d.
+
+    Notes
+    -------
+    The IDs are retrieved by query_Pubmeds_Ids_Paged(), so a query is never cut at the retmax of a single esearch request (at most
+    ESEARCH_MAX_RECORDS IDs) and the pages are served from the cache of the client when possible.
     """
-    d = {}
-    d['format_query'] = format_Query(query)
-    d['query_url'] = pubmed_api_base + 'esearch.fcgi?term=' + d['format_query'] + '&usehistory=n&retmax=100000&api_key=' + pubmed_api_key
-    d['response'] = requests.get(d['query_url'])
-    d['id_list'] = query_Pubmeds_Ids(d['response'])
+    if client_d is None:
+        client_d = c_Pubmed_Client_D(pubmed_api_base=pubmed_api_base, pubmed_api_key=pubmed_api_key)
+    d = query_Pubmeds_Ids_Paged(query, client_d, page_size=page_size)
+    d['base'] = client_d['base']
+    d['api_key'] = client_d['api_key']
+    d['query_url'] = d['base'] + 'esearch.fcgi?db=pubmed&term=' + d['format_query'] + '&usehistory=n&api_key=' + d['api_key'] + '&retmax=' + str(page_size) + '&retstart=0'
+    d['id_list'] = d['id_list'].tolist()
     return d
 
-def retrieve_Pubmed_Title(pubmed_id, pubmed_api_base=pubmed_api_base, pubmed_api_key=pubmed_api_key):
+def retrieve_Pubmed_Title(pubmed_id, pubmed_api_base=pubmed_api_base, pubmed_api_key=pubmed_api_key, client_d=None):
+    """Retrieves the title of a PubMed document
+
+    Parameters
+    ----------
+    pubmed_id : int
+        PubMed ID of the document.
+
+    client_d : dict, optional
+        Client created by c_Pubmed_Client_D(). If it is given, its base URL and API key are used instead of the parameters.
+
+    Returns
+    -------
+    pubmed_title : tuple
+        (pubmed_id, title)
+    """
+    if client_d is not None:
+        pubmed_api_base = client_d['base']
+        pubmed_api_key = client_d['api_key']
     url = pubmed_api_base + 'esummary.fcgi?db=pubmed&id=' + str(pubmed_id) + '&api_key=' + pubmed_api_key
-    response = requests.get(url)
-    root = xml.etree.ElementTree.fromstring(response.text)
+    if client_d is None:
+        response_text = requests.get(url).text
+    else:
+        response_text = client_Get(client_d, url)
+    root = xml.etree.ElementTree.fromstring(response_text)
     docsum_root = root.find('DocSum')
     title_count = 0
     for child in docsum_root.findall('Item'):
@@ -99,28 +176,128 @@ def retrieve_Pubmed_Title(pubmed_id, pubmed_api_base=pubmed_api_base, pubmed_api
     pubmed_title = (pubmed_id, title)
     return pubmed_title
 
-def pumed_Api_Connect_D(query):
-    """Creates a dictionary with the data from the API
+def retrieve_Pubmed_Titles_D(pubmed_id_l, batch_size=200, client_d=None, max_workers=None):
+    """Retrieves the titles of many PubMed documents in batches
 
     Parameters
     ----------
-    query : str
-        PubMed API query
+    pubmed_id_l : list
+        PubMed IDs of the documents.
+
+    batch_size : int, optional
+        Number of IDs per esummary request. NCBI recommends to send long lists of IDs with POST, as it is done here.
+
+    client_d : dict, optional
+        Client created by c_Pubmed_Client_D(). By default a new client is created.
+
+    max_workers : int, optional
+        Number of batches requested at the same time. By default the batches are requested one after another.
 
     Returns
     -------
-    d : dictionary
-        Dictionary with the data of the API
+    titles_d : dict
+        The key is the PubMed ID and the value is the title. The keys follow the order of pubmed_id_l.
+
+    failed_l : list
+        PubMed IDs whose title could not be retrieved (e.g. invalid IDs or batches that failed after all the retries).
+
+    Notes
+    -------
+    Bulk version of retrieve_Pubmed_Title(). Each request retrieves the DocSum records of a whole batch, which are parsed at once
+    by parse_Docsum_D(). If the response of a batch can not be parsed or the API rejects the batch, it is split in two halves that
+    are requested again, until the failing IDs are isolated, so one problematic ID does not lose the titles of the rest of the
+    batch. A batch that still fails after all the retries of the client is not split, its IDs are in failed_l.
     """
-    d = {}
-    d['base'] = 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/'
-    d['api_key'] = 'e1647cd2e088dcd7e5fa490cf69597b28908'
-    d['format_query'] = format_Query(query)
-    d['query_url'] = d['base'] + 'esearch.fcgi?term=' + d['format_query'] + '&usehistory=n&retmax=100000&api_key=' + d['api_key']
-    d['response'] = requests.get(d['query_url'])
-    d['id_list'] = query_Pubmeds_Ids(d['response'])
-    return d
+    if client_d is None:
+        client_d = c_Pubmed_Client_D()
+    unique_id_l = list(dict.fromkeys(pubmed_id_l))  # Remove duplicates keeping the order
+    batch_l = [unique_id_l[i:i + batch_size] for i in range(0, len(unique_id_l), batch_size)]
+    docsum_d = {}
+    if max_workers is None:
+        for batch in batch_l:
+            docsum_d.update(retrieve_Docsum_Batch_D(batch, client_d))
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for batch_docsum_d in executor.map(lambda batch: retrieve_Docsum_Batch_D(batch, client_d), batch_l):
+                docsum_d.update(batch_docsum_d)
+    titles_d = {}
+    failed_l = []
+    for pubmed_id in unique_id_l:
+        if pubmed_id in docsum_d and 'Title' in docsum_d[pubmed_id]:
+            titles_d[pubmed_id] = docsum_d[pubmed_id]['Title']
+        else:
+            failed_l.append(pubmed_id)
+    return titles_d, failed_l
+
+def retrieve_Docsum_Batch_D(batch, client_d):
+    """Retrieves the DocSum records of a batch of PubMed IDs
+
+    Parameters
+    ----------
+    batch : list
+        PubMed IDs.
+
+    client_d : dict
+        Client created by c_Pubmed_Client_D().
+
+    Returns
+    -------
+    docsum_d : dict of dict
+        See parse_Docsum_D(). The IDs of the batch that failed are not included.
+
+    Notes
+    -------
+    If the response can not be parsed or it is a client error (4xx other than 429, e.g. an ID that the API rejects), the batch
+    is split in two halves, recursively. The transport errors (connection errors, timeouts, 429 and 5xx) were already retried by
+    client_Get(), so the batch is not split: the halves would repeat all the retries and fail in the same way.
+    """
+    url = client_d['base'] + 'esummary.fcgi'
+    data = {'db': 'pubmed', 'id': ','.join([str(pubmed_id) for pubmed_id in batch]), 'api_key': client_d['api_key']}
+    split = False
+    try:
+        response_text = client_Get(client_d, url, data=data)
+        docsum_d = parse_Docsum_D(response_text)
+    except requests.RequestException as error:
+        docsum_d = {}
+        split = is_Content_Error(error)
+    except xml.etree.ElementTree.ParseError:
+        docsum_d = {}
+        split = True
+    if split and len(batch) > 1:
+        half = len(batch) // 2
+        docsum_d.update(retrieve_Docsum_Batch_D(batch[:half], client_d))
+        docsum_d.update(retrieve_Docsum_Batch_D(batch[half:], client_d))
+    return docsum_d
+
+def is_Content_Error(error):
+    """True if a request error is caused by the request itself (4xx response other than 429), so it is not solved by retrying"""
+    response = getattr(error, 'response', None)
+    return isinstance(error, requests.HTTPError) and response is not None and 400 <= response.status_code < 500 and response.status_code != 429
+
+def parse_Docsum_D(response_text):
+    """Parses all the DocSum records of an esummary response
+
+    Parameters
+    ----------
+    response_text : str
+        Text of the esummary response.
 
+    Returns
+    -------
+    docsum_d : dict of dict
+        The first key is the PubMed ID (int) and the second key is the name of the item (e.g. 'Title', 'PubDate'). The value is
+        the text of the item. If an item name is repeated, the first one is kept. The IDs with an ERROR element are not included.
+    """
+    root = xml.etree.ElementTree.fromstring(response_text)
+    docsum_d = {}
+    for docsum_root in root.iter('DocSum'):
+        pubmed_id = int(docsum_root.findtext('Id'))
+        item_d = {}
+        for child in docsum_root.findall('Item'):
+            if 'Name' in child.attrib and child.attrib['Name'] not in item_d:
+                item_d[child.attrib['Name']] = child.text
+        docsum_d[pubmed_id] = item_d
+    return docsum_d
 
 def remove_Custom(query, end_with_jump=True, clean_number_rows=False, clean_number_parentesis=False, create_jumps=False):
     """Creates a dictionary with the data from the API
@@ -154,12 +331,573 @@ def remove_Custom(query, end_with_jump=True, clean_number_rows=False, clean_numb
 def query_Pubmeds_Ids(response):
 	#  I had to change the way I retrieve the Pubmed IDs
 	#  The original function retrieved the ids from the web enviroment (WebEnv), but it limits the maximum to 10000
-	#  The new function uses the esearch to get the ids, and it can get up to 100000
-	#  There is a way to get more than the maximum (https://www.ncbi.nlm.nih.gov/books/NBK25499/), but I want to avoid it when posible to keep the code simple
-    root = xml.etree.ElementTree.fromstring(response.text)
+	#  The new function uses the esearch to get the ids, but esearch also gives at most ESEARCH_MAX_RECORDS (10000) ids per request, whatever the retmax
+	#  It only parses one response: pumed_Api_Connect_D() gets all the ids page by page with query_Pubmeds_Ids_Paged(), which uses the history server (https://www.ncbi.nlm.nih.gov/books/NBK25499/) for more than the maximum
+    id_list = parse_Pubmed_Ids(response.text)
+    return id_list
+
+def parse_Pubmed_Ids(response_text):
+    """Parses the PubMed IDs of an esearch response
+
+    Parameters
+    ----------
+    response_text : str
+        Text of the esearch response.
+
+    Returns
+    -------
+    id_list : list of int
+        PubMed IDs in the order of the response.
+    """
+    root = xml.etree.ElementTree.fromstring(response_text)
     id_list_root = root.find('IdList')
     id_list = []
     for child in id_list_root:
         pubmed_id = int(child.text)
         id_list.append(pubmed_id)
-    return id_list
\ No newline at end of file
+    return id_list
+
+def query_Pubmeds_Ids_Paged(query, client_d, page_size=10000, max_workers=None, use_history=None):
+    """Retrieves all the PubMed IDs of a query, page by page
+
+    Parameters
+    ----------
+    query : str
+        PubMed API query
+
+    client_d : dict
+        Client created by c_Pubmed_Client_D().
+
+    page_size : int, optional
+        Number of IDs per request.
+
+    max_workers : int, optional
+        Number of pages requested at the same time. By default the pages are requested one after another.
+
+    use_history : bool, optional
+        If True, the query is stored in the history server of the E-utilities (esearch with usehistory=y) and the pages after
+        the first are retrieved with efetch (rettype=uilist). This is the way to retrieve more than the ESEARCH_MAX_RECORDS first IDs
+        (https://www.ncbi.nlm.nih.gov/books/NBK25499/). If False, the pages are retrieved with esearch and retstart. By default
+        the history server is only used if the query has more than ESEARCH_MAX_RECORDS IDs.
+
+    Returns
+    -------
+    d : dictionary
+        Dictionary with the data of the API. Keys: 'format_query', 'count' (number of IDs of the query according to the API),
+        'id_list' (array.array of int64 with the IDs in the order of the API), 'n_pages', 'use_history' and 'complete' (if all
+        the IDs were retrieved).
+
+    Notes
+    -------
+    There is no retmax limit: each page is parsed incrementally by parse_Pubmed_Ids_Array() straight
+    into an int array, and the text of the page is discarded, so the memory only grows with the 8 bytes per ID of the result.
+    At most max_workers pages are requested or waiting to be merged at any time, and they are merged in the order of retstart.
+    The first esearch page gives the count and it is always the first page of the result, also with the history server. The
+    WebEnv of a search expires, so the history search itself is never cached and the efetch pages are cached under the URL of
+    history_Cache_Url() (the query and the page, without WebEnv and query_key). The history search is only sent if a page is
+    not in the cache, so with a cache the large queries can be rerun in offline mode too.
+    """
+    d = {}
+    d['format_query'] = format_Query(query)
+    search_url = client_d['base'] + 'esearch.fcgi?db=pubmed&term=' + d['format_query'] + '&usehistory=n&api_key=' + client_d['api_key'] + '&retmax=' + str(page_size) + '&retstart='
+    first_text = client_Get(client_d, search_url + '0')  # The first page also gives the count
+    d['count'] = int(re.search(r'<Count>([0-9]+)</Count>', first_text).group(1))  # The first Count is the count of the query
+    first_page = parse_Pubmed_Ids_Array(first_text)
+    del first_text
+    d['use_history'] = use_history if use_history is not None else d['count'] > ESEARCH_MAX_RECORDS
+    if d['use_history']:
+        history_d = {'lock': threading.Lock(), 'page_url': None}
+        get_Page = lambda retstart: parse_Pubmed_Ids_Array(history_Page_Text(client_d, d['format_query'], page_size, retstart, history_d))
+    else:
+        get_Page = lambda retstart: parse_Pubmed_Ids_Array(client_Get(client_d, search_url + str(retstart)))
+    retstart_l = list(range(0, d['count'], page_size))
+    d['n_pages'] = len(retstart_l)
+    d['id_list'] = array.array('q')
+    if len(retstart_l) > 0 and len(first_page) == min(page_size, d['count']):  # esearch gives at most ESEARCH_MAX_RECORDS IDs per page
+        d['id_list'].extend(first_page)
+        retstart_l = retstart_l[1:]
+    del first_page
+    if max_workers is None:
+        for retstart in retstart_l:
+            d['id_list'].extend(get_Page(retstart))
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = collections.deque()
+            for retstart in retstart_l:
+                if len(pending) >= max_workers:  # Bounded number of pages in flight
+                    d['id_list'].extend(pending.popleft().result())
+                pending.append(executor.submit(get_Page, retstart))
+            while len(pending) > 0:
+                d['id_list'].extend(pending.popleft().result())
+    d['complete'] = len(d['id_list']) == d['count']
+    return d
+
+def history_Cache_Url(client_d, format_query, page_size, retstart):
+    """URL under which an efetch page of the history server is cached. It has the query instead of the WebEnv and the query_key
+    of the search, which change in every run"""
+    return client_d['base'] + 'efetch.fcgi?db=pubmed&rettype=uilist&retmode=xml&term=' + format_query + '&retmax=' + str(page_size) + '&retstart=' + str(retstart)
+
+def history_Page_Text(client_d, format_query, page_size, retstart, history_d):
+    """Retrieves a page of IDs of a query from the history server (see query_Pubmeds_Ids_Paged())
+
+    Parameters
+    ----------
+    client_d : dict
+        Client created by c_Pubmed_Client_D().
+
+    format_query : str
+        Query formatted by format_Query().
+
+    page_size : int
+        Number of IDs per page.
+
+    retstart : int
+        Index of the first ID of the page.
+
+    history_d : dict
+        State shared by the pages of the query: 'lock' and 'page_url' (None until the query is stored in the history server).
+
+    Returns
+    -------
+    response_text : str
+        Text of the efetch (uilist) response.
+
+    Notes
+    -------
+    The page is looked up in the cache under history_Cache_Url() first. Only if it is missing, the query is stored in the history
+    server (once per query, by the first page that needs it) and the page is requested and stored in the cache. In offline mode a
+    missing page raises requests.ConnectionError (see client_Get()).
+    """
+    cache_d = client_d['cache']
+    cache_url = history_Cache_Url(client_d, format_query, page_size, retstart)
+    if cache_d is not None:
+        response_text = cache_Get(cache_d, cache_Key(cache_url))
+        if response_text is not None:
+            with client_d['stats']['lock']:
+                client_d['stats']['cache_hits'] += 1
+            return response_text
+    with history_d['lock']:
+        if history_d['page_url'] is None:
+            history_url = client_d['base'] + 'esearch.fcgi?db=pubmed&term=' + format_query + '&retmax=0&usehistory=y&api_key=' + client_d['api_key']
+            root = xml.etree.ElementTree.fromstring(client_Get(client_d, history_url, use_cache=False))
+            history_d['page_url'] = (client_d['base'] + 'efetch.fcgi?db=pubmed&rettype=uilist&retmode=xml&query_key=' + root.findtext('QueryKey')
+                                     + '&WebEnv=' + root.findtext('WebEnv') + '&api_key=' + client_d['api_key'] + '&retmax=' + str(page_size) + '&retstart=')
+    response_text = client_Get(client_d, history_d['page_url'] + str(retstart), use_cache=False)
+    if cache_d is not None:
+        cache_Put(cache_d, cache_Key(cache_url), normalize_Url(cache_url), response_text)
+    return response_text
+
+def parse_Pubmed_Ids_Array(response_text, chunk_size=65536):
+    """Parses the PubMed IDs of an esearch or efetch (uilist) response incrementally
+
+    Parameters
+    ----------
+    response_text : str
+        Text of the response.
+
+    chunk_size : int, optional
+        Number of characters given to the parser at once.
+
+    Returns
+    -------
+    id_array : array.array
+        PubMed IDs (int64) in the order of the response.
+
+    Notes
+    -------
+    The parser is fed by chunks and each Id element is cleared after it is read, so the whole element tree of the response is never
+    built (unlike parse_Pubmed_Ids()).
+    """
+    id_array = array.array('q')
+    parser = xml.etree.ElementTree.XMLPullParser(events=('end',))
+    for start in range(0, len(response_text), chunk_size):
+        parser.feed(response_text[start:start + chunk_size])
+        for _, element in parser.read_events():
+            if element.tag == 'Id':
+                id_array.append(int(element.text))
+                element.clear()
+    parser.close()
+    for _, element in parser.read_events():
+        if element.tag == 'Id':
+            id_array.append(int(element.text))
+    return id_array
+
+def c_Pubmed_Client_D(pool_size=10, requests_per_second=10, burst=1, max_retries=5, backoff_factor=0.5, timeout=60, pubmed_api_base=pubmed_api_base, pubmed_api_key=pubmed_api_key, cache_d=None):
+    """Creates a reusable client for the PubMed E-utilities
+
+    Parameters
+    ----------
+    pool_size : int, optional
+        Number of connections kept alive in the connection pool. It should be at least the number of threads using the client.
+
+    requests_per_second : float, optional
+        Maximum number of requests per second. NCBI allows 10 requests per second with an API key (3 without).
+
+    burst : int, optional
+        Number of requests that can be sent at once after the client was idle. With 1 the requests are evenly spaced, which never
+        goes over the NCBI limit.
+
+    max_retries : int, optional
+        Number of times a request is repeated after a 429 or 5xx response or a connection error.
+
+    backoff_factor : float, optional
+        The n-th retry waits backoff_factor * 2**n seconds (or the Retry-After of the response, if it is longer).
+
+    timeout : float, optional
+        Timeout of each request in seconds.
+
+    pubmed_api_base : str, optional
+        Base URL of the API. It can point to a local server for testing (see functions_mock_eutils).
+
+    pubmed_api_key : str, optional
+        API key of the API.
+
+    cache_d : dict, optional
+        Response cache created by c_Response_Cache_D(). If it is given, the responses are served from the cache when possible
+        and the new responses are stored in it.
+
+    Returns
+    -------
+    client_d : dict
+        Dictionary with the session, the rate limiter, the retry parameters and the statistics of the client.
+
+    Notes
+    -------
+    The session keeps the connections alive, so the requests after the first one don't open a new connection.
+    The client can be shared by several threads (see topic_Api_D()). Use client_Stats_D() to get the throughput and the
+    latency percentiles.
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    client_d = {}
+    client_d['session'] = session
+    client_d['limiter'] = c_Token_Bucket_D(requests_per_second, burst)
+    client_d['max_retries'] = max_retries
+    client_d['backoff_factor'] = backoff_factor
+    client_d['timeout'] = timeout
+    client_d['base'] = pubmed_api_base
+    client_d['api_key'] = pubmed_api_key
+    client_d['cache'] = cache_d
+    client_d['stats'] = {'lock': threading.Lock(), 'latencies': [], 'random': random.Random(0), 'requests': 0, 'retries': 0, 'errors': 0, 'cache_hits': 0, 'start': None, 'end': None}
+    return client_d
+
+def c_Token_Bucket_D(rate, capacity):
+    """Creates a token bucket rate limiter
+
+    Parameters
+    ----------
+    rate : float
+        Tokens added per second.
+
+    capacity : int
+        Maximum number of tokens in the bucket.
+
+    Returns
+    -------
+    bucket_d : dict
+        Dictionary with the state of the bucket. It can be shared by several threads.
+    """
+    bucket_d = {'rate': float(rate), 'capacity': float(capacity), 'tokens': float(capacity), 'time': time.monotonic(), 'lock': threading.Lock()}
+    return bucket_d
+
+def acquire_Token(bucket_d):
+    """Waits until there is a token in the bucket and takes it
+
+    Parameters
+    ----------
+    bucket_d : dict
+        Token bucket created by c_Token_Bucket_D().
+    """
+    while True:
+        with bucket_d['lock']:
+            now = time.monotonic()
+            bucket_d['tokens'] = min(bucket_d['capacity'], bucket_d['tokens'] + (now - bucket_d['time'])*bucket_d['rate'])
+            bucket_d['time'] = now
+            if bucket_d['tokens'] >= 1.0:
+                bucket_d['tokens'] -= 1.0
+                return
+            wait = (1.0 - bucket_d['tokens']) / bucket_d['rate']
+        time.sleep(wait)
+
+def client_Get(client_d, url, data=None, use_cache=True):
+    """Sends a request with the client
+
+    Parameters
+    ----------
+    client_d : dict
+        Client created by c_Pubmed_Client_D().
+
+    url : str
+        URL of the request.
+
+    data : dict, optional
+        If it is given, the request is a POST with this form data (e.g. a long list of IDs). Otherwise it is a GET.
+
+    use_cache : bool, optional
+        If False, the cache of the client is not used for this request (e.g. the requests to the history server, whose
+        responses are only valid for a while).
+
+    Returns
+    -------
+    response_text : str
+        Text of the response.
+
+    Notes
+    -------
+    Every attempt waits for a token of the rate limiter. The responses 429 and 5xx and the connection errors are retried with
+    exponential backoff. If all the attempts fail, the last error is raised (requests.HTTPError for the HTTP errors). The other
+    4xx responses are not retried and they raise requests.HTTPError at once. All the failed attempts are counted in the statistics.
+    If the client has a cache, a cached response does not send any request. In offline mode, a response that is not in the
+    cache raises requests.ConnectionError, so the callers that handle the request errors (e.g. retrieve_Docsum_Batch_D()) report
+    it as a failed request.
+    """
+    stats_d = client_d['stats']
+    cache_d = client_d['cache'] if use_cache else None
+    if not use_cache and client_d['cache'] is not None and client_d['cache']['offline']:
+        raise requests.ConnectionError('Offline mode: the request can not be served from the cache (' + normalize_Url(url, data) + ')')
+    if cache_d is not None:
+        key = cache_Key(url, data)
+        response_text = cache_Get(cache_d, key)
+        if response_text is not None:
+            with stats_d['lock']:
+                stats_d['cache_hits'] += 1
+            return response_text
+        if cache_d['offline']:
+            raise requests.ConnectionError('Offline mode: the response is not in the cache (' + normalize_Url(url, data) + ')')
+    attempt = 0
+    while True:
+        acquire_Token(client_d['limiter'])
+        start = time.monotonic()
+        with stats_d['lock']:
+            if stats_d['start'] is None:
+                stats_d['start'] = start
+        retry_after = 0.0
+        try:
+            if data is None:
+                response = client_d['session'].get(url, timeout=client_d['timeout'])
+            else:
+                response = client_d['session'].post(url, data=data, timeout=client_d['timeout'])
+            error = None
+            retryable = True
+            if response.status_code == 429 or response.status_code >= 500:
+                error = requests.HTTPError(str(response.status_code) + ' response for ' + url.split('?')[0], response=response)
+                retry_after = retry_After_Seconds(response)
+            elif response.status_code >= 400:
+                error = requests.HTTPError(str(response.status_code) + ' response for ' + url.split('?')[0], response=response)
+                retryable = False
+        except (requests.ConnectionError, requests.Timeout) as connection_error:
+            error = connection_error
+        end = time.monotonic()
+        with stats_d['lock']:
+            stats_d['requests'] += 1
+            add_Latency(stats_d, end - start)
+            stats_d['end'] = end
+            if error is not None:
+                stats_d['errors'] += 1
+        if error is None:
+            if cache_d is not None:
+                cache_Put(cache_d, key, normalize_Url(url, data), response.text)
+            return response.text
+        if not retryable or attempt >= client_d['max_retries']:
+            raise error
+        with stats_d['lock']:
+            stats_d['retries'] += 1
+        time.sleep(max(client_d['backoff_factor'] * 2**attempt, retry_after))
+        attempt += 1
+
+def add_Latency(stats_d, latency):
+    """Adds the latency of a request to the statistics of a client (call it holding stats_d['lock'])
+
+    Notes
+    -------
+    The latencies are a reservoir sample (algorithm R) of at most LATENCY_SAMPLE_SIZE values: every request has the same
+    probability of being in the sample, so the percentiles of client_Stats_D() are estimated with bounded memory however long the
+    client is used. stats_d['requests'] must already count the request.
+    """
+    if len(stats_d['latencies']) < LATENCY_SAMPLE_SIZE:
+        stats_d['latencies'].append(latency)
+    else:
+        index = stats_d['random'].randrange(stats_d['requests'])
+        if index < LATENCY_SAMPLE_SIZE:
+            stats_d['latencies'][index] = latency
+
+def retry_After_Seconds(response):
+    """Reads the Retry-After header of a response in seconds (0.0 if it is missing or it is a date)"""
+    try:
+        return float(response.headers.get('Retry-After', 0.0))
+    except ValueError:
+        return 0.0
+
+def client_Stats_D(client_d):
+    """Reports the statistics of a client
+
+    Parameters
+    ----------
+    client_d : dict
+        Client created by c_Pubmed_Client_D().
+
+    Returns
+    -------
+    stats : dict
+        Number of requests (including the retries), retries, failed attempts and responses served from the cache, elapsed time between the first request and the
+        last response, throughput (requests per second) and the percentiles 50, 90 and 99 of the latency in seconds. The
+        percentiles are exact up to LATENCY_SAMPLE_SIZE requests and estimated from a uniform sample after that (see add_Latency()).
+    """
+    stats_d = client_d['stats']
+    with stats_d['lock']:
+        latencies = sorted(stats_d['latencies'])
+        stats = {'requests': stats_d['requests'], 'retries': stats_d['retries'], 'errors': stats_d['errors'], 'cache_hits': stats_d['cache_hits']}
+        if stats_d['start'] is None:
+            stats['elapsed'] = 0.0
+        else:
+            stats['elapsed'] = stats_d['end'] - stats_d['start']
+    if stats['elapsed'] > 0:
+        stats['throughput'] = stats['requests'] / stats['elapsed']
+    else:
+        stats['throughput'] = 0.0
+    for percentile in (50, 90, 99):
+        stats['latency_p' + str(percentile)] = percentile_Value(latencies, percentile)
+    return stats
+
+def percentile_Value(sorted_values, percentile):
+    """Nearest-rank percentile of a sorted list (None if the list is empty)"""
+    if len(sorted_values) == 0:
+        return None
+    rank = max(1, -(-percentile * len(sorted_values) // 100))  # Ceiling without floats
+    return sorted_values[int(rank) - 1]
+
+def c_Response_Cache_D(path, ttl=None, max_bytes=None, offline=False):
+    """Creates (or opens) an on-disk cache of the API responses
+
+    Parameters
+    ----------
+    path : str
+        Path of the cache file (an SQLite database).
+
+    ttl : float, optional
+        Seconds that a response stays valid. By default the responses never expire.
+
+    max_bytes : int, optional
+        Maximum size of the stored (compressed) responses. When it is exceeded, the oldest responses are removed.
+
+    offline : bool, optional
+        If True, the client only serves responses from the cache and never sends requests.
+
+    Returns
+    -------
+    cache_d : dict
+        Dictionary with the connection to the cache and its parameters. It can be shared by several threads.
+
+    Notes
+    -------
+    The responses are stored compressed with their timestamp. The key of a response is the normalized URL (see normalize_Url()),
+    so the same query gives the same key even if the API key or the order of the parameters change. Rerunning the same queries
+    (e.g. clean_references.ipynb or the title retrieval of results.ipynb) then does not need network access.
+    """
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.execute('CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, url TEXT, timestamp REAL, size INTEGER, body BLOB)')
+    connection.execute('CREATE INDEX IF NOT EXISTS responses_timestamp ON responses (timestamp)')
+    connection.commit()
+    cache_d = {'path': path, 'connection': connection, 'lock': threading.Lock(), 'ttl': ttl, 'max_bytes': max_bytes, 'offline': offline}
+    return cache_d
+
+def normalize_Url(url, data=None):
+    """Normalizes the URL of a request for the cache
+
+    Parameters
+    ----------
+    url : str
+        URL of the request.
+
+    data : dict, optional
+        Form data of a POST request. It is treated as part of the query.
+
+    Returns
+    -------
+    normalized_url : str
+        URL without the API key, with the parameters sorted and their values decoded and with the spaces collapsed.
+    """
+    split_url = urllib.parse.urlsplit(url)
+    params_l = urllib.parse.parse_qsl(split_url.query, keep_blank_values=True)
+    if data is not None:
+        params_l += [(key, str(value)) for key, value in data.items()]
+    params_l = sorted([(key, ' '.join(value.split())) for key, value in params_l if key != 'api_key'])
+    normalized_url = split_url.scheme + '://' + split_url.netloc + split_url.path + '?' + urllib.parse.urlencode(params_l)
+    return normalized_url
+
+def cache_Key(url, data=None):
+    """Key of a request in the cache (hash of the normalized URL)"""
+    return hashlib.sha256(normalize_Url(url, data).encode('UTF-8')).hexdigest()
+
+def cache_Get(cache_d, key):
+    """Gets a response from the cache
+
+    Parameters
+    ----------
+    cache_d : dict
+        Cache created by c_Response_Cache_D().
+
+    key : str
+        Key of the request, see cache_Key().
+
+    Returns
+    -------
+    response_text : str
+        Text of the response, or None if it is not in the cache or it expired.
+    """
+    with cache_d['lock']:
+        row = cache_d['connection'].execute('SELECT timestamp, body FROM responses WHERE key = ?', (key,)).fetchone()
+    if row is None:
+        return None
+    timestamp, body = row
+    if cache_d['ttl'] is not None and time.time() - timestamp > cache_d['ttl'] and not cache_d['offline']:  # In offline mode the expired responses are still used
+        return None
+    response_text = zlib.decompress(body).decode('UTF-8')
+    return response_text
+
+def cache_Put(cache_d, key, url, response_text):
+    """Stores a response in the cache
+
+    Parameters
+    ----------
+    cache_d : dict
+        Cache created by c_Response_Cache_D().
+
+    key : str
+        Key of the request, see cache_Key().
+
+    url : str
+        Normalized URL of the request. It is stored for reference.
+
+    response_text : str
+        Text of the response.
+
+    Notes
+    -------
+    If the cache has a max_bytes, the oldest responses are removed until the cache fits.
+    """
+    body = zlib.compress(response_text.encode('UTF-8'))
+    with cache_d['lock']:
+        connection = cache_d['connection']
+        connection.execute('INSERT OR REPLACE INTO responses (key, url, timestamp, size, body) VALUES (?, ?, ?, ?, ?)', (key, url, time.time(), len(body), body))
+        if cache_d['max_bytes'] is not None:
+            total_bytes = connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+            if total_bytes > cache_d['max_bytes']:
+                removed_bytes = 0
+                removed_l = []
+                for old_key, size in connection.execute('SELECT key, size FROM responses ORDER BY timestamp'):
+                    if total_bytes - removed_bytes <= cache_d['max_bytes']:
+                        break
+                    removed_l.append((old_key,))
+                    removed_bytes += size
+                connection.executemany('DELETE FROM responses WHERE key = ?', removed_l)
+        connection.commit()
+
+def cache_Stats_D(cache_d):
+    """Reports the number of responses and the stored bytes of the cache"""
+    with cache_d['lock']:
+        n_responses, total_bytes = cache_d['connection'].execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+    cache_stats_d = {'responses': n_responses, 'bytes': total_bytes}
+    return cache_stats_d
@@ -1,4 +1,5 @@
 import igraph
+import numpy as np
 
 def read_Any(filename, encoding=None, errors=None):
     """Reads a file
@@ -121,4 +122,75 @@ def create_Igraph_Network(network):
     """
     ig_network = igraph.Graph().TupleList(network)
     ig_network.es['weight'] = 1
-    return ig_network
\ No newline at end of file
+    return ig_network
+
+def normalize_Network(network, self_loops='drop'):
+    """Canonicalizes the edges of the network as undirected edges weighted by their multiplicity
+
+    Parameters
+    ----------
+    network : set of tuple
+        Edges of the network (see parse_Network()).
+
+    self_loops : str, optional
+        'drop' removes the self-citations and 'keep' keeps them as loop edges. In both cases they are counted in the report.
+
+    Returns
+    -------
+    weighted_network : dict
+        'nodes': array of all the network ids (also the nodes that only have self-citations), 'edges': array of pairs
+        (n_1, n_2) with n_1 <= n_2, sorted, and 'weights': array with the number of citations between the two nodes.
+
+    report_d : dict
+        'input_edges', 'self_loops', 'reciprocal_edges' (edges merged into the edge of the other direction), 'output_edges',
+        'removed_edges' (input_edges - output_edges) and 'max_weight'.
+
+    Notes
+    -------
+    parse_Network() only removes the rows that are repeated in the same direction, so a reciprocal citation (a, b) and (b, a)
+    is a multi-edge in create_Igraph_Network(). Here it is one edge with weight 2. The sum of the weights is the number of
+    edges of create_Igraph_Network() minus the dropped self-loops, so the number of edges between clusters (see
+    functions_clustering.c_Connections_D()) does not change.
+    """
+    assert (self_loops in ('drop', 'keep')), 'self_loops must be drop or keep'
+    edge_array = np.fromiter((n for edge in network for n in edge), dtype=np.int64, count=2*len(network)).reshape(-1, 2)
+    node_array = np.unique(edge_array)
+    loop_mask = edge_array[:, 0] == edge_array[:, 1]
+    report_d = {'input_edges': len(edge_array), 'self_loops': int(loop_mask.sum())}
+    if self_loops == 'drop':
+        edge_array = edge_array[~loop_mask]
+    canonical_array = np.sort(edge_array, axis=1)
+    key_array = canonical_array[:, 0] * (int(node_array[-1]) + 1 if len(node_array) > 0 else 1) + canonical_array[:, 1]  # Network ids are not negative
+    key_array, first_array, weight_array = np.unique(key_array, return_index=True, return_counts=True)
+    weighted_network = {'nodes': node_array, 'edges': canonical_array[first_array], 'weights': weight_array.astype(np.int64)}
+    report_d['reciprocal_edges'] = len(canonical_array) - len(key_array)
+    report_d['output_edges'] = len(key_array)
+    report_d['removed_edges'] = report_d['input_edges'] - report_d['output_edges']
+    report_d['max_weight'] = int(weight_array.max()) if len(weight_array) > 0 else 0
+    return weighted_network, report_d
+
+def create_Weighted_Igraph_Network(weighted_network):
+    """Creates an Igraph representation of a normalized network
+
+    Parameters
+    ----------
+    weighted_network : dict
+        Nodes, edges and weights (see normalize_Network()).
+
+    Returns
+    -------
+    ig_network : igraph.Graph object
+        Igraph representation of the network. The edge attribute 'weight' is the multiplicity of the edge, and the graph attribute
+        'weighted' is True, so the Leiden algorithm uses the weights (see functions_clustering.get_Partition_Class()).
+
+    Notes
+    -------
+    The vertices are in the order of the network ids, not in the order of the file as in create_Igraph_Network(), so the
+    clusters are not the same as the clusters of the unnormalized network.
+    """
+    index_array = np.searchsorted(weighted_network['nodes'], weighted_network['edges'])
+    ig_network = igraph.Graph(n=len(weighted_network['nodes']), edges=index_array.tolist(), directed=False)
+    ig_network.vs['name'] = weighted_network['nodes'].tolist()
+    ig_network.es['weight'] = weighted_network['weights'].tolist()
+    ig_network['weighted'] = True
+    return ig_network
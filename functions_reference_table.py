@@ -0,0 +1,231 @@
+import numpy as np
+import functions_reading as reading
+import functions_clean_references as clean_references
+
+MISSING = -1  # PubMed ID of a reference whose PubMed ID is not known (e.g. the synthetic references)
+COLUMNS = ['year', 'topic', 'pmid', 'netid']
+
+def c_Reference_Table_D(year_array, topic_array, pmid_array, netid_array):
+    """Creates a columnar table of references
+
+    Parameters
+    ----------
+    year_array : numpy.ndarray
+        Year of the systematic review of each reference.
+
+    topic_array : numpy.ndarray
+        Topic of each reference.
+
+    pmid_array : numpy.ndarray
+        PubMed ID of each reference (MISSING if it is not known).
+
+    netid_array : numpy.ndarray
+        Net ID of each reference.
+
+    Returns
+    -------
+    table : dict
+        The columns ('year', 'topic', 'pmid' and 'netid', arrays of int64) sorted by year, topic and net ID, and the indexes:
+        - 'group_year', 'group_topic' and 'group_start': one entry per (year, topic) group, and the rows of the group g are
+          group_start[g]:group_start[g + 1].
+        - 'group_index_d': (year, topic) -> g, so the net IDs of a topic are a slice (see topic_Netids()).
+        - 'year_row_d': year -> (first row, last row + 1) and 'year_group_d': year -> (first group, last group + 1).
+        - 'pmid_order' and 'netid_order': the rows of each year sorted by PubMed ID and by net ID (see pmid_To_Netid()).
+
+    Notes
+    -------
+    It replaces the dict of dict of list of parse_2_Level_D() and the parallel dictionaries of the notebooks (ref_row_clean,
+    year_pmid_netid_d_ref and year_netid_pmid_d_ref): all of them are views of the same four columns. The rows are kept as they
+    are, so a net ID appears twice in a topic if two PubMed IDs have the same net ID.
+    """
+    year_array, topic_array, pmid_array, netid_array = [np.asarray(x, dtype=np.int64) for x in (year_array, topic_array, pmid_array, netid_array)]
+    order = np.lexsort((pmid_array, netid_array, topic_array, year_array))
+    table = {'kind': 'reference_table', 'year': year_array[order], 'topic': topic_array[order], 'pmid': pmid_array[order], 'netid': netid_array[order]}
+    year_array, topic_array = table['year'], table['topic']
+    first_array = np.flatnonzero(np.r_[True, (year_array[1:] != year_array[:-1]) | (topic_array[1:] != topic_array[:-1])]) if len(year_array) > 0 else np.zeros(0, dtype=np.int64)
+    table['group_year'] = year_array[first_array]
+    table['group_topic'] = topic_array[first_array]
+    table['group_start'] = np.r_[first_array, len(year_array)].astype(np.int64)
+    table['group_index_d'] = {(year, topic): g for g, (year, topic) in enumerate(zip(table['group_year'].tolist(), table['group_topic'].tolist()))}
+    table['year_row_d'] = {}
+    table['year_group_d'] = {}
+    pmid_order_l = []
+    netid_order_l = []
+    for year in np.unique(year_array).tolist():
+        start, end = np.searchsorted(year_array, [year, year + 1])
+        table['year_row_d'][year] = (int(start), int(end))
+        table['year_group_d'][year] = tuple(np.searchsorted(table['group_year'], [year, year + 1]).tolist())
+        pmid_order_l.append(start + np.argsort(table['pmid'][start:end], kind='stable'))
+        netid_order_l.append(start + np.argsort(table['netid'][start:end], kind='stable'))
+    table['pmid_order'] = np.concatenate(pmid_order_l) if len(pmid_order_l) > 0 else np.zeros(0, dtype=np.int64)
+    table['netid_order'] = np.concatenate(netid_order_l) if len(netid_order_l) > 0 else np.zeros(0, dtype=np.int64)
+    return table
+
+def reference_Table_From_Rows_D(ref_row):
+    """Creates the table from the rows of PAPER2_topic_year_netid_CLEAN.txt without the header (PubMed ID in column 2, topic in
+    column 3, year in column 4 and net ID in column 5)"""
+    pmid_array, topic_array, year_array, netid_array = clean_references.int_Columns(ref_row, [2, 3, 4, 5])
+    return c_Reference_Table_D(year_array, topic_array, pmid_array, netid_array)
+
+def reference_Table_From_Netid_Rows_D(rows):
+    """Creates the table from rows of year, topic and net ID without a header (e.g. PAPER2_topic_year_netid_TEST.txt). The
+    PubMed IDs are MISSING"""
+    year_array, topic_array, netid_array = clean_references.int_Columns(rows, [0, 1, 2])
+    return c_Reference_Table_D(year_array, topic_array, np.full(len(netid_array), MISSING, dtype=np.int64), netid_array)
+
+def read_Reference_Table_D(filename, encoding=None, errors=None):
+    """Reads PAPER2_topic_year_netid_CLEAN.txt as a table"""
+    ref = reading.p_Tab_Delimited(filename, encoding=encoding, errors=errors)
+    return reference_Table_From_Rows_D(ref[1:])
+
+def reference_Table_From_Retrieved_D(year_topic_retrieved_d, full_table=None, key='positives_retrieved_in_net'):
+    """Creates the table of the references retrieved in the network (clean_ref.pickle)
+
+    Parameters
+    ----------
+    year_topic_retrieved_d : dict of dict
+        year_topic_retrieved_THRESHOLD_d of clean_references.ipynb.
+
+    full_table : dict, optional
+        Table of all the references (see read_Reference_Table_D()). If it is given, the PubMed IDs are taken from it, otherwise
+        they are MISSING. The net IDs that are not references keep a MISSING PubMed ID.
+
+    key : str, optional
+        Net IDs of each topic that are the rows of the table. By default the references ('positives_retrieved_in_net'). With
+        'retrieved_in_net' the rows are all the documents retrieved by the Boolean query of the topic.
+    """
+    column_l = [[], [], []]
+    for year in year_topic_retrieved_d:
+        for topic in year_topic_retrieved_d[year]:
+            netid_l = year_topic_retrieved_d[year][topic][key]
+            column_l[0] += [year] * len(netid_l)
+            column_l[1] += [topic] * len(netid_l)
+            column_l[2] += list(netid_l)
+    year_array, topic_array, netid_array = [np.array(x, dtype=np.int64) for x in column_l]
+    pmid_array = np.full(len(netid_array), MISSING, dtype=np.int64)
+    if full_table is not None:
+        for year in np.unique(year_array).tolist():
+            row_array = np.flatnonzero(year_array == year)
+            found, pmid_found_array = netid_To_Pmid(full_table, year, netid_array[row_array])
+            pmid_array[row_array[found]] = pmid_found_array
+    return c_Reference_Table_D(year_array, topic_array, pmid_array, netid_array)
+
+def reference_Table_From_D(year_references_d):
+    """Creates the table from year -> topic -> net IDs (e.g. year_references_d of clustering.ipynb). The PubMed IDs are MISSING"""
+    column_l = [[], [], []]
+    for year in year_references_d:
+        for topic in year_references_d[year]:
+            netid_l = list(year_references_d[year][topic])
+            column_l[0] += [year] * len(netid_l)
+            column_l[1] += [topic] * len(netid_l)
+            column_l[2] += netid_l
+    year_array, topic_array, netid_array = [np.array(x, dtype=np.int64) for x in column_l]
+    return c_Reference_Table_D(year_array, topic_array, np.full(len(netid_array), MISSING, dtype=np.int64), netid_array)
+
+def is_Reference_Table(references):
+    """True if the references are a table (see c_Reference_Table_D())"""
+    return isinstance(references, dict) and references.get('kind') == 'reference_table'
+
+def table_Years(table):
+    """Years of the table"""
+    return list(table['year_row_d'])
+
+def year_Topics(table, year):
+    """Topics of a year, sorted"""
+    start, end = table['year_group_d'].get(year, (0, 0))
+    return table['group_topic'][start:end].tolist()
+
+def topic_Rows(table, year, topic):
+    """First and last (+1) rows of a topic. Both are 0 if the topic is not in the table"""
+    g = table['group_index_d'].get((year, topic))
+    if g is None:
+        return 0, 0
+    return int(table['group_start'][g]), int(table['group_start'][g + 1])
+
+def topic_Netids(table, year, topic):
+    """Sorted net IDs of the references of a topic (a view of the column, do not modify it)"""
+    start, end = topic_Rows(table, year, topic)
+    return table['netid'][start:end]
+
+def topic_Pmids(table, year, topic):
+    """PubMed IDs of the references of a topic, in the order of topic_Netids()"""
+    start, end = topic_Rows(table, year, topic)
+    return table['pmid'][start:end]
+
+def select_Year(table, year):
+    """Table with the references of one year"""
+    start, end = table['year_row_d'].get(year, (0, 0))
+    return c_Reference_Table_D(*[table[column][start:end] for column in COLUMNS])
+
+def as_T_References_D(table, year=None):
+    """References of a year as the dict of set used by the pipeline (topic -> set of net IDs)
+
+    Notes
+    -------
+    If year is None the table must have only one year (e.g. select_Year()).
+    """
+    if year is None:
+        assert (len(table['year_row_d']) <= 1), 'The table has more than one year, give the year'
+        year = table_Years(table)[0] if len(table['year_row_d']) == 1 else None
+    t_references_d = {}
+    for topic in year_Topics(table, year):
+        t_references_d[topic] = set(topic_Netids(table, year, topic).tolist())
+    return t_references_d
+
+def as_Year_References_D(table):
+    """References as year -> topic -> set of net IDs (year_references_d of clustering.ipynb)"""
+    return {year: as_T_References_D(table, year) for year in table_Years(table)}
+
+def reference_Arrays_D(table):
+    """References as year -> topic -> {'pmid': array, 'netid': array}, the input of
+    functions_clean_references.c_Year_Topic_Retrieved_D() and c_Collision_Report_D(). The arrays are views of the columns"""
+    reference_d = {}
+    for year in table_Years(table):
+        reference_d[year] = {topic: {'pmid': topic_Pmids(table, year, topic), 'netid': topic_Netids(table, year, topic)} for topic in year_Topics(table, year)}
+    return reference_d
+
+def t_References_D(references, year=None):
+    """Returns the references as the dict of set of the pipeline. A table is converted (see as_T_References_D()), a dict is
+    returned as it is. It lets the entry points of the pipeline accept either"""
+    if is_Reference_Table(references):
+        return as_T_References_D(references, year)
+    return references
+
+def lookup_Column(table, year, key_column, value_column, key_array):
+    """Finds the value of a column for keys of another column in one year (see pmid_To_Netid())"""
+    key_array = np.asarray(key_array, dtype=np.int64)
+    start, end = table['year_row_d'].get(year, (0, 0))
+    if end == start:
+        return np.zeros(len(key_array), dtype=bool), np.zeros(0, dtype=np.int64)
+    order = table[key_column + '_order'][start:end]
+    sorted_key_array = table[key_column][order]
+    index_array = np.searchsorted(sorted_key_array, key_array)
+    index_array[index_array == len(sorted_key_array)] = 0
+    found = sorted_key_array[index_array] == key_array
+    return found, table[value_column][order[index_array[found]]]
+
+def pmid_To_Netid(table, year, pmid_array):
+    """Net IDs of PubMed IDs of the references of a year (year_pmid_netid_d_ref of the notebooks)
+
+    Returns
+    -------
+    found : numpy.ndarray
+        Boolean array, True if the PubMed ID is a reference of the year.
+
+    netid_array : numpy.ndarray
+        Net IDs of the found PubMed IDs, in the order of pmid_array.
+    """
+    return lookup_Column(table, year, 'pmid', 'netid', pmid_array)
+
+def netid_To_Pmid(table, year, netid_array):
+    """PubMed IDs of net IDs of the references of a year (year_netid_pmid_d_ref of the notebooks). Same returns as pmid_To_Netid()"""
+    return lookup_Column(table, year, 'netid', 'pmid', netid_array)
+
+def save_Reference_Table(table, path):
+    """Saves the columns of a table as a compressed .npz file. The indexes are created again when it is loaded"""
+    np.savez_compressed(path, **{column: table[column] for column in COLUMNS})
+
+def load_Reference_Table_D(path):
+    """Loads a table saved by save_Reference_Table()"""
+    with np.load(path) as arrays:
+        return c_Reference_Table_D(*[arrays[column] for column in COLUMNS])
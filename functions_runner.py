@@ -0,0 +1,447 @@
+import os
+import sys
+import json
+import time
+import pickle
+import shutil
+import hashlib
+import argparse
+import concurrent.futures
+import functions_reading as reading
+import functions_read_query as read_query
+import functions_clean_references as clean_references
+import functions_reference_table as reference_table
+import functions_pipeline as pipeline
+import functions_export as export
+import functions_memory as memory
+
+# Increase the version of a kind of stage when its code changes, so its artifacts are created again
+STAGE_VERSION_D = {'load_pickle': 1, 'queries': 2, 'clean_references': 2, 'references': 1, 'clustering': 2, 'metrics': 2, 'export': 1}
+# Networks of clustering.ipynb
+DEFAULT_NETWORK_D = {2014: 'PAPER2_nid1_nid2_YEAR_2003_2013.txt', 2015: 'PAPER2_nid1_nid2_YEAR_2004_2014.txt', 2016: 'PAPER2_nid1_nid2_YEAR_2005_2015.txt'}
+# Topics with a Boolean query in clean_references.ipynb
+DONE_TOPICS = [1, 3, 4, 6, 11, 12, 13, 18, 19, 28, 43, 46, 47, 51, 53, 54, 55, 59, 62, 69, 78, 79, 80, 89, 93, 95, 105, 116, 119,
+               124, 130, 136, 137, 151, 155, 160, 169, 173]
+
+def c_Stage_D(name, kind, params=None, inputs=None, files=None, options=None, outputs=None, publish=None):
+    """Creates a stage of the runner
+
+    Parameters
+    ----------
+    name : str
+        Unique name of the stage (e.g. 'clustering_2014').
+
+    kind : str
+        Kind of stage, the key of STAGE_FUNCTION_D.
+
+    params : dict, optional
+        Parameters of the stage. They are part of the key of the artifact, so they must be JSON values.
+
+    inputs : list of str, optional
+        Names of the stages whose artifacts are the inputs of the stage.
+
+    files : list of str, optional
+        Paths of the input files. Their content is part of the key of the artifact.
+
+    options : dict, optional
+        Parameters that do not change the artifact (e.g. a cache or the number of threads). They are not part of the key.
+
+    outputs : list of str, optional
+        Files written by the stage besides its artifact. If one is missing the stage runs again.
+
+    publish : str, optional
+        Name of the copy of the artifact in the output directory (e.g. 'cs_2014.pickle', the name read by the notebooks).
+    """
+    return {'name': name, 'kind': kind, 'params': params or {}, 'inputs': inputs or [], 'files': files or [],
+            'options': options or {}, 'outputs': outputs or [], 'publish': publish}
+
+def c_Runner_Dag_D(config_d):
+    """Creates the stages of the workflow of the notebooks (clean_references -> clustering -> results -> create_data)
+
+    Parameters
+    ----------
+    config_d : dict
+        Configuration, as created by the command line (see c_Argument_Parser()).
+
+    Returns
+    -------
+    dag_d : dict
+        The key is the name of the stage and the value is the stage (see c_Stage_D()). The stages are in topological order.
+
+    Notes
+    -------
+    The stages are:
+    - 'queries': the PubMed IDs of the Boolean queries of the topics (functions_read_query.topic_Api_D()).
+    - 'clean_references': the references retrieved by the queries that are in the networks (clean_ref.pickle). If
+      config_d['clean_ref'] is given, the existing pickle is used and the queries are not run.
+    - 'references_<year>': the references of each topic of the year, as year_references_d in clustering.ipynb.
+    - 'clustering_<year>': the tree of clusters of the year (functions_pipeline.pipeline_Tree()).
+    - 'metrics_<year>': the metrics, the greedy algorithm and the F-scores (functions_pipeline.pipeline_Metrics(), cs_<year>.pickle).
+      Only these stages depend on beta_l.
+    - 'export_<year>': the pmid_clusters_<year>.txt file of Zenodo, if config_d['netid_pmid'] is given.
+    """
+    dag_d = {}
+    if config_d.get('clean_ref'):
+        dag_d['clean_references'] = c_Stage_D('clean_references', 'load_pickle', files=[config_d['clean_ref']], publish='clean_ref.pickle')
+    else:
+        query_file_l = [config_d['query_dir'] + str(topic) + config_d['query_suffix'] for topic in config_d['topics']]
+        dag_d['queries'] = c_Stage_D('queries', 'queries', params={'topics': config_d['topics'], 'filename_part1': config_d['query_dir'],
+                                     'filename_part3': config_d['query_suffix']}, files=query_file_l,
+                                     options={'cache_path': config_d.get('query_cache'), 'max_workers': config_d.get('query_workers')})
+        dag_d['clean_references'] = c_Stage_D('clean_references', 'clean_references', params={'min_positives': config_d['min_positives']},
+                                              inputs=['queries'], files=[config_d['references'], config_d['union']], publish='clean_ref.pickle')
+    network_d = dict(DEFAULT_NETWORK_D)
+    network_d.update(config_d.get('network') or {})
+    for year in config_d['years']:
+        dag_d['references_' + str(year)] = c_Stage_D('references_' + str(year), 'references', params={'year': year}, inputs=['clean_references'])
+        dag_d['clustering_' + str(year)] = c_Stage_D('clustering_' + str(year), 'clustering',
+                                                     params={'year': year, 'initial_resolution': config_d['initial_resolution'],
+                                                             'clusters_per_level': config_d['clusters_per_level'],
+                                                             'max_depth': config_d['max_depth'], 'resolution_factor': config_d['resolution_factor']},
+                                                     inputs=['references_' + str(year)], files=[network_d[year]])
+        for option in ['normalize_edges', 'coarsen']:  # Only added when they are used, so the keys of the existing artifacts do not change
+            if config_d.get(option):
+                dag_d['clustering_' + str(year)]['params'][option] = True
+        dag_d['metrics_' + str(year)] = c_Stage_D('metrics_' + str(year), 'metrics', params={'beta_l': config_d['beta_l']},
+                                                  inputs=['clustering_' + str(year)], publish='cs_' + str(year) + '.pickle')
+        if config_d.get('netid_pmid'):
+            output_dir = config_d.get('output_dir') or '.'
+            file_name = 'pmid_clusters_' + str(year) + '.txt' + ('.gz' if config_d.get('compress') else '')
+            dag_d['export_' + str(year)] = c_Stage_D('export_' + str(year), 'export', params={'compress': bool(config_d.get('compress'))},
+                                                     inputs=['clustering_' + str(year)], files=[config_d['netid_pmid']],
+                                                     options={'path': os.path.join(output_dir, file_name)},
+                                                     outputs=[os.path.join(output_dir, file_name)])
+    return dag_d
+
+def stage_Load_Pickle(stage_d, input_l):
+    """Artifact of an existing pickle file"""
+    with open(stage_d['files'][0], 'rb') as f:
+        return pickle.load(f)
+
+def stage_Queries(stage_d, input_l):
+    """Retrieves the PubMed IDs of the Boolean query of each topic (connect_topics_d of clean_references.ipynb)
+
+    Notes
+    -------
+    Only the query ('format_query') and the IDs ('id_list') of each topic are kept, so the content hash of the artifact only
+    changes when the retrieved documents change, and the next stages are not run again otherwise.
+    """
+    params = stage_d['params']
+    options = stage_d['options']
+    client_d = None
+    if options.get('cache_path') or options.get('max_workers'):
+        cache_d = read_query.c_Response_Cache_D(options['cache_path']) if options.get('cache_path') else None
+        client_d = read_query.c_Pubmed_Client_D(cache_d=cache_d)
+    topic_api_d = read_query.topic_Api_D(params['topics'], filename_part1=params['filename_part1'], filename_part3=params['filename_part3'],
+                                         client_d=client_d, max_workers=options.get('max_workers'))
+    return {topic: {'format_query': topic_api_d[topic]['format_query'], 'id_list': topic_api_d[topic]['id_list']} for topic in topic_api_d}
+
+def stage_Clean_References(stage_d, input_l):
+    """Removes the references that are not retrieved or not in the network, and the topics with too few references left
+    (year_topic_retrieved_THRESHOLD_d of clean_references.ipynb)"""
+    reference_d = reference_table.reference_Arrays_D(reference_table.read_Reference_Table_D(stage_d['files'][0]))
+    pmid_netid_table_d = clean_references.read_Pmid_Netid_Table_D(stage_d['files'][1])
+    year_topic_retrieved_d = clean_references.c_Year_Topic_Retrieved_D(reference_d, pmid_netid_table_d, input_l[0])
+    return clean_references.threshold_Year_Topic_Retrieved_D(year_topic_retrieved_d, min_positives=stage_d['params']['min_positives'])
+
+def stage_References(stage_d, input_l):
+    """References of each topic of a year, as year_references_d[year] in clustering.ipynb"""
+    year_topic_retrieved_d = input_l[0].get(stage_d['params']['year'], {})
+    return {topic: set(year_topic_retrieved_d[topic]['positives_retrieved_in_net']) for topic in year_topic_retrieved_d}
+
+def stage_Clustering(stage_d, input_l):
+    """Clustering solution of a year without metrics (functions_pipeline.pipeline_Tree(), the first stages of pipeline_Clustering())
+
+    Notes
+    -------
+    The memory of the stages is not stored in the artifact (it changes in every run, and so would the content hash). The peak
+    memory of the stage is in the metadata of the artifact.
+    """
+    params = stage_d['params']
+    return pipeline.pipeline_Tree(params['year'], input_l[0], stage_d['files'][0], memory.c_Memory_D(), params['initial_resolution'],
+                                  params['clusters_per_level'], params['max_depth'], params['resolution_factor'], None,
+                                  normalize_edges=params.get('normalize_edges', False), coarsen=params.get('coarsen', False))
+
+def stage_Metrics(stage_d, input_l):
+    """Metrics, greedy algorithm and F-scores of a clustering solution (the last stages of pipeline_Clustering())"""
+    cs = input_l[0]
+    cs['beta_l'] = stage_d['params']['beta_l']
+    return pipeline.pipeline_Metrics(cs, memory.c_Memory_D())
+
+def stage_Export(stage_d, input_l):
+    """Writes the pmid_clusters_<year>.txt file of a clustering solution (create_data.ipynb)"""
+    netid_pmid = reading.p_Tab_Delimited(stage_d['files'][0])
+    netid_pmid_d = {int(netid): int(pmid) for netid, pmid in netid_pmid}
+    path = stage_d['options']['path']
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    cluster_m, netid_array = export.export_Clusters(input_l[0], netid_pmid_d, path, compress=stage_d['params']['compress'])
+    return {'path': path, 'documents': len(netid_array), 'bytes': os.path.getsize(path)}
+
+STAGE_FUNCTION_D = {'load_pickle': stage_Load_Pickle, 'queries': stage_Queries, 'clean_references': stage_Clean_References,
+                    'references': stage_References, 'clustering': stage_Clustering, 'metrics': stage_Metrics, 'export': stage_Export}
+
+def file_Hash(path, hash_index_d=None, chunk_size=1048576):
+    """SHA-256 of the content of a file
+
+    Notes
+    -------
+    If hash_index_d is given, the hash is stored with the size and the modification time of the file, and it is only computed
+    again when they change (the networks are several GB).
+    """
+    stat = os.stat(path)
+    index_key = os.path.abspath(path)
+    if hash_index_d is not None:
+        entry = hash_index_d.get(index_key)
+        if entry is not None and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['sha256']
+    file_hash = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            file_hash.update(chunk)
+    if hash_index_d is not None:
+        hash_index_d[index_key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': file_hash.hexdigest()}
+    return file_hash.hexdigest()
+
+def stage_Key(stage_d, input_hash_l, file_hash_l):
+    """Key of the artifact of a stage: the hash of its kind, version, parameters, and the content of its inputs and files"""
+    key_d = {'kind': stage_d['kind'], 'version': STAGE_VERSION_D[stage_d['kind']], 'params': stage_d['params'],
+             'inputs': input_hash_l, 'files': file_hash_l}
+    return hashlib.sha256(json.dumps(key_d, sort_keys=True).encode('UTF-8')).hexdigest()
+
+def artifact_Path(artifact_dir, name, key):
+    """Path of the artifact of a stage. Its metadata is in the same path with .json instead of .pickle"""
+    return os.path.join(artifact_dir, name, key + '.pickle')
+
+class Hash_Writer:
+    """File wrapper that computes the SHA-256 of the bytes written, so an artifact is hashed without holding its pickle in memory"""
+    def __init__(self, f):
+        self.f = f
+        self.hash = hashlib.sha256()
+
+    def write(self, data):
+        self.hash.update(data)
+        return self.f.write(data)
+
+def write_Atomic(path, write_function):
+    """Writes a file through a temporary file, so an interrupted run never leaves a partial artifact"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary_path = path + '.' + str(os.getpid()) + '.tmp'
+    try:
+        with open(temporary_path, 'wb') as f:
+            result = write_function(f)
+        os.replace(temporary_path, path)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+    return result
+
+def save_Artifact(artifact, path):
+    """Pickles an artifact and returns the SHA-256 of the pickle"""
+    def write_Pickle(f):
+        writer = Hash_Writer(f)
+        pickle.dump(artifact, writer, protocol=pickle.HIGHEST_PROTOCOL)
+        return writer.hash.hexdigest()
+    return write_Atomic(path, write_Pickle)
+
+def load_Artifact(path):
+    """Loads a pickled artifact"""
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+def read_Meta_D(path):
+    """Reads the metadata of an artifact, or None if the artifact does not exist"""
+    meta_path = path[:-len('.pickle')] + '.json'
+    if not (os.path.exists(path) and os.path.exists(meta_path)):
+        return None
+    with open(meta_path, 'r', encoding='UTF-8') as f:
+        return json.load(f)
+
+def run_Stage(stage_d, input_path_l, path):
+    """Runs a stage and saves its artifact
+
+    Parameters
+    ----------
+    stage_d : dict
+        Stage (see c_Stage_D()).
+
+    input_path_l : list of str
+        Paths of the artifacts of the inputs of the stage.
+
+    path : str
+        Path of the artifact.
+
+    Returns
+    -------
+    meta_d : dict
+        Metadata of the artifact: the SHA-256 of the pickle ('content_hash'), the seconds of the stage ('seconds', without loading
+        the inputs and saving the artifact), the size of the pickle ('bytes') and the peak memory of the process ('peak_rss').
+
+    Notes
+    -------
+    It is a function of the module so it can run in another process. The inputs are loaded from disk, so only paths and metadata
+    are sent between processes.
+    """
+    input_l = [load_Artifact(input_path) for input_path in input_path_l]
+    start = time.perf_counter()
+    artifact = STAGE_FUNCTION_D[stage_d['kind']](stage_d, input_l)
+    seconds = time.perf_counter() - start
+    del input_l
+    content_hash = save_Artifact(artifact, path)
+    meta_d = {'stage': stage_d['name'], 'kind': stage_d['kind'], 'key': os.path.basename(path)[:-len('.pickle')], 'content_hash': content_hash,
+              'seconds': seconds, 'bytes': os.path.getsize(path), 'peak_rss': memory.peak_Rss_Bytes(), 'created': time.strftime('%Y-%m-%d %H:%M:%S')}
+    write_Atomic(path[:-len('.pickle')] + '.json', lambda f: f.write(json.dumps(meta_d).encode('UTF-8')))
+    return meta_d
+
+def run_Dag(dag_d, artifact_dir, max_workers=None, force_l=(), output_dir=None):
+    """Runs the stages whose artifacts do not exist
+
+    Parameters
+    ----------
+    dag_d : dict
+        Stages (see c_Runner_Dag_D()).
+
+    artifact_dir : str
+        Directory of the artifacts. There is one directory per stage, and each artifact is named by its key.
+
+    max_workers : int, optional
+        Number of stages run at the same time, each in its own process (e.g. the clustering of each year). By default the stages
+        run one after another in this process.
+
+    force_l : list of str, optional
+        Names or kinds of stages that run even if their artifact exists.
+
+    output_dir : str, optional
+        If it is given, the artifacts with a publish name are copied there (e.g. cs_2014.pickle, for the notebooks).
+
+    Returns
+    -------
+    report_d : dict
+        'stages' has one record per stage in the order they finish: its name, its key, if it was 'run' or 'cached', and the
+        metadata of its artifact. 'seconds' is the time of the run. The report is also appended to artifact_dir/timing.jsonl.
+
+    Notes
+    -------
+    The key of a stage depends on the content hash of the artifacts of its inputs, not on their keys. Therefore, if a stage runs
+    again but its artifact does not change (e.g. a new Boolean query that retrieves the same documents), the next stages are not
+    run. A change of beta_l only changes the key of the metrics stages, so the clustering is not repeated.
+    """
+    start = time.perf_counter()
+    hash_index_path = os.path.join(artifact_dir, 'file_hashes.json')
+    hash_index_d = {}
+    if os.path.exists(hash_index_path):
+        with open(hash_index_path, 'r', encoding='UTF-8') as f:
+            hash_index_d = json.load(f)
+    meta_d = {}  # Metadata of the artifact of each finished stage
+    path_d = {}
+    pending_l = list(dag_d)
+    record_l = []
+    executor = None if max_workers is None else concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        jobs_d = {}
+        while len(pending_l) > 0 or len(jobs_d) > 0:
+            ready_l = [name for name in pending_l if all([input_name in meta_d for input_name in dag_d[name]['inputs']])]
+            assert (len(ready_l) > 0 or len(jobs_d) > 0), 'Stages with missing inputs: ' + str(pending_l)
+            for name in ready_l:
+                pending_l.remove(name)
+                stage_d = dag_d[name]
+                input_hash_l = [meta_d[input_name]['content_hash'] for input_name in stage_d['inputs']]
+                key = stage_Key(stage_d, input_hash_l, [file_Hash(path, hash_index_d) for path in stage_d['files']])
+                path_d[name] = artifact_Path(artifact_dir, name, key)
+                stage_meta_d = read_Meta_D(path_d[name])
+                forced = name in force_l or stage_d['kind'] in force_l
+                if stage_meta_d is not None and not forced and all([os.path.exists(output) for output in stage_d['outputs']]):
+                    meta_d[name] = stage_meta_d
+                    record_l.append({'stage': name, 'key': key, 'status': 'cached', 'meta': stage_meta_d})
+                    continue
+                input_path_l = [path_d[input_name] for input_name in stage_d['inputs']]
+                if executor is None:
+                    meta_d[name] = run_Stage(stage_d, input_path_l, path_d[name])
+                    record_l.append({'stage': name, 'key': key, 'status': 'run', 'meta': meta_d[name]})
+                else:
+                    jobs_d[executor.submit(run_Stage, stage_d, input_path_l, path_d[name])] = (name, key)
+            if len(jobs_d) > 0:
+                done_jobs, _ = concurrent.futures.wait(jobs_d, return_when=concurrent.futures.FIRST_COMPLETED)
+                for job in done_jobs:
+                    name, key = jobs_d.pop(job)
+                    meta_d[name] = job.result()
+                    record_l.append({'stage': name, 'key': key, 'status': 'run', 'meta': meta_d[name]})
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        write_Atomic(hash_index_path, lambda f: f.write(json.dumps(hash_index_d).encode('UTF-8')))
+    if output_dir is not None:
+        for name in dag_d:
+            if dag_d[name]['publish'] is not None:
+                publish_Artifact(path_d[name], os.path.join(output_dir, dag_d[name]['publish']))
+    report_d = {'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'seconds': time.perf_counter() - start, 'max_workers': max_workers,
+                'stages': record_l}
+    with open(os.path.join(artifact_dir, 'timing.jsonl'), 'a', encoding='UTF-8') as f:
+        f.write(json.dumps(report_d) + '\n')
+    return report_d
+
+def publish_Artifact(path, publish_path):
+    """Copies an artifact to the output directory (as a hard link if possible). It does nothing if the file is already the artifact"""
+    os.makedirs(os.path.dirname(publish_path) or '.', exist_ok=True)
+    if os.path.exists(publish_path):
+        if os.path.samefile(path, publish_path):
+            return
+        os.remove(publish_path)
+    try:
+        os.link(path, publish_path)
+    except OSError:
+        shutil.copyfile(path, publish_path)
+
+def timing_Table(report_d):
+    """Text table of the stages of a run report"""
+    line_l = ['stage\tstatus\tseconds\tbytes']
+    for record in report_d['stages']:
+        line_l.append(record['stage'] + '\t' + record['status'] + '\t' + format(record['meta']['seconds'], '.2f') + '\t' + str(record['meta']['bytes']))
+    line_l.append('total\t\t' + format(report_d['seconds'], '.2f') + '\t')
+    return '\n'.join(line_l)
+
+def year_Path(value):
+    """Parses a 'year=path' argument"""
+    year, path = value.split('=', 1)
+    return int(year), path
+
+def c_Argument_Parser():
+    """Parser of the command line of the runner"""
+    parser = argparse.ArgumentParser(description='Runs the clean references, clustering, metrics and export stages, skipping the stages whose inputs did not change.')
+    parser.add_argument('--artifact-dir', default='artifacts', help='directory of the artifacts of the stages')
+    parser.add_argument('--output-dir', default=None, help='directory for clean_ref.pickle, cs_<year>.pickle and the exported files')
+    parser.add_argument('--years', type=int, nargs='+', default=sorted(DEFAULT_NETWORK_D))
+    parser.add_argument('--network', type=year_Path, action='append', default=[], help='network of a year as year=path (by default the networks of clustering.ipynb)')
+    parser.add_argument('--clean-ref', default=None, help='existing clean_ref.pickle. If it is given, the queries and the clean references stages are not run')
+    parser.add_argument('--references', default='PAPER2_topic_year_netid_CLEAN.txt')
+    parser.add_argument('--union', default='PAPER2_netid_pmid_pubid_year_UNION.txt')
+    parser.add_argument('--topics', type=int, nargs='+', default=DONE_TOPICS)
+    parser.add_argument('--query-dir', default=os.path.join('boolean_queries', ''), help='first part of the name of the query files')
+    parser.add_argument('--query-suffix', default='_reviewed.txt', help='last part of the name of the query files')
+    parser.add_argument('--query-cache', default=None, help='SQLite cache of the PubMed responses (see functions_read_query.c_Response_Cache_D)')
+    parser.add_argument('--query-workers', type=int, default=None, help='number of queries sent at the same time')
+    parser.add_argument('--min-positives', type=int, default=10)
+    parser.add_argument('--initial-resolution', type=float, default=0.000002)
+    parser.add_argument('--clusters-per-level', type=int, default=10)
+    parser.add_argument('--max-depth', type=int, default=13)
+    parser.add_argument('--resolution-factor', type=float, default=3.0)
+    parser.add_argument('--beta-l', type=float, nargs='+', default=[0.125, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0])
+    parser.add_argument('--normalize-edges', action='store_true', help='merge the reciprocal citations into weighted edges (see functions_reading.normalize_Network)')
+    parser.add_argument('--coarsen', action='store_true', help='cluster the top level on the core of the network (see functions_clustering.set_Coarsening)')
+    parser.add_argument('--netid-pmid', default=None, help='netid_pmid.txt. If it is given, the pmid_clusters_<year>.txt files are exported')
+    parser.add_argument('--compress', action='store_true', help='compress the exported files with gzip')
+    parser.add_argument('--workers', type=int, default=None, help='number of stages run at the same time in different processes')
+    parser.add_argument('--force', nargs='+', default=[], help='names or kinds of stages that run even if their artifacts exist')
+    return parser
+
+def main(argv=None):
+    """Command line of the runner, e.g. 'python functions_runner.py --clean-ref clean_ref.pickle --workers 3 --output-dir .'"""
+    args = c_Argument_Parser().parse_args(argv)
+    config_d = vars(args)
+    config_d['network'] = dict(args.network)
+    dag_d = c_Runner_Dag_D(config_d)
+    report_d = run_Dag(dag_d, args.artifact_dir, max_workers=args.workers, force_l=args.force, output_dir=args.output_dir)
+    print(timing_Table(report_d))
+    return report_d
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
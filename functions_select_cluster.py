@@ -3,6 +3,11 @@
 # Also, I believe it is better to get the clustering solutions first, as the greedy algorithm especification can change acordiong to my meetings
 # For now, I will only do the greedy algorithm for the F-scores
 
+import bisect
+import concurrent.futures
+import numpy as np
+import functions_metrics as metrics
+
 def select_By_X(cluster_m_d, beta):
     """Selects the highest cluster acording to the provided metrics
 
@@ -54,24 +59,29 @@ def c_Selected_Cluster_D(cluster_tuple_d):
     
     Notes
     -------
-    The function sorts the tuples from the highest to the lowest value, giving priority to the first values in the tuple.
+    The function compares the tuples giving priority to the first values in the tuple.
     If there is a tie (i.e. more than one cluster with the higest value) then the function selects one of the highest clusters arbirarily
     and reports in selected_cluster_d that there was a tie.
+    The clusters are compared in a single pass (linear time) instead of sorting all the clusters. The selected cluster is the
+    first of the highest clusters in the order of cluster_tuple_d, which is the same cluster that a stable sort would select.
     """
-    sorted_clusters = sorted(cluster_tuple_d.keys(), key=lambda x: cluster_tuple_d[x], reverse=True)
-    max_cluster = sorted_clusters[0]
+    cluster_l = list(cluster_tuple_d)
+    max_cluster = cluster_l[0]
     max_values = cluster_tuple_d[max_cluster]
     tie = False
-    if len(sorted_clusters) > 1:
-        second_max_cluster = sorted_clusters[1]
-        second_max_values = cluster_tuple_d[second_max_cluster]
-        if max_values == second_max_values:
+    for cluster in cluster_l[1:]:  # Linear search of the two highest values, the first cluster with the highest value wins as in a stable sort
+        values = cluster_tuple_d[cluster]
+        if values > max_values:
+            max_cluster = cluster
+            max_values = values
+            tie = False
+        elif values == max_values:
             tie = True
     max_value_1 = max_values[0]
     s_cluster_d = {'cluster': max_cluster, 'value': max_value_1, 'tie': tie}
     return s_cluster_d
 
-def c_T_Greedy_D(level_data, topic_l, beta_l):
+def c_T_Greedy_D(level_data, topic_l, beta_l, single_pass=True):
     """Creates the greedy dictionary of selected clusters
 
     Parameters
@@ -85,18 +95,34 @@ def c_T_Greedy_D(level_data, topic_l, beta_l):
     beta_l : list
         List of the betas to use for the F-score.
 
+    single_pass : bool, optional
+        If True, all the betas of a topic are evaluated in one descent of the tree (see recursive_T_Greedy_Multi_Beta_D()).
+        If False, the tree is descended once per topic and beta with recursive_T_Greedy_D(). Both give the same result.
+
     Returns
     -------
     t_m_greedy_d : dict of dict
         Dictionary with clusters selected by the greedy algorithm. First level is the topics
+
+    Notes
+    -------
+    With single_pass, the metrics of a topic in a level are converted to arrays for all the betas the first time the descent
+    reaches the level (see level_Metrics_Array_D()). The arrays are discarded when the function returns, so they are never stored
+    in the tree nor go out of date.
     """
     t_m_greedy_d = {}
+    array_cache_d = c_Array_Cache_D(beta_l)
     for t in topic_l:
         t_m_greedy_d[t] = {}
+        if single_pass:
+            beta_greedy_d = recursive_T_Greedy_Multi_Beta_D(t, {beta: {} for beta in beta_l}, level_data, beta_l, array_cache_d)
         for beta in beta_l:
             beta_name = 'by_beta_' + str(beta)
             t_m_greedy_d[t][beta_name] = {}
-            t_m_greedy_d[t][beta_name]['all_levels'] = recursive_T_Greedy_D(t, {}, level_data, beta)
+            if single_pass:
+                t_m_greedy_d[t][beta_name]['all_levels'] = beta_greedy_d[beta]
+            else:
+                t_m_greedy_d[t][beta_name]['all_levels'] = recursive_T_Greedy_D(t, {}, level_data, beta)
             t_m_greedy_d[t][beta_name]['stoping_level'] = choose_Stoping_Level(t_m_greedy_d[t][beta_name]['all_levels'])
     return t_m_greedy_d
 
@@ -138,6 +164,112 @@ def recursive_T_Greedy_D(topic, greedy_d, level_data, beta):
         greedy_d = recursive_T_Greedy_D(topic, greedy_d, s_cluster_level_data, beta)
     return greedy_d
 
+def select_By_X_Multi_Beta(metrics_array_d, beta_index=None):
+    """Selects the highest cluster of each beta
+
+    Parameters
+    ----------
+    metrics_array_d : dict
+        Array version of the metrics of the clusters, see functions_metrics.c_Metrics_Array_D().
+
+    beta_index : list, optional
+        Columns of metrics_array_d['fscore'] to use. By default all the betas.
+
+    Returns
+    -------
+    selected_i : numpy.ndarray
+        Position of the selected cluster of each beta (in the order of beta_index).
+
+    tie : numpy.ndarray
+        If there was a tie when selecting the cluster of each beta.
+
+    Notes
+    -------
+    This is the vectorized version of select_By_X() for all the betas at once. The clusters are compared by fscore, then by
+    recall and then by precision. The candidates are the clusters with the highest fscore, then the candidates with the highest
+    recall, and then the candidates with the highest precision. There is a tie if more than one candidate is left, and the
+    selected cluster is the first candidate (the same cluster selected by c_Selected_Cluster_D()). Each step is linear in the
+    number of clusters.
+    """
+    fscore = metrics_array_d['fscore']
+    if beta_index is not None:
+        fscore = fscore[:, beta_index]
+    candidates = fscore == fscore.max(axis=0)
+    for metric in (metrics_array_d['recall'], metrics_array_d['precision']):
+        candidate_metric = np.where(candidates, metric[:, None], -np.inf)
+        candidates &= candidate_metric == candidate_metric.max(axis=0)
+    selected_i = candidates.argmax(axis=0)  # The first candidate
+    tie = candidates.sum(axis=0) > 1
+    return selected_i, tie
+
+def c_Array_Cache_D(beta_l):
+    """Creates the cache of the metric arrays of the levels used by one call of c_T_Greedy_D()"""
+    return {'beta_l': list(beta_l), 'levels': {}}
+
+def level_Metrics_Array_D(array_cache_d, level_data, topic):
+    """Array version of the metrics of a topic in a level (see functions_metrics.c_Metrics_Array_D()), built once per call
+
+    Notes
+    -------
+    The arrays have all the betas of the cache. The levels are identified by id(), and the level is kept in the cache with its
+    arrays, so its id can not be reused by another level while the cache exists.
+    """
+    key = (id(level_data), topic)
+    if key not in array_cache_d['levels']:
+        array_cache_d['levels'][key] = (level_data, metrics.c_Metrics_Array_D(level_data['t_cluster_metrics'][topic], array_cache_d['beta_l']))
+    return array_cache_d['levels'][key][1]
+
+def recursive_T_Greedy_Multi_Beta_D(topic, beta_greedy_d, level_data, beta_l, array_cache_d=None):
+    """Recursive function of c_T_Greedy_D() for several betas at once
+
+    Parameters
+    ----------
+    topic : int
+        Topic over which apply the greedy algrotihm
+
+    beta_greedy_d : dict of dict
+        The first level is the beta and the second level is the greedy dictionary of the beta (see recursive_T_Greedy_D()).
+
+    level_data : dict
+        Dictionary with the data of the clustering solution of the current level.
+
+    beta_l : list
+        Betas that follow the current level.
+
+    array_cache_d : dict, optional
+        Cache created by c_Array_Cache_D() with all the betas of beta_l. By default a new one is created.
+
+    Returns
+    -------
+    beta_greedy_d : dict of dict
+        The first level is the beta and the second level is the greedy dictionary of the beta.
+
+    Notes
+    -------
+    The tree is descended once for all the betas. The betas that select the same cluster follow the same child level together,
+    so the descent only branches where the betas disagree. The metrics are read from the arrays of level_Metrics_Array_D(), only
+    the columns of the betas that follow the level are used. The result is the same as recursive_T_Greedy_D() for each beta.
+    """
+    if array_cache_d is None:
+        array_cache_d = c_Array_Cache_D(beta_l)
+    level = level_data['level']
+    metrics_array_d = level_Metrics_Array_D(array_cache_d, level_data, topic)
+    beta_index = [metrics_array_d['beta_index_d'][beta] for beta in beta_l]
+    selected_i, tie = select_By_X_Multi_Beta(metrics_array_d, beta_index)
+    cluster_beta_d = {}  # Betas that follow each selected cluster
+    for beta_i, beta in enumerate(beta_l):
+        i = selected_i[beta_i]
+        s_c = metrics_array_d['clusters'][i]
+        beta_greedy_d[beta][level] = {'cluster': s_c, 'value': float(metrics_array_d['fscore'][i, beta_index[beta_i]]), 'tie': bool(tie[beta_i]),
+                                      'recall': float(metrics_array_d['recall'][i]), 'precision': float(metrics_array_d['precision'][i]), 'level': level}
+        if s_c not in cluster_beta_d:
+            cluster_beta_d[s_c] = []
+        cluster_beta_d[s_c].append(beta)
+    if 'children_clusters' in level_data.keys():
+        for s_c in cluster_beta_d:
+            beta_greedy_d = recursive_T_Greedy_Multi_Beta_D(topic, beta_greedy_d, level_data['children_clusters'][s_c], cluster_beta_d[s_c], array_cache_d)
+    return beta_greedy_d
+
 def choose_Stoping_Level(all_levels_d):
     """Selects the stoping level from the clusters selected by the greedy algorithm
 
@@ -221,4 +353,281 @@ def recursive_Universal_Fscore_D(topic, beta_d, level_data):
         for cluster in level_data['children_clusters']:
             children_level_data = level_data['children_clusters'][cluster]
             beta_d = recursive_Universal_Fscore_D(topic, beta_d, children_level_data)
-    return beta_d
\ No newline at end of file
+    return beta_d
+
+def c_Fscore_Summary_D(top_k=10, n_bins=100):
+    """Creates an empty summary of F-scores
+
+    Parameters
+    ----------
+    top_k : int, optional
+        Number of highest distinct F-scores to keep.
+
+    n_bins : int, optional
+        Number of bins of the histogram. The bins split the interval [0, 1] in equal parts.
+
+    Returns
+    -------
+    summary : dict
+        Summary of F-scores. Keys:
+
+        max: float
+            Highest F-score (None if the summary is empty).
+
+        top_k: list of float
+            Highest distinct F-scores, sorted from lowest to highest. It has at most top_k values.
+
+        k: int
+            The top_k parameter.
+
+        histogram: list of int
+            Number of F-scores in each bin. The last bin includes 1.0.
+
+        count: int
+            Number of F-scores added to the summary.
+
+    Notes
+    -------
+    The size of the summary does not depend on the number of F-scores added to it. The max and the top_k values are exact.
+    Unlike the sets of c_T_Universal_Fscore_D(), the histogram counts every F-score (one per cluster), not only the distinct ones.
+    """
+    summary = {'max': None, 'top_k': [], 'k': top_k, 'histogram': [0]*n_bins, 'count': 0}
+    return summary
+
+def update_Fscore_Summary(summary, fscore):
+    """Adds an F-score to a summary of F-scores
+
+    Parameters
+    ----------
+    summary : dict
+        Summary of F-scores, see c_Fscore_Summary_D(). It is modified in place.
+
+    fscore : float
+        F-score to add.
+
+    Returns
+    -------
+    summary : dict
+        Updated summary.
+    """
+    if summary['max'] is None or fscore > summary['max']:
+        summary['max'] = fscore
+    top_k = summary['top_k']
+    if len(top_k) < summary['k'] or fscore > top_k[0]:
+        i = bisect.bisect_left(top_k, fscore)
+        if i == len(top_k) or top_k[i] != fscore:  # Only distinct values
+            top_k.insert(i, fscore)
+            if len(top_k) > summary['k']:
+                del(top_k[0])
+    histogram = summary['histogram']
+    n_bins = len(histogram)
+    histogram[min(int(fscore*n_bins), n_bins - 1)] += 1
+    summary['count'] += 1
+    return summary
+
+def merge_Fscore_Summary(summary_1, summary_2):
+    """Merges two summaries of F-scores
+
+    Parameters
+    ----------
+    summary_1 : dict
+        Summary of F-scores, see c_Fscore_Summary_D().
+
+    summary_2 : dict
+        Summary of F-scores with the same number of bins and top_k.
+
+    Returns
+    -------
+    summary : dict
+        Summary of the F-scores of both summaries. It is the same summary as adding all the F-scores to one summary.
+    """
+    assert (len(summary_1['histogram']) == len(summary_2['histogram']) and summary_1['k'] == summary_2['k']), 'The summaries have different sizes'
+    summary = c_Fscore_Summary_D(summary_1['k'], len(summary_1['histogram']))
+    max_l = [x['max'] for x in (summary_1, summary_2) if x['max'] is not None]
+    if len(max_l) > 0:
+        summary['max'] = max(max_l)
+    summary['top_k'] = sorted(set(summary_1['top_k']).union(summary_2['top_k']))[-summary['k']:]
+    summary['histogram'] = [n_1 + n_2 for n_1, n_2 in zip(summary_1['histogram'], summary_2['histogram'])]
+    summary['count'] = summary_1['count'] + summary_2['count']
+    return summary
+
+def quantile_Fscore_Summary(summary, q):
+    """Approximates a quantile of the F-scores of a summary
+
+    Parameters
+    ----------
+    summary : dict
+        Summary of F-scores, see c_Fscore_Summary_D().
+
+    q : float
+        Quantile, between 0 and 1.
+
+    Returns
+    -------
+    quantile : float
+        Upper edge of the bin that contains the quantile (the error is at most the width of a bin). The quantile 1.0 is the exact max.
+    """
+    if q >= 1.0:
+        return summary['max']
+    histogram = summary['histogram']
+    target = q*summary['count']
+    cumulative = 0
+    for bin_i, n in enumerate(histogram):
+        cumulative += n
+        if cumulative >= target and cumulative > 0:
+            quantile = min(float(bin_i + 1)/len(histogram), summary['max'])
+            return quantile
+    return summary['max']
+
+def c_T_Universal_Fscore_Summary_D(topic_l, beta_l, level_data, top_k=10, n_bins=100, max_workers=None):
+    """Creates dictionary with the summary of all the fscores found in the clustering solution
+
+    Parameters
+    ----------
+    topic_l : list
+        List of topics
+
+    beta_l : list
+        List of the betas to use for the F-score.
+
+    level_data : dict
+        Dictionary with the data of the clustering solution of the current level.
+
+    top_k : int, optional
+        Parameter of c_Fscore_Summary_D().
+
+    n_bins : int, optional
+        Parameter of c_Fscore_Summary_D().
+
+    max_workers : int, optional
+        If it is given, the branches under the current level are summarized in parallel by this number of processes and
+        then merged. Each process only gets the F-scores of its branch (see c_T_Fscore_Array_D()).
+
+    Returns
+    -------
+    universal_summary_d : dict of dict
+        The first level is the topics, the second level is the betas and the value is the summary of the F-scores.
+
+    Notes
+    -------
+    Bounded memory version of c_T_Universal_Fscore_D(). Instead of the set of all the F-scores, each topic and beta has a
+    summary of fixed size (see c_Fscore_Summary_D()). The exact version, c_T_Universal_Fscore_D(), can be used to validate the
+    summaries with check_Fscore_Summary().
+    """
+    universal_summary_d = {topic: {beta: c_Fscore_Summary_D(top_k, n_bins) for beta in beta_l} for topic in topic_l}
+    if max_workers is None:
+        universal_summary_d = recursive_Universal_Fscore_Summary_D(universal_summary_d, level_data)
+    else:
+        universal_summary_d = recursive_Universal_Fscore_Summary_D(universal_summary_d, level_data, children=False)
+        if 'children_clusters' in level_data.keys():
+            topic_l = list(universal_summary_d)
+            with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+                jobs_l = [executor.submit(t_Fscore_Array_Summary_D, c_T_Fscore_Array_D(topic_l, beta_l, children_level_data), beta_l, top_k, n_bins)
+                          for children_level_data in level_data['children_clusters'].values()]
+                for job in jobs_l:
+                    universal_summary_d = merge_T_Universal_Fscore_Summary_D(universal_summary_d, job.result())
+    return universal_summary_d
+
+def c_T_Fscore_Array_D(topic_l, beta_l, level_data):
+    """Collects the F-scores of all the clusters of a branch
+
+    Returns
+    -------
+    t_fscore_array_d : dict
+        The key is the topic and the value is an array (clusters x betas, in the order of beta_l) with the F-scores of the
+        clusters of level_data and of all the levels under it.
+
+    Notes
+    -------
+    Only these arrays are sent to the processes of c_T_Universal_Fscore_Summary_D(), not the branch with the documents of its
+    clusters. Each level is visited once, so the F-scores of its clusters are converted to an array only once.
+    """
+    part_d = {topic: [] for topic in topic_l}
+    level_l = [level_data]
+    while len(level_l) > 0:
+        level_data = level_l.pop()
+        for topic in topic_l:
+            topic_clusters = level_data['t_cluster_metrics'][topic]
+            part_d[topic].append(np.array([[topic_clusters[c]['fscore'][beta] for beta in beta_l] for c in topic_clusters], dtype=float).reshape(-1, len(beta_l)))
+        if 'children_clusters' in level_data.keys():
+            level_l += list(level_data['children_clusters'].values())
+    return {topic: np.concatenate(part_d[topic]) for topic in topic_l}
+
+def t_Fscore_Array_Summary_D(t_fscore_array_d, beta_l, top_k=10, n_bins=100):
+    """Summaries of the F-scores of c_T_Fscore_Array_D(), the job of each process of c_T_Universal_Fscore_Summary_D()"""
+    universal_summary_d = {}
+    for topic in t_fscore_array_d:
+        universal_summary_d[topic] = {}
+        for beta_i, beta in enumerate(beta_l):
+            summary = c_Fscore_Summary_D(top_k, n_bins)
+            for fscore in t_fscore_array_d[topic][:, beta_i].tolist():
+                update_Fscore_Summary(summary, fscore)
+            universal_summary_d[topic][beta] = summary
+    return universal_summary_d
+
+def recursive_Universal_Fscore_Summary_D(universal_summary_d, level_data, children=True):
+    """Recursive function of c_T_Universal_Fscore_Summary_D()
+
+    Parameters
+    ----------
+    universal_summary_d : dict of dict
+        The first level is the topics, the second level is the betas and the value is the summary of the F-scores.
+
+    level_data : dict
+        Dictionary with the data of the clustering solution of the current level.
+
+    children : bool, optional
+        If False, only the current level is added.
+
+    Returns
+    -------
+    universal_summary_d : dict of dict
+        Updated universal_summary_d.
+    """
+    for topic in universal_summary_d:
+        topic_clusters = level_data['t_cluster_metrics'][topic]
+        beta_d = universal_summary_d[topic]
+        for cluster in topic_clusters:
+            fscore_d = topic_clusters[cluster]['fscore']
+            for beta in beta_d:
+                update_Fscore_Summary(beta_d[beta], fscore_d[beta])
+    if children and 'children_clusters' in level_data.keys():
+        for cluster in level_data['children_clusters']:
+            universal_summary_d = recursive_Universal_Fscore_Summary_D(universal_summary_d, level_data['children_clusters'][cluster])
+    return universal_summary_d
+
+def merge_T_Universal_Fscore_Summary_D(universal_summary_d_1, universal_summary_d_2):
+    """Merges the summaries of each topic and beta, see merge_Fscore_Summary()"""
+    universal_summary_d = {}
+    for topic in universal_summary_d_1:
+        universal_summary_d[topic] = {}
+        for beta in universal_summary_d_1[topic]:
+            universal_summary_d[topic][beta] = merge_Fscore_Summary(universal_summary_d_1[topic][beta], universal_summary_d_2[topic][beta])
+    return universal_summary_d
+
+def check_Fscore_Summary(summary, fscore_set):
+    """Checks a summary of F-scores against the exact set of F-scores
+
+    Parameters
+    ----------
+    summary : dict
+        Summary of F-scores, see c_Fscore_Summary_D().
+
+    fscore_set : set
+        The exact F-scores (e.g. from c_T_Universal_Fscore_D()).
+
+    Returns
+    -------
+    is_valid : bool
+        True if the max and the top_k values are the same, and the histogram has F-scores in the same bins as the set.
+
+    Notes
+    -------
+    The number of F-scores per bin can't be compared because the set only has the distinct F-scores.
+    """
+    exact_summary = c_Fscore_Summary_D(summary['k'], len(summary['histogram']))
+    for fscore in fscore_set:
+        update_Fscore_Summary(exact_summary, fscore)
+    same_bins = [n > 0 for n in summary['histogram']] == [n > 0 for n in exact_summary['histogram']]
+    is_valid = summary['max'] == exact_summary['max'] and summary['top_k'] == exact_summary['top_k'] and same_bins
+    return is_valid
@@ -0,0 +1,320 @@
+import json
+import math
+import os
+import platform
+import sys
+import time
+import numpy as np
+import igraph
+import functions_reading as reading
+import functions_pipeline as pipeline
+import functions_profiling as profiling
+
+def c_Level_P_Array(n_levels, ratio=0.35):
+    """Probability that a citation is drawn inside the community of each level (from the smallest community to the whole
+    network). It decays geometrically with the level"""
+    level_p_array = ratio ** np.arange(n_levels + 1, dtype=np.float64)
+    return level_p_array / level_p_array.sum()
+
+def generate_Synthetic_Network(path_network, path_references, n_nodes, mean_degree=10.0, degree_sigma=1.0, branching=8, leaf_size=50,
+                               fitness_exponent=2.0, level_p_l=None, n_topics=30, years=(2014, 2015, 2016), mean_references=30,
+                               seed=0, chunk_size=100000):
+    """Creates a synthetic citation network with nested communities and the references of synthetic systematic reviews
+
+    Parameters
+    ----------
+    path_network : str
+        Path of the network file. Each line is 'nid1\\tnid2' (citing document and cited document), as the files read by
+        functions_reading.parse_Network().
+
+    path_references : str
+        Path of the references file. Each line is 'year\\ttopic\\tnetid', as the test references file read in clustering.ipynb.
+
+    n_nodes : int
+        Number of documents (from 10**4 to 10**7).
+
+    mean_degree : float, optional
+        Mean number of references (citations made) of each document. The number of references is log-normal.
+
+    degree_sigma : float, optional
+        Sigma of the log-normal distribution of the number of references.
+
+    branching : int, optional
+        Number of child communities of each community.
+
+    leaf_size : int, optional
+        Mean size of the smallest communities. The number of levels of communities is chosen so the smallest communities
+        have about this size.
+
+    fitness_exponent : float, optional
+        Shape of the Pareto distribution of the fitness of the documents. A document is cited proportionally to its fitness,
+        so the number of citations received is heavy-tailed (smaller exponent, heavier tail).
+
+    level_p_l : list of float, optional
+        Probability that a citation is drawn inside the community of each level, from the smallest community to the whole
+        network. By default see c_Level_P_Array().
+
+    n_topics : int, optional
+        Number of systematic reviews.
+
+    years : tuple of int, optional
+        Years of the systematic reviews. The topics are distributed among the years.
+
+    mean_references : int, optional
+        Mean number of references of a systematic review (at least 10, as the threshold of clean_references.ipynb).
+
+    seed : int, optional
+        Random seed. The same parameters and seed create the same files.
+
+    chunk_size : int, optional
+        Number of citing documents generated (and written) at once.
+
+    Returns
+    -------
+    synthetic_d : dict
+        Parameters and statistics of the network ('n_edges', 'n_levels', 'n_leaves', etc.) and the references of each year
+        ('year_references_d': year -> topic -> set of net IDs, as year_references_d in clustering.ipynb).
+
+    Notes
+    -------
+    The communities are a tree: each document belongs to a leaf community, and the community of level k of the document is
+    leaf // branching**k. The documents are sorted by leaf, so every community of every level is a contiguous range of
+    positions, and the position is also the age of the document. Each citation of a document is drawn at a level (level_p_l),
+    and the cited document is an older document of the same community of that level, chosen proportionally to its fitness.
+    If there is no older document in the community, the next level is used. Since a document only cites older documents,
+    every pair of documents appears at most once. The net IDs are a random permutation of the positions, so they do not
+    reveal the communities.
+    The memory is about 25 bytes per document plus the citations of one chunk, so it works up to 10**7 documents.
+    A systematic review is a community of level 1 or 2 (chosen through a random cited document, so big communities are more
+    likely), and its references are a sample of the community plus about 10% of documents from anywhere in the network.
+    """
+    rng = np.random.default_rng(seed)
+    n_levels = max(1, int(round(math.log(max(n_nodes / float(leaf_size), 2.0), branching))))  # Levels below the whole network
+    n_leaves = branching ** n_levels
+    if level_p_l is None:
+        level_p_array = c_Level_P_Array(n_levels)
+    else:
+        level_p_array = np.array(level_p_l, dtype=np.float64) / np.sum(level_p_l)
+        assert (len(level_p_array) == n_levels + 1), 'level_p_l must have ' + str(n_levels + 1) + ' values'
+    leaf_weights = rng.pareto(2.0, n_leaves) + 1.0  # Heavy-tailed community sizes
+    leaf_array = np.sort(rng.choice(n_leaves, size=n_nodes, p=leaf_weights / leaf_weights.sum())).astype(np.int64)
+    leaf_start_array = np.searchsorted(leaf_array, np.arange(n_leaves + 1))  # First position of each leaf
+    fitness_array = rng.pareto(fitness_exponent, n_nodes) + 1.0
+    fitness_cum_array = np.concatenate([[0.0], np.cumsum(fitness_array)])  # fitness_cum_array[p] is the fitness of positions < p
+    del fitness_array
+    mu = math.log(mean_degree) - degree_sigma**2 / 2.0
+    netid_array = rng.permutation(n_nodes).astype(np.int64)  # Net ID of each position
+    has_edge = np.zeros(n_nodes, dtype=bool)
+    n_edges = 0
+    with open(path_network, 'w') as network_file:
+        for start in range(0, n_nodes, chunk_size):
+            position_array = np.arange(start, min(start + chunk_size, n_nodes), dtype=np.int64)
+            degree_array = np.maximum(1, np.rint(rng.lognormal(mu, degree_sigma, len(position_array)))).astype(np.int64)
+            citing_array = np.repeat(position_array, degree_array)
+            level_array = rng.choice(n_levels + 1, size=len(citing_array), p=level_p_array)
+            cited_array = np.full(len(citing_array), -1, dtype=np.int64)
+            pending = np.arange(len(citing_array))
+            while len(pending) > 0:  # Move the citations without older documents in the community to the next level
+                level_scale = branching ** level_array[pending]
+                community_start = leaf_start_array[(leaf_array[citing_array[pending]] // level_scale) * level_scale]
+                low = fitness_cum_array[community_start]
+                high = fitness_cum_array[citing_array[pending]]
+                valid = high > low
+                draw = low[valid] + (high[valid] - low[valid]) * rng.random(int(valid.sum()))
+                cited = np.searchsorted(fitness_cum_array, draw, side='right') - 1
+                cited_array[pending[valid]] = np.clip(cited, community_start[valid], citing_array[pending[valid]] - 1)
+                pending = pending[~valid]
+                level_array[pending] += 1
+                pending = pending[level_array[pending] <= n_levels]  # The oldest document of the network can't cite
+            keep = cited_array >= 0
+            pair_key_array = np.unique(citing_array[keep] * n_nodes + cited_array[keep])  # Repeated citations are counted once
+            citing_array = pair_key_array // n_nodes
+            cited_array = pair_key_array % n_nodes
+            has_edge[citing_array] = True
+            has_edge[cited_array] = True
+            n_edges += len(pair_key_array)
+            lines = [str(x) + '\t' + str(y) + '\n' for x, y in zip(netid_array[citing_array].tolist(), netid_array[cited_array].tolist())]
+            network_file.write(''.join(lines))
+    year_references_d = c_Synthetic_References_D(rng, leaf_array, leaf_start_array, netid_array, has_edge, branching, n_levels, n_topics, years, mean_references)
+    write_Synthetic_References(path_references, year_references_d)
+    synthetic_d = {'path_network': path_network, 'path_references': path_references, 'n_nodes': n_nodes,
+                   'n_nodes_with_edges': int(has_edge.sum()), 'n_edges': n_edges, 'n_levels': n_levels, 'n_leaves': n_leaves,
+                   'mean_degree': mean_degree, 'degree_sigma': degree_sigma, 'branching': branching, 'leaf_size': leaf_size,
+                   'fitness_exponent': fitness_exponent, 'level_p_l': level_p_array.tolist(), 'n_topics': n_topics,
+                   'years': list(years), 'mean_references': mean_references, 'seed': seed, 'year_references_d': year_references_d}
+    return synthetic_d
+
+def c_Synthetic_References_D(rng, leaf_array, leaf_start_array, netid_array, has_edge, branching, n_levels, n_topics, years, mean_references):
+    """Creates the references of the synthetic systematic reviews (see generate_Synthetic_Network())"""
+    connected_array = np.flatnonzero(has_edge)
+    year_references_d = {year: {} for year in years}
+    for topic in range(1, n_topics + 1):
+        year = years[(topic - 1) % len(years)]
+        level = int(rng.integers(1, min(2, n_levels) + 1))
+        level_scale = branching ** level
+        seed_position = connected_array[rng.integers(len(connected_array))]
+        first_leaf = (leaf_array[seed_position] // level_scale) * level_scale
+        community_array = np.arange(leaf_start_array[first_leaf], leaf_start_array[min(first_leaf + level_scale, len(leaf_start_array) - 1)])
+        community_array = community_array[has_edge[community_array]]
+        n_references = max(10, int(rng.lognormal(math.log(mean_references), 0.5)))
+        n_noise = n_references // 10
+        n_community = min(n_references - n_noise, len(community_array))
+        position_array = np.concatenate([rng.choice(community_array, n_community, replace=False),
+                                         rng.choice(connected_array, n_noise, replace=False)])
+        year_references_d[year][topic] = set(netid_array[position_array].tolist())
+    return year_references_d
+
+def write_Synthetic_References(path_references, year_references_d):
+    """Writes the references as 'year\\ttopic\\tnetid' lines"""
+    with open(path_references, 'w') as references_file:
+        for year in year_references_d:
+            for topic in year_references_d[year]:
+                references_file.write(''.join([str(year) + '\t' + str(topic) + '\t' + str(netid) + '\n' for netid in sorted(year_references_d[year][topic])]))
+
+def read_Synthetic_References_D(path_references):
+    """Reads a references file as year -> topic -> set of net IDs (the same as clustering.ipynb does with the test file)"""
+    f = reading.p_Tab_Delimited(path_references)
+    f_clean = [[int(row[0]), int(row[1]), int(row[2])] for row in f]
+    year_references_d = reading.parse_2_Level_D(f_clean)
+    for year in year_references_d:
+        for topic in year_references_d[year]:
+            year_references_d[year][topic] = set(year_references_d[year][topic])
+    return year_references_d
+
+def tree_Stats_D(level_data):
+    """Statistics of a tree of clusters
+
+    Returns
+    -------
+    stats : dict
+        Number of nodes of the tree ('tree_nodes'), deepest level ('depth'), and, per level, the number of nodes, clusters,
+        positive clusters and documents ('levels').
+    """
+    stats = {'tree_nodes': 0, 'depth': 0, 'levels': {}}
+    pending_l = [level_data]
+    while len(pending_l) > 0:
+        data = pending_l.pop()
+        level = data['level']
+        level_d = stats['levels'].setdefault(level, {'nodes': 0, 'clusters': 0, 'positive_clusters': 0, 'documents': 0})
+        level_d['nodes'] += 1
+        level_d['clusters'] += len(data['merging_data']['jclu_d'])
+        level_d['positive_clusters'] += len(data['all_positive_clusters_id'])
+        level_d['documents'] += sum([len(x) for x in data['merging_data']['jclu_d'].values()])
+        stats['tree_nodes'] += 1
+        stats['depth'] = max(stats['depth'], level)
+        if 'children_clusters' in data:
+            pending_l += list(data['children_clusters'].values())
+    stats['levels'] = {level: stats['levels'][level] for level in sorted(stats['levels'])}
+    return stats
+
+def environment_D():
+    """Versions of the software, so the results of different machines can be compared"""
+    return {'python': sys.version.split()[0], 'igraph': igraph.__version__, 'numpy': np.__version__, 'platform': platform.platform(),
+            'cpu_count': os.cpu_count()}
+
+def benchmark_Pipeline(path_network, refferences_d, results_path, label='', year=0, profile=False, extra_d=None, **pipeline_params):
+    """Runs pipeline_Clustering() and appends the time, memory and tree statistics of each stage to a results file
+
+    Parameters
+    ----------
+    path_network : str
+        Path of the network file.
+
+    refferences_d : dict of set
+        The key is the topic and the value is the set of references of the topic.
+
+    results_path : str
+        Path of the results file. One JSON record is appended per run (JSON lines), so the runs of different versions of the
+        code can be compared.
+
+    label : str, optional
+        Name of the run (e.g. the change being measured).
+
+    year : int, optional
+        Parameter of pipeline_Clustering().
+
+    profile : bool, optional
+        If True the run is profiled (see functions_profiling) and the summary by stage and level is added to the record.
+
+    extra_d : dict, optional
+        Values added to the record (e.g. the parameters of the synthetic network).
+
+    **pipeline_params
+        Parameters of pipeline_Clustering() (e.g. initial_resolution, max_depth, memory_budget).
+
+    Returns
+    -------
+    record : dict
+        The record appended to the results file. 'stages' contains the seconds and the memory of each stage (see
+        functions_memory.memory_Stage()), 'tree' the statistics of the tree (see tree_Stats_D()) and 'graph' the size of the network.
+    """
+    if profile:
+        profiling.enable_Profiling()
+    start = time.perf_counter()
+    try:
+        cs = pipeline.pipeline_Clustering(year, refferences_d, path_network, memory_report=True, **pipeline_params)
+    finally:
+        if profile:
+            profiling.disable_Profiling()
+    record = {'label': label, 'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'path_network': path_network,
+              'params': {key: value for key, value in pipeline_params.items()}, 'seconds': time.perf_counter() - start,
+              'graph': cs['network_size'] if 'network_size' in cs else {'vcount': cs['igraph_network'].vcount(), 'ecount': cs['igraph_network'].ecount()},
+              'topics': len(refferences_d), 'stages': cs['memory']['stages'], 'peak_rss': cs['memory']['peak_rss'],
+              'tree': tree_Stats_D(cs['level_data']), 'iterations': cs['level_data']['ITERATIONS_COUNT'], 'environment': environment_D()}
+    if profile:
+        record['profile'] = profiling.profile_Summary_D()
+    if extra_d is not None:
+        record['extra'] = extra_d
+    with open(results_path, 'a', encoding='UTF-8') as results_file:
+        results_file.write(json.dumps(record, default=str) + '\n')
+    return record
+
+def run_Synthetic_Benchmark(n_nodes, data_dir, results_path, label='', seed=0, year=None, generator_params=None, **pipeline_params):
+    """Creates (or reuses) a synthetic network and benchmarks the pipeline on it
+
+    Parameters
+    ----------
+    n_nodes : int
+        Number of documents of the network.
+
+    data_dir : str
+        Directory of the network and references files. The files are named by the number of documents and the seed, and they
+        are only created if they do not exist.
+
+    results_path : str
+        Parameter of benchmark_Pipeline().
+
+    label : str, optional
+        Parameter of benchmark_Pipeline().
+
+    seed : int, optional
+        Random seed of the network.
+
+    year : int, optional
+        Year of the references to use. By default the first year of the references.
+
+    generator_params : dict, optional
+        Parameters of generate_Synthetic_Network(). The defaults give the same files for the same n_nodes and seed, so only
+        change them together with the file names (e.g. another data_dir).
+
+    **pipeline_params
+        Parameters of pipeline_Clustering().
+
+    Returns
+    -------
+    record : dict
+        The record appended to the results file.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    path_network = os.path.join(data_dir, 'synthetic_nid1_nid2_' + str(n_nodes) + '_' + str(seed) + '.txt')
+    path_references = os.path.join(data_dir, 'synthetic_year_topic_netid_' + str(n_nodes) + '_' + str(seed) + '.txt')
+    extra_d = {'n_nodes': n_nodes, 'seed': seed}
+    if not (os.path.exists(path_network) and os.path.exists(path_references)):
+        start = time.perf_counter()
+        synthetic_d = generate_Synthetic_Network(path_network, path_references, n_nodes, seed=seed, **(generator_params or {}))
+        extra_d['generator'] = {key: value for key, value in synthetic_d.items() if key != 'year_references_d'}
+        extra_d['generator_seconds'] = time.perf_counter() - start
+    year_references_d = read_Synthetic_References_D(path_references)
+    if year is None:
+        year = min(year_references_d)
+    return benchmark_Pipeline(path_network, year_references_d[year], results_path, label=label, year=year, extra_d=extra_d, **pipeline_params)
@@ -0,0 +1,173 @@
+import hashlib
+import numpy as np
+import igraph
+import functions_reading as reading
+
+def read_Netid_Pmid_D(filename, encoding=None, errors=None):
+    """Reads a net ID -> PubMed ID file of a year (e.g. PAPER2_netid_pmid_2015_UNION.txt, with a header, net ID in column 0 and
+    PubMed ID in column 1)"""
+    rows = reading.p_Tab_Delimited(filename, encoding=encoding, errors=errors)
+    return {int(row[0]): int(row[1]) for row in rows[1:]}
+
+def c_Node_Map_D(prev_netid_pmid_d, next_netid_pmid_d):
+    """Maps the net IDs of a year to the net IDs of the next year through the PubMed IDs
+
+    Parameters
+    ----------
+    prev_netid_pmid_d : dict
+        Net ID -> PubMed ID of the previous year (see read_Netid_Pmid_D()).
+
+    next_netid_pmid_d : dict
+        Net ID -> PubMed ID of the next year.
+
+    Returns
+    -------
+    node_map : dict
+        Net ID of the previous year -> net ID of the next year, for the documents that are in both networks. It is injective.
+
+    Notes
+    -------
+    The net IDs are the row numbers of the export of each year, so the same document has a different net ID in each network.
+    If the networks share the IDs (e.g. the synthetic networks) the node map is not needed (None).
+    Some PubMed IDs have more than one net ID (pub IDs of Dimensions with the same PubMed ID). As in
+    functions_clean_references.c_Pmid_Netid_Table_D(), only the lowest net ID of each PubMed ID is used, in both years, so two
+    documents of the previous year are never mapped to the same document of the next year. The other net IDs are left out.
+    """
+    pmid_prev_d = lowest_Netid_D(prev_netid_pmid_d)
+    pmid_next_d = lowest_Netid_D(next_netid_pmid_d)
+    return {netid: pmid_next_d[pmid] for pmid, netid in pmid_prev_d.items() if pmid in pmid_next_d}
+
+def lowest_Netid_D(netid_pmid_d):
+    """PubMed ID -> lowest net ID of the PubMed ID"""
+    pmid_netid_d = {}
+    for netid, pmid in sorted(netid_pmid_d.items()):
+        pmid_netid_d.setdefault(pmid, netid)
+    return pmid_netid_d
+
+def c_Warm_Labels_D(level_data, initial_resolution, node_map=None):
+    """Creates the memberships of each level of a tree, to start the clustering of the next year from them
+
+    Parameters
+    ----------
+    level_data : dict
+        Tree of clusters of the previous year (cs['level_data']).
+
+    initial_resolution : float
+        Resolution of the first level (cs['INITIAL_RESOLUTION']).
+
+    node_map : dict, optional
+        Net IDs of the previous year -> net IDs of the next year (see c_Node_Map_D()). The documents that are not in the map
+        are left out. By default the IDs are the same.
+
+    Returns
+    -------
+    labels_d : dict of dict
+        The key is the resolution of a level and the value is net ID -> label, where the label is the cluster of the document
+        in that level (the merged clusters and the removed clusters of each branch, see functions_merging.join_Clusters()).
+
+    Notes
+    -------
+    The resolution identifies the level, because all the graphs of a level are clustered with the same resolution. The
+    clustering of a graph of the next year starts from the labels of its resolution (see initial_Membership()). In a lazy tree
+    only the levels that were created are used.
+    """
+    labels_d = {}
+    n_labels_d = {}  # Labels used in each resolution, so the clusters of different branches have different labels
+    level_l = [(level_data, initial_resolution)]
+    while len(level_l) > 0:
+        level_data, resolution = level_l.pop()
+        labels = labels_d.setdefault(resolution, {})
+        merging_data = level_data['merging_data']
+        for cluster_d in [merging_data['jclu_d'], merging_data['jrem_d']]:
+            for nodes in cluster_d.values():
+                label = n_labels_d.get(resolution, 0)
+                n_labels_d[resolution] = label + 1
+                for node in nodes:
+                    if node_map is None:
+                        labels[node] = label
+                    elif node in node_map:
+                        labels[node_map[node]] = label
+        if 'children_clusters' in level_data:
+            for child in level_data['children_clusters'].values():
+                if child is not None:  # Placeholders of a work queue that were not filled
+                    level_l.append((child, level_data['children_resolution']))
+    return labels_d
+
+def initial_Membership(labels_d, ig_network, resolution):
+    """Initial membership of the Leiden algorithm from the labels of the previous year (see c_Warm_Labels_D()), or None if there
+    are no labels for the resolution. The vertices without a label start as singletons"""
+    labels = labels_d.get(resolution)
+    if labels is None:
+        return None
+    label_index_d = {}
+    membership = []
+    for name in ig_network.vs['name']:
+        label = labels.get(name, ('singleton', name))
+        membership.append(label_index_d.setdefault(label, len(label_index_d)))
+    return membership
+
+def c_Partition_Cache_D():
+    """Creates a partition cache: graph key (see graph_Key()) -> membership and quality of the partition of the graph"""
+    return {'entries': {}, 'stored': 0, 'skipped': 0, 'hits': 0, 'misses': 0}
+
+def graph_Key(ig_network, resolution, settings, node_map=None):
+    """Hash of everything the partition of a graph depends on: the names of the vertices (mapped with node_map), the edges, the
+    weights if they are used, the resolution and the settings of the clustering
+
+    Returns
+    -------
+    key : str
+        The hash, or None if a vertex is not in node_map.
+
+    rank_array : numpy.ndarray
+        Position of each vertex in the order of the names, to store the membership independently of the order of the vertices.
+
+    Notes
+    -------
+    The key does not depend on the order of the vertices and edges, which depends on the net IDs (parse_Network() returns a
+    set), so the same graph is found in a network with other IDs. The Leiden algorithm is seeded, so in a graph with the same
+    order the cached partition is the partition of a cold run; with another order it is the partition of the same graph in
+    the previous year.
+    """
+    name_l = ig_network.vs['name']
+    if node_map is not None:
+        if not all(name in node_map for name in name_l):
+            return None, None
+        name_l = [node_map[name] for name in name_l]
+    name_array = np.array(name_l, dtype=np.int64)
+    order = np.argsort(name_array, kind='stable')
+    rank_array = np.empty(len(order), dtype=np.int64)
+    rank_array[order] = np.arange(len(order))
+    edge_array = np.sort(rank_array[np.array(ig_network.get_edgelist(), dtype=np.int64).reshape(-1, 2)], axis=1)
+    key_hash = hashlib.sha1()
+    key_hash.update(name_array[order].tobytes())
+    if settings.get('weights') is not None:
+        weight_array = np.array(ig_network.es[settings['weights']], dtype=float)
+        edge_order = np.lexsort((weight_array, edge_array[:, 1], edge_array[:, 0]))
+        key_hash.update(weight_array[edge_order].tobytes())
+    else:
+        edge_order = np.lexsort((edge_array[:, 1], edge_array[:, 0]))
+    key_hash.update(edge_array[edge_order].tobytes())
+    key_hash.update(repr((float(resolution), sorted(settings.items()))).encode())
+    return key_hash.hexdigest(), rank_array
+
+def store_Partition(cache_d, ig_network, resolution, partition, settings, node_map=None):
+    """Stores the partition of a graph of the previous year under the key of the graph in the next year"""
+    key, rank_array = graph_Key(ig_network, resolution, settings, node_map=node_map)
+    if key is None:
+        cache_d['skipped'] += 1
+        return
+    membership_array = np.empty(len(rank_array), dtype=np.int32)
+    membership_array[rank_array] = partition.membership  # In the order of the names
+    cache_d['entries'][key] = {'membership': membership_array, 'quality': partition.quality}
+    cache_d['stored'] += 1
+
+def cached_Partition(cache_d, ig_network, resolution, settings):
+    """Partition of a graph from the cache, or None if the graph is not in the cache"""
+    key, rank_array = graph_Key(ig_network, resolution, settings)
+    entry = cache_d['entries'].get(key)
+    if entry is None:
+        cache_d['misses'] += 1
+        return None
+    cache_d['hits'] += 1
+    return igraph.VertexClustering(ig_network, entry['membership'][rank_array].tolist(), params={'quality': entry['quality']})
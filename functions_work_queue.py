@@ -0,0 +1,540 @@
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import pickle
+import random
+import socket
+import argparse
+import traceback
+import subprocess
+import multiprocessing
+import functions_iterative_clustering as iterative_clustering
+import functions_clustering as clustering
+import functions_warm_start as warm_start
+import functions_profiling as profiling
+import functions_memory as memory
+import functions_reference_table as reference_table
+
+QUEUE_SUBDIRS = ['jobs', 'pending', 'claimed', 'done', 'failed', 'tmp']
+
+def queue_Path(queue_dir, subdir, name=''):
+    """Path of a file or directory of the queue"""
+    return os.path.join(queue_dir, subdir, name)
+
+def make_Queue_Dirs(queue_dir):
+    """Creates the directories of the queue (they can already exist)"""
+    for subdir in QUEUE_SUBDIRS:
+        os.makedirs(queue_Path(queue_dir, subdir), exist_ok=True)
+
+def write_File_Atomic(path, data, tmp_dir):
+    """Writes bytes through a temporary file in the same file system, so the readers never see a partial file"""
+    temporary_path = os.path.join(tmp_dir, os.path.basename(path) + '.' + uuid.uuid4().hex)
+    with open(temporary_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary_path, path)
+
+def c_Worker_Id():
+    """Unique name of a worker (host, process and a random part)"""
+    return socket.gethostname() + '-' + str(os.getpid()) + '-' + uuid.uuid4().hex[:6]
+
+def c_Queue_D(queue_dir, stale_timeout=600.0, poll_interval=1.0):
+    """Creates the state of a coordinator
+
+    Parameters
+    ----------
+    queue_dir : str
+        Directory of the queue. It must be shared by the coordinator and the workers (e.g. a network file system).
+
+    stale_timeout : float, optional
+        Seconds without a heartbeat after which a claimed task is given back to the queue (the worker is considered dead). It
+        must be much longer than the heartbeat interval of the workers and the clock difference between the machines.
+
+    poll_interval : float, optional
+        Seconds between the checks of the results.
+
+    Returns
+    -------
+    queue_d : dict
+        State of the coordinator: the queue directory, the ID of the job, the number of submitted tasks and the submitted tasks
+        with the place of their result in the tree ('tasks').
+    """
+    make_Queue_Dirs(queue_dir)
+    queue_d = {'queue_dir': queue_dir, 'job_id': uuid.uuid4().hex[:12], 'n_tasks': 0, 'tasks': [], 'stale_timeout': stale_timeout,
+               'poll_interval': poll_interval}
+    return queue_d
+
+def submit_Job(queue_d, max_depth, clusters_per_level, t_references_d, resolution_factor):
+    """Writes the constant parameters of the recursion, which are shared by all the tasks of the job
+
+    Notes
+    -------
+    The global settings of the clustering of the coordinator (parameters of the Leiden algorithm, coarsening and warm start, see
+    functions_clustering.clustering_Settings_D()) are part of the job, so the workers cluster the subtrees as a local run. The
+    partitions recorded for the next year are not sent: each task records them in its own cache (see execute_Task()).
+    """
+    settings_d = clustering.clustering_Settings_D()
+    settings_d['warm_start_d']['record_cache_d'] = None
+    job_d = {'max_depth': max_depth, 'clusters_per_level': clusters_per_level, 't_references_d': t_references_d,
+             'resolution_factor': resolution_factor, 'settings_d': settings_d,
+             'record_partitions': clustering.WARM_START_D['record_cache_d'] is not None}
+    write_File_Atomic(queue_Path(queue_d['queue_dir'], 'jobs', queue_d['job_id'] + '.pickle'), pickle.dumps(job_d, protocol=pickle.HIGHEST_PROTOCOL),
+                      queue_Path(queue_d['queue_dir'], 'tmp'))
+
+def submit_Task(queue_d, graph, resolution, parent_level):
+    """Writes a subtree task to the queue
+
+    Parameters
+    ----------
+    queue_d : dict
+        State of the coordinator (see c_Queue_D()).
+
+    graph : igraph.Graph
+        Graph of the subtree (saved as arrays, see functions_memory.save_Graph_Arrays()).
+
+    resolution : float
+        Resolution of the clustering of the graph.
+
+    parent_level : int
+        Level of the parent cluster.
+
+    Returns
+    -------
+    task_id : str
+        ID of the task.
+
+    Notes
+    -------
+    A task is a directory with the graph ('graph.npz') and the parameters ('task.json'). It is written in the tmp directory and
+    then renamed into the pending directory, so the workers only see complete tasks.
+    """
+    task_id = queue_d['job_id'] + '-' + format(queue_d['n_tasks'], '06d')
+    queue_d['n_tasks'] += 1
+    task_dir = queue_Path(queue_d['queue_dir'], 'tmp', task_id)
+    os.makedirs(task_dir)
+    memory.save_Graph_Arrays(graph, os.path.join(task_dir, 'graph.npz'))
+    task_d = {'task_id': task_id, 'job_id': queue_d['job_id'], 'resolution': resolution, 'parent_level': parent_level,
+              'vcount': graph.vcount(), 'ecount': graph.ecount()}
+    with open(os.path.join(task_dir, 'task.json'), 'w', encoding='UTF-8') as f:
+        json.dump(task_d, f)
+    os.rename(task_dir, queue_Path(queue_d['queue_dir'], 'pending', task_id))
+    return task_id
+
+def claim_Task(queue_dir, worker_id):
+    """Claims a pending task
+
+    Returns
+    -------
+    claimed_dir : str
+        Directory of the claimed task, or None if there are no pending tasks.
+
+    Notes
+    -------
+    The claim is the rename of the task directory from pending/<task_id> to claimed/<task_id>@<worker_id>. The rename is atomic,
+    so if several workers try to claim the same task only one succeeds, and the others try another task. The pending tasks are
+    tried in random order to avoid that all the workers compete for the same one.
+    """
+    name_l = [name for name in os.listdir(queue_Path(queue_dir, 'pending')) if not name.startswith('.')]
+    random.shuffle(name_l)
+    for task_id in name_l:
+        claimed_dir = queue_Path(queue_dir, 'claimed', task_id + '@' + worker_id)
+        try:
+            os.rename(queue_Path(queue_dir, 'pending', task_id), claimed_dir)
+        except OSError:  # Another worker claimed it first
+            continue
+        touch_Heartbeat(claimed_dir)
+        return claimed_dir
+    return None
+
+def touch_Heartbeat(claimed_dir):
+    """Updates the heartbeat of a claimed task. It does nothing if the task was reclaimed"""
+    try:
+        with open(os.path.join(claimed_dir, 'heartbeat'), 'a'):
+            pass
+        os.utime(os.path.join(claimed_dir, 'heartbeat'))
+    except OSError:
+        pass
+
+def reclaim_Stale_Tasks(queue_dir, stale_timeout):
+    """Gives back to the queue the claimed tasks without a heartbeat for stale_timeout seconds
+
+    Returns
+    -------
+    task_id_l : list
+        IDs of the reclaimed tasks.
+
+    Notes
+    -------
+    Any process can call it (the coordinator does it while it waits). A task whose result already exists is removed instead. If
+    the worker of a reclaimed task was only slow and finishes it, its result is the same as the one of the new worker (the
+    clustering only depends on the graph and the resolution), so the duplicated result does no harm. If it fails instead, the
+    failure is ignored while the task is pending or claimed again (see wait_Queue_Results()), and the results written after
+    the end of the job are removed (see remove_Orphan_Results()).
+    """
+    task_id_l = []
+    now = time.time()
+    for name in os.listdir(queue_Path(queue_dir, 'claimed')):
+        claimed_dir = queue_Path(queue_dir, 'claimed', name)
+        task_id = name.split('@', 1)[0]
+        try:
+            heartbeat_path = os.path.join(claimed_dir, 'heartbeat')
+            last_beat = os.path.getmtime(heartbeat_path) if os.path.exists(heartbeat_path) else os.path.getmtime(claimed_dir)
+            if now - last_beat < stale_timeout:
+                continue
+            if os.path.exists(queue_Path(queue_dir, 'done', task_id + '.pickle')):
+                shutil.rmtree(claimed_dir, ignore_errors=True)
+                continue
+            os.rename(claimed_dir, queue_Path(queue_dir, 'pending', task_id))
+            task_id_l.append(task_id)
+        except OSError:  # The worker finished or another process reclaimed it
+            continue
+    return task_id_l
+
+def execute_Task(queue_dir, claimed_dir):
+    """Runs a claimed task and writes its result (done/<task_id>.pickle) or its error (failed/<task_id>.json)
+
+    Notes
+    -------
+    The subtree is created with c_Clus_Recursion() with the settings of the clustering of the job, so it is the same as in a
+    local run. It runs in a child process of the worker (see work_One_Task()), so the settings are not restored. The result
+    also contains the counts of the partition cache, the partitions recorded for the next year and the records of the adaptive
+    mode, which the coordinator adds to its own (see merge_Task_Settings()).
+    """
+    with open(os.path.join(claimed_dir, 'task.json'), 'r', encoding='UTF-8') as f:
+        task_d = json.load(f)
+    try:
+        with open(queue_Path(queue_dir, 'jobs', task_d['job_id'] + '.pickle'), 'rb') as f:
+            job_d = pickle.load(f)
+        clustering.set_Clustering_Settings(job_d['settings_d'])
+        cache_d = clustering.WARM_START_D['cache_d']
+        if cache_d is not None:
+            cache_d.update({'hits': 0, 'misses': 0})  # Only the counts of the task
+        if job_d['record_partitions']:
+            clustering.WARM_START_D['record_cache_d'] = warm_start.c_Partition_Cache_D()
+        clustering.reset_Leiden_Log()
+        graph = memory.load_Graph_Arrays(os.path.join(claimed_dir, 'graph.npz'), remove=False)
+        start = time.perf_counter()
+        level_data, ITERATIONS_COUNT = iterative_clustering.c_Clus_Recursion(graph, task_d['resolution'], task_d['parent_level'], job_d['max_depth'], job_d['clusters_per_level'], job_d['t_references_d'], job_d['resolution_factor'], 0)
+        result_d = {'task_id': task_d['task_id'], 'level_data': level_data, 'iterations': ITERATIONS_COUNT,
+                    'seconds': time.perf_counter() - start, 'worker': os.path.basename(claimed_dir).split('@', 1)[1],
+                    'cache_counts': None if cache_d is None else {'hits': cache_d['hits'], 'misses': cache_d['misses']},
+                    'record_cache_d': clustering.WARM_START_D['record_cache_d'], 'leiden_log_l': list(clustering.LEIDEN_LOG_L)}
+        write_File_Atomic(queue_Path(queue_dir, 'done', task_d['task_id'] + '.pickle'), pickle.dumps(result_d, protocol=pickle.HIGHEST_PROTOCOL),
+                          queue_Path(queue_dir, 'tmp'))
+    except Exception:
+        write_File_Atomic(queue_Path(queue_dir, 'failed', task_d['task_id'] + '.json'), json.dumps({'task_id': task_d['task_id'],
+                          'error': traceback.format_exc()}).encode('UTF-8'), queue_Path(queue_dir, 'tmp'))
+        raise
+
+def merge_Task_Settings(result_d):
+    """Adds the counts of the partition cache, the recorded partitions and the records of the adaptive mode of a task (see
+    execute_Task()) to the global settings of the clustering of the coordinator"""
+    cache_d = clustering.WARM_START_D['cache_d']
+    if cache_d is not None and result_d['cache_counts'] is not None:
+        cache_d['hits'] += result_d['cache_counts']['hits']
+        cache_d['misses'] += result_d['cache_counts']['misses']
+    record_cache_d = clustering.WARM_START_D['record_cache_d']
+    if record_cache_d is not None and result_d['record_cache_d'] is not None:
+        record_cache_d['entries'].update(result_d['record_cache_d']['entries'])
+        record_cache_d['stored'] += result_d['record_cache_d']['stored']
+        record_cache_d['skipped'] += result_d['record_cache_d']['skipped']
+    clustering.LEIDEN_LOG_L.extend(result_d['leiden_log_l'])
+
+def task_Is_Leased(queue_dir, task_id):
+    """True if a task is pending or claimed by a worker"""
+    if os.path.exists(queue_Path(queue_dir, 'pending', task_id)):
+        return True
+    return any(name.split('@', 1)[0] == task_id for name in os.listdir(queue_Path(queue_dir, 'claimed')))
+
+def remove_Orphan_Results(queue_dir):
+    """Removes the results (done/ and failed/) of the jobs that ended, e.g. written by the slow worker of a reclaimed task after
+    the coordinator read the result of the new worker. Returns the number of removed files"""
+    job_id_s = {name.split('.', 1)[0] for name in os.listdir(queue_Path(queue_dir, 'jobs'))}
+    n_removed = 0
+    for subdir in ['done', 'failed']:
+        for name in os.listdir(queue_Path(queue_dir, subdir)):
+            if name.split('-', 1)[0] in job_id_s:
+                continue
+            try:
+                os.remove(queue_Path(queue_dir, subdir, name))
+                n_removed += 1
+            except OSError:  # Removed by another process
+                continue
+    return n_removed
+
+def work_One_Task(queue_dir, worker_id, heartbeat_interval=10.0):
+    """Claims and runs one task. Returns False if there were no pending tasks
+
+    Notes
+    -------
+    The task runs in a child process while this process updates its heartbeat every heartbeat_interval seconds. The clustering
+    does not release the GIL, so a heartbeat thread would stop beating during a long Leiden call. Besides, if the child process
+    is killed (e.g. out of memory), the task is marked as failed instead of blocking the queue.
+    """
+    claimed_dir = claim_Task(queue_dir, worker_id)
+    if claimed_dir is None:
+        return False
+    process = multiprocessing.Process(target=execute_Task, args=(queue_dir, claimed_dir))
+    process.start()
+    while process.is_alive():
+        process.join(heartbeat_interval)
+        touch_Heartbeat(claimed_dir)
+    task_id = os.path.basename(claimed_dir).split('@', 1)[0]
+    done = os.path.exists(queue_Path(queue_dir, 'done', task_id + '.pickle'))
+    if not done and not os.path.exists(queue_Path(queue_dir, 'failed', task_id + '.json')):
+        write_File_Atomic(queue_Path(queue_dir, 'failed', task_id + '.json'), json.dumps({'task_id': task_id,
+                          'error': 'The process of the task ended with exit code ' + str(process.exitcode)}).encode('UTF-8'), queue_Path(queue_dir, 'tmp'))
+    shutil.rmtree(claimed_dir, ignore_errors=True)
+    return True
+
+def run_Worker(queue_dir, worker_id=None, poll_interval=1.0, heartbeat_interval=10.0, stale_timeout=600.0, max_tasks=None, exit_when_empty=False):
+    """Runs tasks of the queue until it is stopped
+
+    Parameters
+    ----------
+    queue_dir : str
+        Directory of the queue.
+
+    worker_id : str, optional
+        Name of the worker. By default see c_Worker_Id().
+
+    poll_interval : float, optional
+        Seconds to wait when there are no pending tasks.
+
+    heartbeat_interval : float, optional
+        Seconds between the heartbeats of the running task.
+
+    stale_timeout : float, optional
+        The worker also reclaims the stale tasks of dead workers (see reclaim_Stale_Tasks()).
+
+    max_tasks : int, optional
+        Stop after this number of tasks.
+
+    exit_when_empty : bool, optional
+        Stop when there are no pending or claimed tasks. By default the worker waits for new tasks until the file 'stop' is
+        created in the queue directory (see stop_Workers()).
+
+    Returns
+    -------
+    n_tasks : int
+        Number of tasks run by the worker.
+    """
+    make_Queue_Dirs(queue_dir)
+    if worker_id is None:
+        worker_id = c_Worker_Id()
+    n_tasks = 0
+    while not os.path.exists(os.path.join(queue_dir, 'stop')) and (max_tasks is None or n_tasks < max_tasks):
+        if work_One_Task(queue_dir, worker_id, heartbeat_interval=heartbeat_interval):
+            n_tasks += 1
+            continue
+        reclaim_Stale_Tasks(queue_dir, stale_timeout)
+        remove_Orphan_Results(queue_dir)
+        if exit_when_empty and len(os.listdir(queue_Path(queue_dir, 'pending'))) == 0 and len(os.listdir(queue_Path(queue_dir, 'claimed'))) == 0:
+            break
+        time.sleep(poll_interval)
+    return n_tasks
+
+def c_Queue_Clus_Recursion(parent_graph, resolution, parent_level, max_depth, clusters_per_level, t_references_d, resolution_factor, ITERATIONS_COUNT, queue_d, split_level):
+    """Create the top levels of the recursion and submit the subtrees below split_level to the queue
+
+    Parameters
+    ----------
+    queue_d : dict
+        State of the coordinator (see c_Queue_D()). The submitted tasks are added to queue_d['tasks'].
+
+    split_level : int
+        The children of the clusters of this level are submitted as tasks. With 1 only the root is clustered by the coordinator.
+
+    The rest of the parameters are the same as in c_Clus_Recursion().
+
+    Returns
+    -------
+    level_data : dict
+        Dictionary with the data of the level. The children of split_level are None until wait_Queue_Results() fills them.
+
+    ITERATIONS_COUNT : int
+        Number of levels clustered by the coordinator so far.
+    """
+    ITERATIONS_COUNT += 1
+    with profiling.node_Timer(parent_level + 1, resolution, parent_graph):
+        level_data = iterative_clustering.level_Data(parent_graph, resolution, clusters_per_level, t_references_d)
+        level_data['level'] = level = parent_level + 1
+        if level < max_depth:
+            assert (len(level_data['all_positive_clusters_id']) > 0), 'Level ' + str(level) + ' Iteration ' + str(ITERATIONS_COUNT) # Report if there are no positive clusters
+            level_data['children_resolution'] = children_resolution = resolution*resolution_factor
+            level_data['children_clusters'] = {}
+            for cluster_id in level_data['all_positive_clusters_id']:
+                cluster_nodes_l = level_data['merging_data']['jclu_d'][cluster_id]
+                cluster_subgraph = iterative_clustering.create_Subgraph(parent_graph, cluster_nodes_l)
+                if level < split_level:
+                    level_data['children_clusters'][cluster_id], ITERATIONS_COUNT = c_Queue_Clus_Recursion(cluster_subgraph, children_resolution, level, max_depth, clusters_per_level, t_references_d, resolution_factor, ITERATIONS_COUNT, queue_d, split_level)
+                else:
+                    level_data['children_clusters'][cluster_id] = None  # Keeps the order of the children
+                    task_id = submit_Task(queue_d, cluster_subgraph, children_resolution, level)
+                    queue_d['tasks'].append((task_id, level_data['children_clusters'], cluster_id))
+    return level_data, ITERATIONS_COUNT
+
+def wait_Queue_Results(queue_d, work=False, heartbeat_interval=10.0):
+    """Waits for the results of the submitted tasks and puts them in the tree
+
+    Parameters
+    ----------
+    queue_d : dict
+        State of the coordinator (see c_Queue_D()).
+
+    work : bool, optional
+        If True the coordinator also runs pending tasks while it waits (useful if there are few workers).
+
+    heartbeat_interval : float, optional
+        Parameter of work_One_Task().
+
+    Returns
+    -------
+    ITERATIONS_COUNT : int
+        Number of levels clustered by the tasks.
+
+    Notes
+    -------
+    While it waits, it gives back the stale tasks to the queue. If a task failed it raises an AssertionError with the error of
+    the worker, unless the task is pending or claimed again: the failure is then the late failure of a reclaimed task, and the
+    new worker decides. The results are read in the order the tasks finish and removed from the queue (with the late failures
+    of the task). The counts and records of each task are added to the settings of the clustering (see merge_Task_Settings()).
+    """
+    queue_dir = queue_d['queue_dir']
+    waiting_d = {task_id: (children_clusters, cluster_id) for task_id, children_clusters, cluster_id in queue_d['tasks']}
+    worker_id = c_Worker_Id()
+    ITERATIONS_COUNT = 0
+    while len(waiting_d) > 0:
+        for task_id in list(waiting_d):
+            done_path = queue_Path(queue_dir, 'done', task_id + '.pickle')
+            failed_path = queue_Path(queue_dir, 'failed', task_id + '.json')
+            if os.path.exists(done_path):
+                with open(done_path, 'rb') as f:
+                    result_d = pickle.load(f)
+                children_clusters, cluster_id = waiting_d.pop(task_id)
+                children_clusters[cluster_id] = result_d['level_data']
+                ITERATIONS_COUNT += result_d['iterations']
+                merge_Task_Settings(result_d)
+                profiling.add_Node_Values(queue_tasks=1, queue_task_seconds=result_d['seconds'])
+                os.remove(done_path)
+                if os.path.exists(failed_path):
+                    os.remove(failed_path)
+            elif os.path.exists(failed_path) and not task_Is_Leased(queue_dir, task_id):
+                with open(failed_path, 'r', encoding='UTF-8') as f:
+                    assert (False), 'Task ' + task_id + ' failed: ' + json.load(f)['error']
+        if len(waiting_d) == 0:
+            break
+        if work and work_One_Task(queue_dir, worker_id, heartbeat_interval=heartbeat_interval):
+            continue
+        reclaim_Stale_Tasks(queue_dir, queue_d['stale_timeout'])
+        time.sleep(queue_d['poll_interval'])
+    queue_d['tasks'] = []
+    return ITERATIONS_COUNT
+
+def queue_Clus_Recursion(parent_graph, resolution, parent_level, max_depth, clusters_per_level, t_references_d, resolution_factor, ITERATIONS_COUNT, queue_dir, split_level=1, work=False, stale_timeout=600.0, poll_interval=1.0):
+    """Create the recursion of the clustering with the subtrees run by the workers of a queue
+
+    Parameters
+    ----------
+    queue_dir : str
+        Directory of the queue, shared with the workers (see run_Worker() and the command line of this module).
+
+    split_level : int, optional
+        Parameter of c_Queue_Clus_Recursion().
+
+    work : bool, optional
+        Parameter of wait_Queue_Results().
+
+    stale_timeout : float, optional
+        Parameter of c_Queue_D().
+
+    poll_interval : float, optional
+        Parameter of c_Queue_D().
+
+    The rest of the parameters are the same as in c_Clus_Recursion().
+
+    Returns
+    -------
+    level_data : dict
+        Dictionary with the data of the level.
+
+    ITERATIONS_COUNT : int
+        Number of levels clustered.
+
+    Notes
+    -------
+    Distributed version of c_Clus_Recursion(). The subtree of each positive cluster is independent, so the coordinator clusters
+    the levels until split_level and submits each subtree below as a task (the edges of its subgraph, its resolution and its
+    level). The workers can run in any machine that sees the queue directory, and there is no broker: the tasks are claimed with
+    atomic renames, and the claims of dead workers are reclaimed after stale_timeout seconds without a heartbeat.
+    The tree is the same as the one of c_Clus_Recursion() (same clusters, order of the children and ITERATIONS_COUNT), because the
+    subgraphs are saved with the order of their vertices and edges, and the workers use the settings of the clustering of the
+    coordinator (see submit_Job()).
+    """
+    t_references_d = reference_table.t_References_D(t_references_d)
+    queue_d = c_Queue_D(queue_dir, stale_timeout=stale_timeout, poll_interval=poll_interval)
+    submit_Job(queue_d, max_depth, clusters_per_level, t_references_d, resolution_factor)
+    try:
+        level_data, ITERATIONS_COUNT = c_Queue_Clus_Recursion(parent_graph, resolution, parent_level, max_depth, clusters_per_level, t_references_d, resolution_factor, ITERATIONS_COUNT, queue_d, split_level)
+        ITERATIONS_COUNT += wait_Queue_Results(queue_d, work=work)
+    finally:
+        os.remove(queue_Path(queue_dir, 'jobs', queue_d['job_id'] + '.pickle'))
+        remove_Orphan_Results(queue_dir)
+    return level_data, ITERATIONS_COUNT
+
+def start_Local_Workers(queue_dir, n_workers, poll_interval=0.2, heartbeat_interval=10.0, stale_timeout=600.0, exit_when_empty=False):
+    """Starts workers in this machine with the command line of this module (e.g. to test the queue). Returns the processes"""
+    make_Queue_Dirs(queue_dir)
+    if os.path.exists(os.path.join(queue_dir, 'stop')):  # Left by stop_Workers() in a previous run
+        os.remove(os.path.join(queue_dir, 'stop'))
+    command = [sys.executable, os.path.abspath(__file__), 'worker', os.path.abspath(queue_dir), '--poll-interval', str(poll_interval),
+               '--heartbeat-interval', str(heartbeat_interval), '--stale-timeout', str(stale_timeout)]
+    if exit_when_empty:
+        command.append('--exit-when-empty')
+    return [subprocess.Popen(command, cwd=os.path.dirname(os.path.abspath(__file__))) for _ in range(n_workers)]
+
+def stop_Workers(queue_dir, process_l=(), timeout=None):
+    """Asks the workers of a queue to stop after their current task, and waits for the given local processes"""
+    with open(os.path.join(queue_dir, 'stop'), 'w'):
+        pass
+    for process in process_l:
+        process.wait(timeout=timeout)
+
+def queue_Status_D(queue_dir):
+    """Number of tasks in each state of the queue"""
+    return {subdir: len(os.listdir(queue_Path(queue_dir, subdir))) for subdir in ['pending', 'claimed', 'done', 'failed']}
+
+def main(argv=None):
+    """Command line of the queue, e.g. 'python functions_work_queue.py worker /shared/queue' in each machine"""
+    parser = argparse.ArgumentParser(description='Workers of the distributed clustering (see queue_Clus_Recursion()).')
+    subparsers = parser.add_subparsers(dest='command')
+    worker_parser = subparsers.add_parser('worker', help='run tasks of the queue until the queue is stopped')
+    worker_parser.add_argument('queue_dir')
+    worker_parser.add_argument('--worker-id', default=None)
+    worker_parser.add_argument('--poll-interval', type=float, default=1.0)
+    worker_parser.add_argument('--heartbeat-interval', type=float, default=10.0)
+    worker_parser.add_argument('--stale-timeout', type=float, default=600.0)
+    worker_parser.add_argument('--max-tasks', type=int, default=None)
+    worker_parser.add_argument('--exit-when-empty', action='store_true')
+    status_parser = subparsers.add_parser('status', help='print the number of tasks in each state')
+    status_parser.add_argument('queue_dir')
+    stop_parser = subparsers.add_parser('stop', help='stop the workers after their current task')
+    stop_parser.add_argument('queue_dir')
+    args = parser.parse_args(argv)
+    if args.command == 'worker':
+        n_tasks = run_Worker(args.queue_dir, worker_id=args.worker_id, poll_interval=args.poll_interval, heartbeat_interval=args.heartbeat_interval,
+                             stale_timeout=args.stale_timeout, max_tasks=args.max_tasks, exit_when_empty=args.exit_when_empty)
+        print('Tasks run: ' + str(n_tasks))
+    elif args.command == 'status':
+        print(json.dumps(queue_Status_D(args.queue_dir)))
+    elif args.command == 'stop':
+        stop_Workers(args.queue_dir)
+    else:
+        parser.print_help()
+
+if __name__ == '__main__':
+    main(sys.argv[1:])